@@ -10,6 +10,10 @@ from .models import (
     Order,
     Journey,
     Ticket,
+    Cancellation,
+    Job,
+    ServiceException,
+    ServicePattern,
 )
 
 
@@ -23,6 +27,16 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = [TicketInline]
 
 
+class ServiceExceptionInline(admin.TabularInline):
+    model = ServiceException
+    extra = 1
+
+
+@admin.register(ServicePattern)
+class ServicePatternAdmin(admin.ModelAdmin):
+    inlines = [ServiceExceptionInline]
+
+
 admin.site.register(Crew)
 admin.site.register(Facility)
 admin.site.register(TrainType)
@@ -31,3 +45,5 @@ admin.site.register(Station)
 admin.site.register(Route)
 admin.site.register(Journey)
 admin.site.register(Ticket)
+admin.site.register(Cancellation)
+admin.site.register(Job)
@@ -0,0 +1,231 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Count
+
+from station.models import Journey, Route, Station
+from station.names import normalize_name
+
+# rankings are kept for prefixes matching more entries than this, so one
+# letter queries don't rank thousands of stations every keystroke
+MEMO_MIN_MATCHES = 256
+
+
+def name_keys(name):
+    """Index keys of a station name, one per word start: 'Wien Hbf' ->
+    ['wien hbf', 'hbf']"""
+    normalized = normalize_name(name)
+    return [
+        normalized[position:]
+        for position in range(len(normalized))
+        if position == 0 or normalized[position - 1] == " "
+    ]
+
+
+class StationIndex:
+    """Sorted list of (name key, station id) answering prefix queries
+    with two bisections, stations ranked by popularity then name"""
+
+    def __init__(self, stations=(), popularity=None):
+        self.names = {}
+        self.popularity = dict(popularity or {})
+        entries = []
+        for station_id, name in stations:
+            self.names[station_id] = name
+            entries.extend((key, station_id) for key in name_keys(name))
+        entries.sort()
+        self.entries = entries
+        self.memo = {}
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls):
+        """Stations with the number of routes and journeys from or to them
+        as popularity"""
+        popularity = {}
+        for model in (Route, Journey):
+            for field in ("source", "destination"):
+                for station_id, count in (
+                    model.objects.values_list(field)
+                    .annotate(count=Count("id"))
+                    .order_by()
+                ):
+                    popularity[station_id] = (
+                        popularity.get(station_id, 0) + count
+                    )
+        return cls(
+            Station.objects.values_list("id", "name").iterator(
+                chunk_size=10000
+            ),
+            popularity,
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    def rank(self, station_id):
+        return -self.popularity.get(station_id, 0), self.names[station_id]
+
+    def search(self, query, limit):
+        """Up to limit (id, name) of stations with a word starting with
+        the query"""
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        with self.lock:
+            ranked = self.memo.get(prefix)
+            if ranked is None or len(ranked) < limit:
+                ranked = self._rank(prefix, limit)
+            return [
+                (station_id, self.names[station_id])
+                for station_id in ranked[:limit]
+            ]
+
+    def _rank(self, prefix, limit):
+        start = bisect_left(self.entries, (prefix,))
+        end = bisect_left(self.entries, (prefix + "\x7f",), start)
+        ranked = heapq.nsmallest(
+            max(limit, settings.AUTOCOMPLETE_MAX_RESULTS),
+            {station_id for _, station_id in self.entries[start:end]},
+            key=self.rank,
+        )
+        if end - start > MEMO_MIN_MATCHES:
+            self.memo[prefix] = ranked
+        return ranked
+
+    def warm(self, length=2):
+        """Rank the stations of all prefixes up to length characters,
+        the ones matching most stations"""
+        with self.lock:
+            for prefix in sorted(
+                {key[:size] for key, _ in self.entries
+                 for size in range(1, length + 1)}
+            ):
+                if not prefix.endswith(" "):
+                    self._rank(prefix, settings.AUTOCOMPLETE_MAX_RESULTS)
+
+    def _memoized(self, station_id):
+        """Memoized rankings of prefixes the station matches"""
+        prefixes = {
+            key[:size]
+            for key in name_keys(self.names[station_id])
+            for size in range(1, len(key) + 1)
+        }
+        return [
+            (prefix, self.memo[prefix])
+            for prefix in prefixes
+            if prefix in self.memo
+        ]
+
+    def _promote(self, station_id):
+        """Move a station ranked higher (or new) into memoized rankings"""
+        for prefix, ranked in self._memoized(station_id):
+            if station_id in ranked:
+                ranked.remove(station_id)
+            insort(ranked, station_id, key=self.rank)
+            del ranked[settings.AUTOCOMPLETE_MAX_RESULTS:]
+
+    def _demote(self, station_id):
+        """Forget rankings a station ranked lower (or gone) drops out of,
+        the next station is unknown"""
+        for prefix, ranked in self._memoized(station_id):
+            if station_id in ranked:
+                del self.memo[prefix]
+
+    def add(self, station_id, name):
+        """Insert a station or update its name"""
+        with self.lock:
+            self._remove(station_id)
+            self.names[station_id] = name
+            for key in name_keys(name):
+                insort(self.entries, (key, station_id))
+            self._promote(station_id)
+
+    def remove(self, station_id):
+        with self.lock:
+            self._remove(station_id)
+            self.popularity.pop(station_id, None)
+
+    def _remove(self, station_id):
+        if station_id not in self.names:
+            return
+        self._demote(station_id)
+        for key in name_keys(self.names.pop(station_id)):
+            position = bisect_left(self.entries, (key, station_id))
+            if self.entries[position:position + 1] == [(key, station_id)]:
+                del self.entries[position]
+
+    def add_popularity(self, station_ids, delta):
+        with self.lock:
+            for station_id in station_ids:
+                if station_id not in self.names:
+                    continue
+                if delta < 0:
+                    self._demote(station_id)
+                self.popularity[station_id] = (
+                    self.popularity.get(station_id, 0) + delta
+                )
+                if delta > 0:
+                    self._promote(station_id)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The process wide station index, built lazily and rebuilt after
+    AUTOCOMPLETE_INDEX_TTL_SECONDS to pick up changes of other processes"""
+    global _index
+    with _index_lock:
+        if (
+            _index is None
+            or _index.age() > settings.AUTOCOMPLETE_INDEX_TTL_SECONDS
+        ):
+            _index = StationIndex.from_db()
+            _index.warm()
+        return _index
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def refresh_station(station_id):
+    """Reload a changed or deleted station into a built index"""
+    index = _index
+    if index is None:
+        return
+    name = (
+        Station.objects.filter(id=station_id)
+        .values_list("name", flat=True)
+        .first()
+    )
+    if name is None:
+        index.remove(station_id)
+    else:
+        index.add(station_id, name)
+
+
+def count_stations(station_ids, delta):
+    """Add delta to the popularity of stations in a built index"""
+    index = _index
+    if index is not None:
+        index.add_popularity(station_ids, delta)
+
+
+def autocomplete_stations(query, limit=None):
+    """(id, name) of stations completing the query, see
+    StationIndex.search"""
+    return get_index().search(
+        query, limit or settings.AUTOCOMPLETE_MAX_RESULTS
+    )
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.utils import timezone
+
+from station.caching import new_version, response_cache
+from station.models import Journey
+
+BOARDS = {
+    # kind: (station field, time field, station shown on the board)
+    "departures": ("source", "departure_time", "destination"),
+    "arrivals": ("destination", "arrival_time", "source"),
+}
+
+
+def board_version_key(station_id):
+    return f"station-board-version:{station_id}"
+
+
+def invalidate_boards(*station_ids):
+    """Make cached boards of the stations stale in every process sharing
+    the response cache"""
+    response_cache().set_many(
+        {
+            board_version_key(station_id): new_version()
+            for station_id in station_ids
+        },
+        None,
+    )
+
+
+def board_journeys(station_id, kind, start, limit):
+    """Next journeys departing from (or arriving at) the station, read
+    from the (source, departure_time) or (destination, arrival_time)
+    index"""
+    station_field, time_field, other_station = BOARDS[kind]
+    return list(
+        Journey.objects.filter(
+            **{station_field: station_id, f"{time_field}__gte": start}
+        )
+        .select_related(other_station, "train__train_type")
+        .order_by(time_field, "id")[:limit]
+    )
+
+
+def get_board(station_id, kind, start, limit, serialize):
+    """Serialized board, cached in the response cache for
+    BOARD_CACHE_SECONDS when set.
+
+    start None means from now; such boards are cached as they are and
+    may show a journey that left up to BOARD_CACHE_SECONDS ago.
+    """
+    if not settings.BOARD_CACHE_SECONDS:
+        return serialize(
+            board_journeys(station_id, kind, start or timezone.now(), limit)
+        )
+    cache = response_cache()
+    version = cache.get_or_set(
+        board_version_key(station_id), new_version, None
+    )
+    key = (
+        f"station-board:{kind}:{station_id}:{version}:"
+        f"{start.isoformat() if start else 'now'}:{limit}"
+    )
+    board = cache.get(key)
+    if board is None:
+        board = serialize(
+            board_journeys(station_id, kind, start or timezone.now(), limit)
+        )
+        cache.set(key, board, settings.BOARD_CACHE_SECONDS)
+    return board
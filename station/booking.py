@@ -0,0 +1,491 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from station.exports import record_deletions
+from station.models import (
+    Cancellation,
+    HeldSeat,
+    Journey,
+    Order,
+    SeatHold,
+    Ticket,
+)
+from station.occupancy import SeatMap
+
+
+JOURNEY_LOCK_NAMESPACE = 7301
+OCCUPANCY_FIELDS = ["seat_map", "seats_taken"]
+
+
+class SeatMapChanged(Exception):
+    """Another transaction changed a seat map read without a lock"""
+
+
+class RowLockStrategy:
+    """SELECT ... FOR UPDATE on the journey rows"""
+    name = "row"
+
+    def lock(self, journey_ids):
+        return list(
+            Journey.objects.select_for_update(of=("self",))
+            .select_related("train")
+            .filter(id__in=journey_ids)
+            .order_by("id")
+        )
+
+    def exclusive_lock(self, journey_ids):
+        return self.lock(journey_ids)
+
+    def save(self, journeys):
+        Journey.objects.bulk_update(
+            journeys, OCCUPANCY_FIELDS, batch_size=1000
+        )
+
+
+class AdvisoryLockStrategy(RowLockStrategy):
+    """Transaction level advisory locks keyed by journey id, the journey
+    rows themselves stay unlocked for readers and other writers"""
+    name = "advisory"
+
+    def lock(self, journey_ids):
+        with connection.cursor() as cursor:
+            for journey_id in sorted(journey_ids):
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(%s, %s)",
+                    [JOURNEY_LOCK_NAMESPACE, journey_id & 0x7FFFFFFF],
+                )
+        return list(
+            Journey.objects.select_related("train")
+            .filter(id__in=journey_ids)
+            .order_by("id")
+        )
+
+
+class OptimisticStrategy(RowLockStrategy):
+    """No lock while booking, a seat map is written only if nobody
+    changed it since it was read, otherwise the booking is retried.
+    Releases still take row locks, which the compare-and-set detects."""
+    name = "optimistic"
+
+    def lock(self, journey_ids):
+        journeys = list(
+            Journey.objects.select_related("train")
+            .filter(id__in=journey_ids)
+            .order_by("id")
+        )
+        for journey in journeys:
+            journey.loaded_seat_map = bytes(journey.seat_map)
+        return journeys
+
+    def exclusive_lock(self, journey_ids):
+        return RowLockStrategy.lock(self, journey_ids)
+
+    def save(self, journeys):
+        for journey in journeys:
+            updated = Journey.objects.filter(
+                id=journey.id, seat_map=journey.loaded_seat_map
+            ).update(
+                seat_map=journey.seat_map, seats_taken=journey.seats_taken
+            )
+            if not updated:
+                raise SeatMapChanged
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (RowLockStrategy, AdvisoryLockStrategy, OptimisticStrategy)
+}
+
+
+def get_strategy(name=None):
+    """Concurrency control for seat maps, BOOKING_LOCK_STRATEGY by default"""
+    return STRATEGIES[name or settings.BOOKING_LOCK_STRATEGY]()
+
+
+def lock_journeys(journey_ids):
+    """Lock journeys for a read-modify-write of their seat maps, in id order
+    so concurrent bookings can't deadlock"""
+    return get_strategy().exclusive_lock(journey_ids)
+
+
+def _seats_by_journey(seats_data):
+    seats_by_journey = defaultdict(list)
+    for seat in seats_data:
+        seats_by_journey[seat["journey"].id].append(seat)
+    return seats_by_journey
+
+
+def _find_conflicts(journeys, seats_by_journey):
+    conflicts = []
+    for journey in journeys:
+        for seat in seats_by_journey[journey.id]:
+            if journey.occupancy.is_taken(seat["cargo"], seat["seat"]):
+                conflicts.append(
+                    f"seat {seat["seat"]} in cargo {seat["cargo"]} "
+                    f"of journey {journey.id} is already taken"
+                )
+    return conflicts
+
+
+def take_seats(seats_data, error_to_raise, field="tickets", strategy=None):
+    """Set the requested seats on the journey seat maps.
+
+    Must run inside a transaction. Seats still blocked by holds that
+    have expired but were not swept yet are released on the way.
+    """
+    strategy = strategy or get_strategy()
+    seats_by_journey = _seats_by_journey(seats_data)
+    for _ in range(settings.BOOKING_OPTIMISTIC_RETRIES):
+        try:
+            with transaction.atomic():
+                return _take_seats(
+                    seats_by_journey, error_to_raise, field, strategy
+                )
+        except SeatMapChanged:
+            continue
+    raise error_to_raise(
+        {field: "Journey is too busy at the moment, please try again"}
+    )
+
+
+def _take_seats(seats_by_journey, error_to_raise, field, strategy):
+    journeys = strategy.lock(seats_by_journey)
+    conflicts = _find_conflicts(journeys, seats_by_journey)
+    if conflicts:
+        expired = SeatHold.objects.filter(
+            expires_at__lte=timezone.now(),
+            seats__journey_id__in=seats_by_journey,
+        )
+        if release_holds(expired, skip_locked=True):
+            journeys = strategy.lock(seats_by_journey)
+            conflicts = _find_conflicts(journeys, seats_by_journey)
+    if conflicts:
+        raise error_to_raise({field: conflicts})
+
+    for journey in journeys:
+        for seat in seats_by_journey[journey.id]:
+            journey.occupancy.take(seat["cargo"], seat["seat"])
+        journey.store_occupancy()
+    strategy.save(journeys)
+
+
+def book_tickets(order, tickets_data, error_to_raise, strategy=None):
+    """Take the seats on the journey seat maps and insert all tickets
+    of the order with a single bulk statement.
+
+    Ticket ranges must be validated beforehand (see Ticket.validate_ticket),
+    bulk_create skips Ticket.save().
+    """
+    try:
+        with transaction.atomic():
+            take_seats(tickets_data, error_to_raise, strategy=strategy)
+            return Ticket.objects.bulk_create(
+                Ticket(order=order, **ticket) for ticket in tickets_data
+            )
+    except IntegrityError:
+        raise error_to_raise(
+            {"tickets": "Some of the seats have already been taken"}
+        )
+
+
+def hold_seats(hold, seats_data, error_to_raise):
+    """Reserve seats for the hold, the same way book_tickets books them"""
+    try:
+        with transaction.atomic():
+            take_seats(seats_data, error_to_raise, field="seats")
+            return HeldSeat.objects.bulk_create(
+                HeldSeat(hold=hold, **seat) for seat in seats_data
+            )
+    except IntegrityError:
+        raise error_to_raise(
+            {"seats": "Some of the seats have already been taken"}
+        )
+
+
+def confirm_hold(hold_id, user, error_to_raise):
+    """Turn a live hold into an order.
+
+    Seats stay taken on the seat maps, so no seat map is touched.
+    """
+    with transaction.atomic():
+        hold = (
+            SeatHold.objects.select_for_update()
+            .filter(id=hold_id, user=user)
+            .first()
+        )
+        if hold is None or hold.expires_at <= timezone.now():
+            raise error_to_raise({"hold": "Hold has expired"})
+        held_seats = list(hold.seats.all())
+        if not held_seats:
+            raise error_to_raise({"hold": "Hold has no seats left"})
+        order = Order.objects.create(user=user)
+        hold.delete()
+        Ticket.objects.bulk_create(
+            Ticket(
+                order=order,
+                journey_id=seat.journey_id,
+                cargo=seat.cargo,
+                seat=seat.seat,
+            )
+            for seat in held_seats
+        )
+        return order
+
+
+def assign_seats(user, journey_id, count, together, error_to_raise,
+                 minutes=None, book=False):
+    """Pick free seats on the locked seat map and hold or book them.
+
+    Returns the created SeatHold, or the Order when book is set.
+    """
+    with transaction.atomic():
+        release_holds(
+            SeatHold.objects.filter(
+                expires_at__lte=timezone.now(), seats__journey_id=journey_id
+            ),
+            skip_locked=True,
+        )
+        journey = lock_journeys([journey_id])[0]
+        seats = journey.occupancy.find_free_seats(count, together)
+        if seats is None:
+            raise error_to_raise(
+                {
+                    "count": f"Only {journey.occupancy.free_count()} "
+                             f"seats are free"
+                }
+            )
+        seats_data = [
+            {"journey": journey, "cargo": cargo, "seat": seat}
+            for cargo, seat in seats
+        ]
+        if book:
+            order = Order.objects.create(user=user)
+            book_tickets(order, seats_data, error_to_raise)
+            return order
+        hold = SeatHold.objects.create(
+            user=user,
+            expires_at=timezone.now() + timezone.timedelta(
+                minutes=minutes or settings.SEAT_HOLD_MINUTES
+            ),
+        )
+        hold_seats(hold, seats_data, error_to_raise)
+        return hold
+
+
+def release_holds(holds, skip_locked=False):
+    """Delete holds and free their seats with set-based statements.
+
+    The holds are locked first, so a hold confirmed meanwhile is skipped
+    once its confirmation commits and its seats stay taken. Bookings
+    releasing expired holds on the way pass skip_locked: a hold locked by
+    a confirmation or the sweeper is left to them. Returns the number of
+    released holds.
+    """
+    with transaction.atomic():
+        hold_ids = list(
+            SeatHold.objects.select_for_update(skip_locked=skip_locked)
+            .filter(id__in=holds.values("id"))
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if not hold_ids:
+            return 0
+        seats_by_journey = defaultdict(list)
+        for journey_id, cargo, seat in HeldSeat.objects.filter(
+            hold_id__in=hold_ids
+        ).values_list("journey_id", "cargo", "seat"):
+            seats_by_journey[journey_id].append((cargo, seat))
+
+        journeys = lock_journeys(seats_by_journey)
+        for journey in journeys:
+            for cargo, seat in seats_by_journey[journey.id]:
+                if journey.occupancy.contains(cargo, seat):
+                    journey.occupancy.release(cargo, seat)
+            journey.store_occupancy()
+        Journey.objects.bulk_update(
+            journeys, OCCUPANCY_FIELDS, batch_size=1000
+        )
+        SeatHold.objects.filter(id__in=hold_ids).delete()
+        return len(hold_ids)
+
+
+def _delete_tickets(tickets):
+    """Delete tickets with one statement, without the per-ticket
+    post_delete signal: callers release the seats in bulk themselves.
+
+    QuerySet._raw_delete() is private Django API, used on purpose: the
+    public delete() collects every ticket to send the signal, and
+    disconnecting the receiver would drop it for other threads too.
+    Ticket has no relations to cascade, so nothing else is skipped; the
+    deletions the receivers would record for exports are recorded here.
+    """
+    record_deletions(tickets)
+    return tickets._raw_delete(tickets.db)
+
+
+def _release_tickets(tickets):
+    """Free the seats of the tickets and delete them with set-based
+    statements. Returns the number of deleted tickets."""
+    seats_by_journey = defaultdict(list)
+    for journey_id, cargo, seat in tickets.values_list(
+        "journey_id", "cargo", "seat"
+    ):
+        seats_by_journey[journey_id].append((cargo, seat))
+    if not seats_by_journey:
+        return 0
+
+    journeys = lock_journeys(seats_by_journey)
+    for journey in journeys:
+        for cargo, seat in seats_by_journey[journey.id]:
+            if journey.occupancy.contains(cargo, seat):
+                journey.occupancy.release(cargo, seat)
+        journey.store_occupancy()
+    Journey.objects.bulk_update(
+        journeys, OCCUPANCY_FIELDS, batch_size=1000
+    )
+    return _delete_tickets(tickets)
+
+
+def cancel_order(order_id, user, error_to_raise, reason=""):
+    """Release all tickets of the order and record the cancellation.
+
+    An order without tickets, e.g. cancelled already, is rejected.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(id=order_id)
+        released = _release_tickets(Ticket.objects.filter(order=order))
+        if not released:
+            raise error_to_raise(
+                {"order": "Order has no tickets left to cancel"}
+            )
+        return Cancellation.objects.create(
+            cancelled_by=user,
+            order=order,
+            tickets_released=released,
+            reason=reason,
+        )
+
+
+def delete_order(order_id):
+    """Delete the order, its seats released as by cancel_order rather
+    than a ticket at a time by the post_delete signal"""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(id=order_id)
+        _release_tickets(Ticket.objects.filter(order=order))
+        order.delete()
+
+
+def cancel_journey(journey_id, user, reason=""):
+    """Release every ticket and held seat of the journey.
+
+    Holds with seats on the journey are released as a whole, a hold is
+    confirmed with all its seats or not at all. Records one cancellation
+    per affected order and one for the whole journey. The number of
+    statements does not depend on the number of tickets.
+    """
+    with transaction.atomic():
+        journey = lock_journeys([journey_id])[0]
+        # before the tickets, so the tickets of holds confirmed while
+        # waiting for their locks are released as well
+        hold_ids = list(
+            SeatHold.objects.filter(seats__journey=journey)
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        if hold_ids:
+            release_holds(SeatHold.objects.filter(id__in=hold_ids))
+        tickets = Ticket.objects.filter(journey=journey)
+        per_order = list(
+            tickets.order_by()
+            .values_list("order_id")
+            .annotate(count=Count("id"))
+        )
+        released = _delete_tickets(tickets)
+        journey.occupancy = SeatMap(
+            journey.train.cargo_num, journey.train.places_in_cargo
+        )
+        journey.store_occupancy()
+        Journey.objects.filter(id=journey.id).update(
+            seat_map=journey.seat_map, seats_taken=journey.seats_taken
+        )
+        cancellations = Cancellation.objects.bulk_create(
+            [
+                Cancellation(
+                    cancelled_by=user,
+                    journey=journey,
+                    tickets_released=released,
+                    reason=reason,
+                )
+            ] + [
+                Cancellation(
+                    cancelled_by=user,
+                    order_id=order_id,
+                    journey=journey,
+                    tickets_released=count,
+                    reason=reason,
+                )
+                for order_id, count in per_order
+            ]
+        )
+        return cancellations[0]
+
+
+def release_seats(journey_id, seats):
+    """Clear (cargo, seat) pairs from the seat map of one journey"""
+    with transaction.atomic():
+        journeys = lock_journeys([journey_id])
+        if not journeys:
+            return
+        journey = journeys[0]
+        for cargo, seat in seats:
+            if journey.occupancy.contains(cargo, seat):
+                journey.occupancy.release(cargo, seat)
+        journey.store_occupancy()
+        Journey.objects.filter(id=journey.id).update(
+            seat_map=journey.seat_map, seats_taken=journey.seats_taken
+        )
+
+
+def rebuild_seat_maps(journeys):
+    """Recompute seat maps and counters of the given journeys from their
+    tickets and held seats.
+
+    Only journeys that drifted are written. Returns them as
+    (journey id, stored seats_taken, actual seats_taken) tuples.
+    """
+    with transaction.atomic():
+        journeys = lock_journeys(list(journeys.values_list("id", flat=True)))
+        seat_maps = {
+            journey.id: SeatMap(
+                journey.train.cargo_num, journey.train.places_in_cargo
+            )
+            for journey in journeys
+        }
+        for model in (Ticket, HeldSeat):
+            taken = model.objects.filter(
+                journey_id__in=seat_maps
+            ).values_list("journey_id", "cargo", "seat")
+            for journey_id, cargo, seat in taken:
+                if seat_maps[journey_id].contains(cargo, seat):
+                    seat_maps[journey_id].take(cargo, seat)
+
+        drifted = []
+        stored_taken = {}
+        for journey in journeys:
+            stored = (bytes(journey.seat_map), journey.seats_taken)
+            stored_taken[journey.id] = journey.seats_taken
+            journey.occupancy = seat_maps[journey.id]
+            journey.store_occupancy()
+            if stored != (journey.seat_map, journey.seats_taken):
+                drifted.append(journey)
+        Journey.objects.bulk_update(
+            drifted, OCCUPANCY_FIELDS, batch_size=1000
+        )
+    return [
+        (journey.id, stored_taken[journey.id], journey.seats_taken)
+        for journey in drifted
+    ]
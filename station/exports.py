@@ -0,0 +1,111 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Func, TextField
+from django.utils import timezone
+
+from station.models import Deletion, Journey, Route, Ticket
+
+
+class JSONText(Func):
+    """A value as the text of its JSON, ISO 8601 for dates and times.
+    Postgres formats them faster than they are parsed into datetimes and
+    formatted back."""
+    template = "to_json(%(expressions)s) #>> '{}'"
+    output_field = TextField()
+
+
+class Export(NamedTuple):
+    """A table export: columns named after the field paths or expressions
+    they read and the field since filters on"""
+    model: type
+    columns: dict
+    since_field: str
+
+
+EXPORTS = {
+    "journeys": Export(
+        Journey,
+        {
+            "id": "id",
+            "route": "route",
+            "source": "source",
+            "destination": "destination",
+            "train": "train",
+            "departure_time": JSONText("departure_time"),
+            "arrival_time": JSONText("arrival_time"),
+            "service_pattern": "service_pattern",
+            "service_date": JSONText("service_date"),
+            "updated_at": JSONText("updated_at"),
+        },
+        "updated_at",
+    ),
+    "routes": Export(
+        Route,
+        {
+            "id": "id",
+            "source": "source",
+            "destination": "destination",
+            "distance": "distance",
+            "updated_at": JSONText("updated_at"),
+        },
+        "updated_at",
+    ),
+    # a row per ticket, tickets aren't edited once placed; cancelled ones
+    # are deleted and listed by "deletions"
+    "orders": Export(
+        Ticket,
+        {
+            "order": "order",
+            "user": "order__user",
+            "created_at": JSONText("order__created_at"),
+            "ticket": "id",
+            "journey": "journey",
+            "cargo": "cargo",
+            "seat": "seat",
+        },
+        "order__created_at",
+    ),
+    # rows deleted from the tables above, by the export they were in
+    "deletions": Export(
+        Deletion,
+        {
+            "id": "id",
+            "export": "export",
+            "row": "row_id",
+            "deleted_at": JSONText("deleted_at"),
+        },
+        "deleted_at",
+    ),
+}
+
+# the export each model's deleted rows are recorded for
+DELETED_EXPORTS = {Journey: "journeys", Route: "routes", Ticket: "orders"}
+
+
+def record_deletions(rows):
+    """Record the rows of the queryset as deleted with one INSERT ...
+    SELECT, for rows deleted without the post_delete signal"""
+    sql, params = rows.order_by().values_list("id").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {Deletion._meta.db_table} "
+            f"(export, row_id, deleted_at) "
+            f"SELECT %s, id, %s FROM ({sql}) AS deleted",
+            [DELETED_EXPORTS[rows.model], timezone.now(), *params],
+        )
+
+
+def export_rows(export, since=None):
+    """Value tuples of the export's columns in id order, changed since
+    when given, read from a server side cursor EXPORT_CHUNK_SIZE rows at
+    a time"""
+    queryset = export.model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(**{f"{export.since_field}__gte": since})
+    return (
+        queryset.order_by("id")
+        .values_list(*export.columns.values())
+        .iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
@@ -0,0 +1,39 @@
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from station.models import Train
+
+
+def facility_ids_subquery(through):
+    """Sorted facility ids of the outer train from the M2M table"""
+    return Coalesce(
+        Subquery(
+            through.objects.filter(train_id=OuterRef("id"))
+            .values("train_id")
+            .annotate(ids=ArrayAgg("facility_id", ordering="facility_id"))
+            .values("ids")
+        ),
+        Value([], output_field=ArrayField(IntegerField())),
+    )
+
+
+def sync_facility_ids(trains=None):
+    """Copy Train.facilities into Train.facility_ids with one UPDATE"""
+    trains = Train.objects.all() if trains is None else trains
+    trains.update(facility_ids=facility_ids_subquery(Train.facilities.through))
+
+
+def filter_facilities(queryset, any_of=None, all_of=None, prefix=""):
+    """Trains (or journeys with prefix "train__") having any of and all
+    of the facility ids, each a GIN indexed array predicate"""
+    if any_of:
+        queryset = queryset.filter(
+            **{f"{prefix}facility_ids__overlap": sorted(set(any_of))}
+        )
+    if all_of:
+        queryset = queryset.filter(
+            **{f"{prefix}facility_ids__contains": sorted(set(all_of))}
+        )
+    return queryset
@@ -0,0 +1,160 @@
+from typing import NamedTuple
+
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type={"type": "array", "items": {"type": "string"}},
+        description="Only these response fields ex. ?fields=id,route",
+        required=False,
+    ),
+    OpenApiParameter(
+        "expand",
+        type={"type": "array", "items": {"type": "string"}},
+        description=(
+            "Nest only these relations, the others are given as ids "
+            "ex. ?expand=train (?expand= nests none)"
+        ),
+        required=False,
+    ),
+]
+
+
+class FieldQuery(NamedTuple):
+    """What serializing a field reads: columns of the model, relations
+    to join and relations to prefetch"""
+    columns: tuple = ()
+    select_related: tuple = ()
+    prefetch_related: tuple = ()
+
+
+def names_param(query_params, name):
+    """Comma separated names of a query parameter, None when not given"""
+    value = query_params.get(name)
+    if value is None:
+        return None
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+class DynamicFieldsMixin:
+    """Serializer taking fields, the names of the fields to keep, and
+    expand, the relations of Meta.expandable to nest; the other
+    expandable relations are given as primary keys.
+
+    Meta.field_queries maps field names to the FieldQuery serializing
+    them needs (fields of a model column of the same name need none) and
+    Meta.expandable maps relations to the FieldQuery of their primary
+    keys, so trim_queryset loads only what the kept fields read.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, "expandable", {})
+        errors = {}
+        unknown = set(fields or ()) - set(self.fields)
+        if unknown:
+            errors["fields"] = f"Unknown fields: {', '.join(sorted(unknown))}"
+        unknown = set(expand or ()) - set(expandable)
+        if unknown:
+            errors["expand"] = (
+                f"Can't expand: {', '.join(sorted(unknown))}"
+            )
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        self.expanded = set(expandable) if expand is None else set(expand)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                del self.fields[name]
+        for name in set(expandable) - self.expanded:
+            if name in self.fields:
+                self.fields[name] = self.collapse(name, self.fields[name])
+
+    @staticmethod
+    def collapse(name, field):
+        """Primary key field in place of a nested relation"""
+        return serializers.PrimaryKeyRelatedField(
+            read_only=True,
+            many=isinstance(
+                field,
+                (serializers.ListSerializer, serializers.ManyRelatedField),
+            ),
+            **({"source": field.source} if field.source != name else {}),
+        )
+
+    def trim_queryset(self, queryset, columns=()):
+        """The queryset loading only the columns and relations the fields
+        read, plus columns"""
+        field_queries = getattr(self.Meta, "field_queries", {})
+        expandable = getattr(self.Meta, "expandable", {})
+        model_fields = {
+            field.name for field in self.Meta.model._meta.concrete_fields
+        }
+        columns = {"pk", *columns}
+        select_related = set()
+        prefetch_related = set()
+        all_columns = False
+        for name, field in self.fields.items():
+            if name in expandable and name not in self.expanded:
+                query = expandable[name]
+            elif name in field_queries:
+                query = field_queries[name]
+            elif field.source in model_fields:
+                query = FieldQuery(columns=(field.source,))
+            else:
+                # can't tell what the field reads
+                all_columns = True
+                continue
+            columns.update(query.columns)
+            # a joined relation's column can't be deferred
+            columns.update(
+                path.split("__")[0] for path in query.select_related
+            )
+            select_related.update(query.select_related)
+            prefetch_related.update(query.prefetch_related)
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(prefetch_related))
+        if not all_columns:
+            queryset = queryset.only(*sorted(columns))
+        return queryset
+
+
+class SparseFieldsetMixin:
+    """?fields= and ?expand= on list and retrieve, see
+    DynamicFieldsMixin. Given either, the queryset joins, prefetches and
+    selects only what the response needs."""
+    fieldset_actions = ("list", "retrieve")
+
+    def fieldset(self):
+        fields = names_param(self.request.query_params, "fields")
+        return {
+            "fields": fields or None,
+            "expand": names_param(self.request.query_params, "expand"),
+        }
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.fieldset_actions:
+            kwargs = {**self.fieldset(), **kwargs}
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.fieldset_actions or not any(
+            value is not None for value in self.fieldset().values()
+        ):
+            return queryset
+        ordering = ()
+        if self.action == "list" and self.paginator is not None:
+            # cursor pagination reads the ordering fields of the last row
+            ordering = getattr(self.paginator, "ordering", ())
+            if isinstance(ordering, str):
+                ordering = (ordering,)
+        return self.get_serializer().trim_queryset(
+            queryset, [field.lstrip("-") for field in ordering]
+        )
@@ -0,0 +1,44 @@
+from math import asin, cos, degrees, radians, sin, sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2):
+    """Great-circle distance in kilometres between two points in degrees"""
+    latitude1, longitude1, latitude2, longitude2 = map(
+        radians, (latitude1, longitude1, latitude2, longitude2)
+    )
+    a = (
+        sin((latitude2 - latitude1) / 2) ** 2
+        + cos(latitude1) * cos(latitude2)
+        * sin((longitude2 - longitude1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min latitude, max latitude, longitude ranges) of a box around all
+    points within radius_km. Boxes crossing the antimeridian get two
+    longitude ranges, boxes reaching a pole span all longitudes."""
+    angular = radius_km / EARTH_RADIUS_KM
+    min_latitude = latitude - degrees(angular)
+    max_latitude = latitude + degrees(angular)
+    if min_latitude <= -90 or max_latitude >= 90:
+        return max(min_latitude, -90), min(max_latitude, 90), [(-180, 180)]
+    delta = degrees(asin(min(1.0, sin(angular) / cos(radians(latitude)))))
+    return (
+        min_latitude,
+        max_latitude,
+        longitude_ranges(longitude - delta, longitude + delta),
+    )
+
+
+def longitude_ranges(west, east):
+    """Split a west -> east longitude span at the antimeridian"""
+    if east - west >= 360:
+        return [(-180, 180)]
+    west = (west + 180) % 360 - 180
+    east = (east + 180) % 360 - 180
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180), (-180, east)]
@@ -0,0 +1,192 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count
+
+from station.geo import haversine
+from station.models import Route, Station
+
+
+class StationGraph:
+    """Stations connected by routes, weighted by Route.distance.
+
+    Edges are directed like routes and stored in compressed sparse row
+    form: the edges leaving station index i are offsets[i] to
+    offsets[i + 1] of targets, weights and routes.
+    """
+
+    def __init__(self, stations, edges):
+        """stations: (id, latitude, longitude),
+        edges: (route id, source id, destination id, distance)"""
+        self.ids = array("q")
+        self.latitude = array("d")
+        self.longitude = array("d")
+        for station_id, latitude, longitude in stations:
+            self.ids.append(station_id)
+            self.latitude.append(float(latitude))
+            self.longitude.append(float(longitude))
+        self.index = {
+            station_id: index for index, station_id in enumerate(self.ids)
+        }
+
+        edges = sorted(
+            (self.index[source], self.index[destination], distance, route)
+            for route, source, destination, distance in edges
+            if source in self.index and destination in self.index
+        )
+        self.offsets = array("q", [0] * (len(self.ids) + 1))
+        for source, *_ in edges:
+            self.offsets[source + 1] += 1
+        for index in range(len(self.ids)):
+            self.offsets[index + 1] += self.offsets[index]
+        self.targets = array("q", (edge[1] for edge in edges))
+        self.weights = array("q", (edge[2] for edge in edges))
+        self.routes = array("q", (edge[3] for edge in edges))
+
+        # the smallest distance / great-circle distance of any route
+        # scales the A* heuristic so it never overestimates
+        ratios = [
+            distance / crow_flies
+            for source, target, distance, _ in edges
+            if (crow_flies := self.crow_flies(source, target)) > 0
+        ]
+        self.heuristic_scale = max(0.0, min(ratios, default=0.0))
+
+        self.trees = {}
+        self.cache = OrderedDict()
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls):
+        return cls(
+            Station.objects.values_list("id", "latitude", "longitude"),
+            Route.objects.values_list(
+                "id", "source_id", "destination_id", "distance"
+            ),
+        )
+
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    def crow_flies(self, source, target):
+        return haversine(
+            self.latitude[source],
+            self.longitude[source],
+            self.latitude[target],
+            self.longitude[target],
+        )
+
+    def search(self, source, target=None, heuristic=True):
+        """Dijkstra, or A* towards target, over station indexes.
+
+        Returns (distances, parents, number of settled stations), parents
+        map a station to the (station, edge) it is reached from.
+        Without target the whole shortest path tree is built.
+        """
+        scale = self.heuristic_scale if heuristic and target is not None else 0
+
+        def estimate(index):
+            return scale * self.crow_flies(index, target) if scale else 0
+
+        distances = {source: 0}
+        parents = {}
+        settled = set()
+        queue = [(estimate(source), 0, source)]
+        while queue:
+            _, distance, station = heapq.heappop(queue)
+            if station in settled:
+                continue
+            settled.add(station)
+            if station == target:
+                break
+            for edge in range(
+                self.offsets[station], self.offsets[station + 1]
+            ):
+                neighbour = self.targets[edge]
+                candidate = distance + self.weights[edge]
+                if candidate < distances.get(neighbour, candidate + 1):
+                    distances[neighbour] = candidate
+                    parents[neighbour] = (station, edge)
+                    heapq.heappush(
+                        queue,
+                        (candidate + estimate(neighbour), candidate,
+                         neighbour),
+                    )
+        return distances, parents, len(settled)
+
+    def precompute(self, station_ids):
+        """Keep full shortest path trees of frequently asked sources"""
+        for station_id in station_ids:
+            if station_id in self.index:
+                distances, parents, _ = self.search(self.index[station_id])
+                self.trees[self.index[station_id]] = (distances, parents)
+
+    def shortest_path(self, source_id, target_id):
+        """(distance, station ids, route ids) or None without a path"""
+        key = (source_id, target_id)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        result = None
+        if source_id in self.index and target_id in self.index:
+            source = self.index[source_id]
+            target = self.index[target_id]
+            if source in self.trees:
+                distances, parents = self.trees[source]
+            else:
+                distances, parents, _ = self.search(source, target)
+            if target in distances:
+                result = self._path(source, target, distances, parents)
+        with self.lock:
+            self.cache[key] = result
+            if len(self.cache) > settings.SHORTEST_PATH_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return result
+
+    def _path(self, source, target, distances, parents):
+        stations = [self.ids[target]]
+        routes = []
+        station = target
+        while station != source:
+            station, edge = parents[station]
+            routes.append(self.routes[edge])
+            stations.append(self.ids[station])
+        return distances[target], stations[::-1], routes[::-1]
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The process wide station graph, built lazily with the trees of the
+    SHORTEST_PATH_HOT_SOURCES busiest stations and rebuilt after
+    SHORTEST_PATH_GRAPH_TTL_SECONDS to pick up changes of other processes"""
+    global _graph
+    with _graph_lock:
+        if (
+            _graph is None
+            or _graph.age() > settings.SHORTEST_PATH_GRAPH_TTL_SECONDS
+        ):
+            _graph = StationGraph.from_db()
+            if settings.SHORTEST_PATH_HOT_SOURCES:
+                _graph.precompute(
+                    Station.objects.annotate(routes=Count("route_from"))
+                    .order_by("-routes")
+                    .values_list("id", flat=True)[
+                        :settings.SHORTEST_PATH_HOT_SOURCES
+                    ]
+                )
+        return _graph
+
+
+def reset_graph():
+    global _graph
+    with _graph_lock:
+        _graph = None
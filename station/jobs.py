@@ -0,0 +1,152 @@
+import logging
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from station.models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a job task under the given name"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, *args, run_at=None, max_attempts=None, **kwargs):
+    if task_name not in TASKS:
+        raise KeyError(f"Unknown task {task_name}")
+    return Job.objects.create(
+        task=task_name,
+        args=list(args),
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before the next attempt, doubling every time"""
+    return min(
+        settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.JOB_RETRY_BACKOFF_MAX_SECONDS,
+    )
+
+
+def claim_jobs(batch_size):
+    """Mark up to batch_size due jobs as running and return them.
+
+    Rows locked by other workers are skipped, so workers never wait
+    for each other and never claim the same job.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, run_at__lte=now)
+            .order_by("run_at")[:batch_size]
+        )
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=Job.RUNNING,
+                locked_at=now,
+                attempts=F("attempts") + 1,
+            )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def run_jobs(jobs):
+    """Run claimed jobs, then record results with one update per outcome"""
+    done = []
+    for job in jobs:
+        try:
+            TASKS[job.task](*job.args, **job.kwargs)
+        except Exception:
+            logger.exception("Job %s (%s) failed", job.id, job.task)
+            fail_job(job, traceback.format_exc())
+        else:
+            done.append(job.id)
+    if done:
+        Job.objects.filter(id__in=done).update(
+            status=Job.DONE, finished_at=timezone.now()
+        )
+    return len(done)
+
+
+def fail_job(job, error):
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        Job.objects.filter(id=job.id).update(
+            status=Job.PENDING,
+            run_at=now + timezone.timedelta(seconds=backoff(job.attempts)),
+            last_error=error,
+        )
+    else:
+        Job.objects.filter(id=job.id).update(
+            status=Job.FAILED, finished_at=now, last_error=error
+        )
+
+
+def requeue_stale_jobs(timeout_seconds):
+    """Give jobs of crashed workers back to the queue"""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timezone.timedelta(
+            seconds=timeout_seconds
+        ),
+    ).update(status=Job.PENDING, locked_at=None)
+
+
+def work(batch_size, poll_interval, stop, stop_when_empty=False):
+    """Claim and run jobs until stop is set (or the queue is empty)"""
+    processed = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            jobs = claim_jobs(batch_size)
+            if not jobs:
+                if stop_when_empty:
+                    break
+                stop.wait(poll_interval)
+                continue
+            run_jobs(jobs)
+            processed += len(jobs)
+    finally:
+        connection.close()
+    return processed
+
+
+def run_worker(concurrency=1, batch_size=10, poll_interval=1.0,
+               stop=None, stop_when_empty=False):
+    """Run concurrency worker threads, each with its own DB connection.
+
+    Returns the number of processed jobs.
+    """
+    stop = stop or threading.Event()
+    processed = []
+
+    def target():
+        processed.append(
+            work(batch_size, poll_interval, stop, stop_when_empty)
+        )
+
+    threads = [
+        threading.Thread(target=target, name=f"job-worker-{number}")
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(processed)
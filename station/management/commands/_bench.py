@@ -0,0 +1,191 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from station.models import Journey, Route, Station, Train, TrainType
+from station.names import normalize_name
+
+SYLLABLES = [
+    "ber", "lin", "wien", "pra", "ha", "kra", "ków", "ky", "iv", "lviv",
+    "brno", "gdań", "sk", "poz", "nań", "dres", "den", "mün", "chen",
+    "zü", "rich", "bra", "ti", "sla", "va", "lju", "blja", "na", "graz",
+    "Київ", "Львів", "Одеса", "ost", "west", "nord", "süd", "bad", "neu",
+]
+SUFFIXES = ["", "", "", " Hbf", " Główny", " Central", "-Пасажирський"]
+
+JOURNEYS_SQL = """
+    INSERT INTO station_journey
+        (route_id, source_id, destination_id, train_id, departure_time,
+         arrival_time, seat_map, seats_taken)
+    SELECT
+        route.id, route.source_id, route.destination_id, %(train)s,
+        %(start)s + ((g * 104729) %% %(minutes)s) * interval '1 minute',
+        %(start)s + ((g * 104729) %% %(minutes)s + 90)
+            * interval '1 minute',
+        '', 0
+    FROM generate_series(1::bigint, %(journeys)s) AS g
+    JOIN station_route AS route
+        ON route.id = (%(routes)s::bigint[])[1 + (g * 7919) %% %(route_count)s]
+"""
+
+
+class Rollback(Exception):
+    """Raised to discard everything a benchmark wrote"""
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back"""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+class QueryCounter:
+    """connection.execute_wrapper that counts executed statements"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, repeat=5):
+    """Return (median ms, queries per run) of func() run in savepoints"""
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with transaction.atomic():
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = counter.count
+            transaction.set_rollback(True)
+    return statistics.median(timings), queries
+
+
+def bench_cleanup():
+    """Delete data committed by benchmarks that can't run in a rollback"""
+    get_user_model().objects.filter(email="bench@bench.local").delete()
+    TrainType.objects.filter(name="Bench").delete()
+    Station.objects.filter(name__startswith="Bench ").delete()
+
+
+def bench_user():
+    return get_user_model().objects.create_user(
+        email="bench@bench.local", password="bench_password"
+    )
+
+
+def bench_journey(cargo_num=10, places_in_cargo=60, number=990001):
+    train_type, _ = TrainType.objects.get_or_create(name="Bench")
+    train = Train.objects.create(
+        number=number,
+        cargo_num=cargo_num,
+        places_in_cargo=places_in_cargo,
+        train_type=train_type,
+    )
+    source = Station.objects.create(
+        name=f"Bench source {number}", latitude=48.1, longitude=17.1
+    )
+    destination = Station.objects.create(
+        name=f"Bench destination {number}", latitude=48.2, longitude=16.4
+    )
+    route = Route.objects.create(
+        source=source, destination=destination, distance=80
+    )
+    departure_time = timezone.now() + timezone.timedelta(days=1)
+    return Journey.objects.create(
+        route=route,
+        train=train,
+        departure_time=departure_time,
+        arrival_time=departure_time + timezone.timedelta(hours=1),
+    )
+
+
+def bench_stations(count, seed=1):
+    """Bulk create count stations with made up, partly accented names
+    spread over Europe; use inside rolled_back(). Names of stations
+    already in the DB, e.g. loaded from the fixture, are not reused."""
+    rng = random.Random(seed)
+    taken = set(Station.objects.values_list("name", flat=True))
+    names = set()
+    while len(names) < count:
+        name = "".join(
+            rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))
+        ).capitalize() + rng.choice(SUFFIXES)
+        number = len(names)
+        while name in names or name in taken:
+            name = f"{name.rsplit(" #", 1)[0]} #{number}"
+            number += 1
+        names.add(name)
+    return Station.objects.bulk_create(
+        [
+            Station(
+                name=name,
+                search_name=normalize_name(name),
+                latitude=round(rng.uniform(36, 70), 7),
+                longitude=round(rng.uniform(-10, 40), 7),
+            )
+            for name in sorted(names)
+        ],
+        batch_size=5000,
+    )
+
+
+def bench_timetable(journeys, stations=2000, routes=20000, days=365,
+                    seed=1):
+    """Generate stations, routes and journeys spread over days from
+    today with one INSERT ... SELECT; use inside rolled_back().
+    Returns the routes."""
+    rng = random.Random(seed)
+    station_ids = [station.id for station in bench_stations(stations, seed)]
+    pairs = set()
+    while len(pairs) < routes:
+        pairs.add(tuple(rng.sample(station_ids, 2)))
+    routes = Route.objects.bulk_create(
+        [
+            Route(
+                source_id=source,
+                destination_id=destination,
+                distance=rng.randint(10, 900),
+            )
+            for source, destination in pairs
+        ],
+        batch_size=5000,
+    )
+    train_type, _ = TrainType.objects.get_or_create(name="Bench")
+    train = Train.objects.create(
+        number=990001, cargo_num=10, places_in_cargo=60,
+        train_type=train_type,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            JOURNEYS_SQL,
+            {
+                "routes": [route.id for route in routes],
+                "route_count": len(routes),
+                "train": train.id,
+                "start": timezone.now().replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                ),
+                "minutes": days * 24 * 60,
+                "journeys": journeys,
+            },
+        )
+        cursor.execute(
+            "ANALYZE station_station, station_route, station_journey"
+        )
+    return routes
@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from station.autocomplete import StationIndex
+from station.management.commands._bench import (
+    bench_timetable,
+    measure,
+    rolled_back,
+)
+from station.models import Station
+
+QUERIES = ["b", "br", "bra", "brat", "hbf", "ky", "kyiv p", "mun", "zzz"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Times station autocomplete from the in-memory prefix index "
+        "against a name__icontains query on generated stations. Nothing "
+        "is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=200000)
+        parser.add_argument("--routes", type=int, default=200000)
+        parser.add_argument("--journeys", type=int, default=500000)
+        parser.add_argument("--repeat", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            bench_timetable(
+                options["journeys"], options["stations"], options["routes"]
+            )
+            start = time.perf_counter()
+            index = StationIndex.from_db()
+            built = time.perf_counter() - start
+            start = time.perf_counter()
+            index.warm()
+            self.stdout.write(
+                f"{len(index)} stations, {len(index.entries)} keys, index "
+                f"built in {built:.2f} s, {len(index.memo)} prefixes "
+                f"ranked in {time.perf_counter() - start:.2f} s"
+            )
+            bumps = list(index.names)[:1000]
+            start = time.perf_counter()
+            for station_id in bumps:
+                index.add_popularity([station_id], 1)
+            self.stdout.write(
+                f"popularity update: "
+                f"{(time.perf_counter() - start) * 1e6 / len(bumps):.1f} µs"
+            )
+            self.stdout.write(
+                f"{'query':>8} {'rows':>8} {'unranked µs':>14} "
+                f"{'index µs':>14} {'icontains ms':>13}"
+            )
+            warm_memo = dict(index.memo)
+            for query in QUERIES:
+                index.memo.clear()
+                start = time.perf_counter()
+                index.search(query, 10)
+                cold = (time.perf_counter() - start) * 1e6
+                index.memo.update(warm_memo)
+                timings = []
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    index.search(query, 10)
+                    timings.append((time.perf_counter() - start) * 1e6)
+                queryset = Station.objects.filter(name__icontains=query)
+                ms, _ = measure(lambda: list(queryset[:10]), 5)
+                self.stdout.write(
+                    f"{query:>8} {queryset.count():>8} {cold:>14.1f} "
+                    f"{statistics.median(timings):>14.1f} {ms:>13.2f}"
+                )
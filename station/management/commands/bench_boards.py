@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+
+from station.boards import get_board
+from station.caching import response_cache
+from station.management.commands._bench import (
+    bench_timetable,
+    measure,
+    rolled_back,
+)
+from station.models import Journey
+from station.serializers import DepartureSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Times a station departures board on a generated journey table: "
+        "filtering through the route join, the (source, departure_time) "
+        "index and the cached board. Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=2000000)
+        parser.add_argument("--stations", type=int, default=2000)
+        parser.add_argument("--routes", type=int, default=20000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        with rolled_back():
+            bench_timetable(
+                options["journeys"],
+                options["stations"],
+                options["routes"],
+                options["days"],
+            )
+            start = timezone.now() + timezone.timedelta(days=30)
+            station_id = (
+                Journey.objects.filter(departure_time__gte=start)
+                .order_by("departure_time")
+                .values_list("source_id", flat=True)
+                .first()
+            )
+            through_route = (
+                Journey.objects.filter(
+                    route__source_id=station_id, departure_time__gte=start
+                )
+                .select_related("route__destination", "train__train_type")
+                .order_by("departure_time", "id")[:limit]
+            )
+            indexed = (
+                Journey.objects.filter(
+                    source_id=station_id, departure_time__gte=start
+                )
+                .select_related("destination", "train__train_type")
+                .order_by("departure_time", "id")[:limit]
+            )
+
+            def board():
+                return get_board(
+                    station_id,
+                    "departures",
+                    start,
+                    limit,
+                    lambda journeys: DepartureSerializer(
+                        journeys, many=True
+                    ).data,
+                )
+
+            self.stdout.write(
+                f"{Journey.objects.count()} journeys, board of {limit}"
+            )
+            self.stdout.write(f"{'query':>14} {'ms':>9} {'queries':>8}  plan")
+            for name, queryset in (
+                ("route join", through_route),
+                ("source index", indexed),
+            ):
+                ms, queries = measure(
+                    lambda: list(queryset.all()), options["repeat"]
+                )
+                self.stdout.write(
+                    f"{name:>14} {ms:>9.2f} {queries:>8}  "
+                    f"{self.scan(queryset)}"
+                )
+            response_cache().clear()
+            with override_settings(BOARD_CACHE_SECONDS=60):
+                board()
+                ms, queries = measure(board, options["repeat"])
+            self.stdout.write(f"{'cached board':>14} {ms:>9.2f} {queries:>8}")
+
+    @staticmethod
+    def scan(queryset):
+        """How the journey table is read, from EXPLAIN"""
+        for line in queryset.explain().splitlines():
+            if "station_journey" in line and "Scan" in line:
+                return line.strip(" ->").split("  ")[0]
+        return ""
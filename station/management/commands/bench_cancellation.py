@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from station.booking import book_tickets, cancel_journey
+from station.management.commands._bench import (
+    bench_journey,
+    bench_user,
+    measure,
+    rolled_back,
+)
+from station.models import Order
+from rest_framework.exceptions import ValidationError
+
+
+class Command(BaseCommand):
+    help = (
+        "Times cancelling a fully booked journey order by order through "
+        "the ORM against the set-based journey cancellation. "
+        "Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cargos", type=int, default=20)
+        parser.add_argument("--places", type=int, default=100)
+        parser.add_argument("--tickets-per-order", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = bench_user()
+            journey = bench_journey(options["cargos"], options["places"])
+            seats = [
+                {"journey": journey, "cargo": cargo, "seat": seat}
+                for cargo in range(1, options["cargos"] + 1)
+                for seat in range(1, options["places"] + 1)
+            ]
+            size = options["tickets_per_order"]
+            for start in range(0, len(seats), size):
+                order = Order.objects.create(user=user)
+                book_tickets(
+                    order, seats[start:start + size], ValidationError
+                )
+            self.stdout.write(
+                f"Journey with {len(seats)} tickets in "
+                f"{Order.objects.filter(user=user).count()} orders"
+            )
+            self.stdout.write(f"{'path':>10} {'queries':>8} {'ms':>10}")
+            for path, func in (
+                (
+                    "per-order",
+                    lambda: Order.objects.filter(user=user).delete()
+                ),
+                ("set-based", lambda: cancel_journey(journey.id, user)),
+            ):
+                ms, queries = measure(func, options["repeat"])
+                self.stdout.write(f"{path:>10} {queries:>8} {ms:>10.1f}")
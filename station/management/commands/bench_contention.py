@@ -0,0 +1,133 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from station.booking import STRATEGIES, SeatMapChanged, book_tickets
+from station.management.commands._bench import (
+    bench_cleanup,
+    bench_journey,
+    bench_user,
+)
+from station.models import Journey, Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires concurrent orders at one journey for every booking strategy "
+        "and reports throughput, abort rate and latency. The benchmark "
+        "data is committed (threads need it) and deleted at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=400)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--seats-per-order", type=int, default=2)
+        parser.add_argument("--cargos", type=int, default=10)
+        parser.add_argument("--places", type=int, default=60)
+        parser.add_argument(
+            "--strategies", default=",".join(STRATEGIES),
+            help="Comma separated strategies to compare"
+        )
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        bench_cleanup()
+        user = bench_user()
+        journey = bench_journey(options["cargos"], options["places"])
+        try:
+            self.stdout.write(
+                f"{'strategy':>10} {'orders/s':>9} {'ok':>5} "
+                f"{'taken':>6} {'errors':>6} {'retries':>7} "
+                f"{'abort %':>7} {'p50 ms':>8} {'p99 ms':>8}"
+            )
+            for name in options["strategies"].split(","):
+                Order.objects.filter(user=user).delete()
+                Journey.objects.filter(id=journey.id).update(seat_map=b"")
+                self.run(name, user, journey, options)
+        finally:
+            bench_cleanup()
+
+    def run(self, name, user, journey, options):
+        rng = random.Random(options["seed"])
+        seats = [
+            (cargo, seat)
+            for cargo in range(1, options["cargos"] + 1)
+            for seat in range(1, options["places"] + 1)
+        ]
+        payloads = [
+            [
+                {"journey": journey, "cargo": cargo, "seat": seat}
+                for cargo, seat in rng.sample(
+                    seats, options["seats_per_order"]
+                )
+            ]
+            for _ in range(options["orders"])
+        ]
+        outcomes = Counter()
+        latencies = []
+        lock = threading.Lock()
+
+        class CountingStrategy(STRATEGIES[name]):
+            def save(self, journeys):
+                try:
+                    super().save(journeys)
+                except SeatMapChanged:
+                    with lock:
+                        outcomes["retries"] += 1
+                    raise
+
+        def worker(chunk):
+            try:
+                for payload in chunk:
+                    start = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            order = Order.objects.create(user=user)
+                            book_tickets(
+                                order,
+                                payload,
+                                ValidationError,
+                                strategy=CountingStrategy(),
+                            )
+                        outcome = "ok"
+                    except ValidationError:
+                        outcome = "taken"
+                    except DatabaseError:
+                        outcome = "errors"
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with lock:
+                        outcomes[outcome] += 1
+                        latencies.append(elapsed)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(
+                target=worker, args=(payloads[i::options["threads"]],)
+            )
+            for i in range(options["threads"])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        total = len(latencies)
+        aborted = outcomes["taken"] + outcomes["errors"]
+        self.stdout.write(
+            f"{name:>10} {outcomes["ok"] / elapsed:>9.1f} "
+            f"{outcomes["ok"]:>5} {outcomes["taken"]:>6} "
+            f"{outcomes["errors"]:>6} {outcomes["retries"]:>7} "
+            f"{aborted / total * 100:>7.1f} "
+            f"{statistics.median(latencies):>8.1f} "
+            f"{latencies[min(total - 1, int(total * 0.99))]:>8.1f}"
+        )
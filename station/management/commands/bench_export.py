@@ -0,0 +1,92 @@
+import time
+import tracemalloc
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.throttling import UserRateThrottle
+
+from station.management.commands._bench import (
+    bench_timetable,
+    bench_user,
+    rolled_back,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pulls every journey of a generated table through the cursor "
+        "paginated list and through the streaming CSV and NDJSON export, "
+        "and prints time, requests and peak Python memory of each. "
+        "Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=100000)
+
+    def handle(self, *args, **options):
+        with rolled_back(), override_settings(
+            ALLOWED_HOSTS=["testserver"]
+        ), mock.patch.dict(
+            UserRateThrottle.THROTTLE_RATES, {"user": "1000000/day"}
+        ):
+            bench_timetable(options["journeys"], stations=500, routes=2000)
+            user = bench_user()
+            user.is_staff = True
+            user.save()
+            factory = APIRequestFactory()
+
+            def client(url, **headers):
+                """The view's response without the middleware"""
+                request = factory.get(url, **headers)
+                force_authenticate(request, user)
+                match = resolve(urlsplit(url).path)
+                return match.func(request, *match.args, **match.kwargs)
+
+            def paginated():
+                rows = requests = 0
+                url = (
+                    f"{reverse('station:journey-list')}"
+                    f"?pagination=cursor&page_size=100"
+                )
+                while url:
+                    data = client(url).render().data
+                    requests += 1
+                    rows += len(data["results"])
+                    url = data["next"]
+                return rows, requests
+
+            def export(media_type):
+                def pull():
+                    response = client(
+                        reverse("station:export-journeys"),
+                        HTTP_ACCEPT=media_type,
+                    )
+                    lines = 0
+                    for chunk in response.streaming_content:
+                        lines += chunk.count(b"\n")
+                    return lines, 1
+                return pull
+
+            self.stdout.write(
+                f"{'pull':>10} {'rows':>8} {'requests':>9} {'s':>7} "
+                f"{'rows/s':>8} {'peak MB':>8}"
+            )
+            for name, pull in (
+                ("paginated", paginated),
+                ("csv", export("text/csv")),
+                ("ndjson", export("application/x-ndjson")),
+            ):
+                tracemalloc.start()
+                start = time.perf_counter()
+                rows, requests = pull()
+                seconds = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(
+                    f"{name:>10} {rows:>8} {requests:>9} {seconds:>7.2f} "
+                    f"{rows / seconds:>8.0f} {peak / 2 ** 20:>8.1f}"
+                )
@@ -0,0 +1,125 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Q
+
+from station.facilities import filter_facilities, sync_facility_ids
+from station.management.commands._bench import measure, rolled_back
+from station.models import Facility, Train, TrainType
+
+
+class Command(BaseCommand):
+    help = (
+        "Times any-of and all-of facility filters on generated trains "
+        "through the M2M join and through the facility_ids GIN index. "
+        "Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trains", type=int, default=200000)
+        parser.add_argument("--facilities", type=int, default=30)
+        parser.add_argument("--per-train", type=int, default=6)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        with rolled_back():
+            train_type, _ = TrainType.objects.get_or_create(name="Bench")
+            facilities = Facility.objects.bulk_create(
+                Facility(name=f"Bench facility {number}")
+                for number in range(options["facilities"])
+            )
+            facility_ids = [facility.id for facility in facilities]
+            trains = Train.objects.bulk_create(
+                (
+                    Train(
+                        number=990000 + number,
+                        cargo_num=10,
+                        places_in_cargo=60,
+                        train_type=train_type,
+                    )
+                    for number in range(options["trains"])
+                ),
+                batch_size=5000,
+            )
+            # popular facilities are on most trains, rare ones on a few
+            weights = [1 / (rank + 1) for rank in range(len(facility_ids))]
+            Train.facilities.through.objects.bulk_create(
+                (
+                    Train.facilities.through(
+                        train_id=train.id, facility_id=facility_id
+                    )
+                    for train in trains
+                    for facility_id in {
+                        *rng.choices(
+                            facility_ids, weights, k=options["per_train"]
+                        )
+                    }
+                ),
+                batch_size=10000,
+            )
+            with connection.cursor() as cursor:
+                # building the GIN index once is far faster than
+                # updating it row by row
+                cursor.execute("DROP INDEX station_train_facility_gin")
+                cursor.execute("ANALYZE station_train_facilities")
+                sync_facility_ids()
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                cursor.execute(
+                    "CREATE INDEX station_train_facility_gin "
+                    "ON station_train USING gin (facility_ids)"
+                )
+                cursor.execute("ANALYZE station_train")
+
+            self.stdout.write(
+                f"{len(trains)} trains, {len(facility_ids)} facilities"
+            )
+            self.stdout.write(
+                f"{'filter':>22} {'rows':>7} {'join ms':>9} "
+                f"{'array ms':>9}  array plan"
+            )
+            cases = [
+                ("any of 2 rare", facility_ids[-2:], None),
+                ("any of 2 popular", facility_ids[:2], None),
+                ("all of 2 popular", None, facility_ids[:2]),
+                ("all of popular + rare", None,
+                 [facility_ids[0], facility_ids[-1]]),
+                ("all of 3 rare", None, facility_ids[-3:]),
+            ]
+            for name, any_of, all_of in cases:
+                joined = self.joined(any_of, all_of)
+                indexed = filter_facilities(
+                    Train.objects.all(), any_of, all_of
+                )
+                join_ms, _ = measure(
+                    lambda: (list(joined[:20]), joined.count()),
+                    options["repeat"],
+                )
+                array_ms, _ = measure(
+                    lambda: (list(indexed[:20]), indexed.count()),
+                    options["repeat"],
+                )
+                self.stdout.write(
+                    f"{name:>22} {indexed.count():>7} {join_ms:>9.2f} "
+                    f"{array_ms:>9.2f}  {self.scan(indexed)}"
+                )
+
+    @staticmethod
+    def joined(any_of, all_of):
+        """The filters through the M2M table, as TrainViewSet did"""
+        if any_of:
+            return Train.objects.filter(
+                facilities__id__in=any_of
+            ).distinct()
+        return Train.objects.annotate(
+            matched=Count("facilities", filter=Q(facilities__id__in=all_of))
+        ).filter(matched=len(all_of))
+
+    @staticmethod
+    def scan(queryset):
+        """How the train table is read, from EXPLAIN"""
+        for line in queryset.explain().splitlines():
+            if "station_train" in line and "Scan" in line:
+                return line.strip(" ->").split("  ")[0]
+        return ""
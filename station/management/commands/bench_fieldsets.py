@@ -0,0 +1,120 @@
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.throttling import UserRateThrottle
+
+from station.management.commands._bench import (
+    bench_timetable,
+    bench_user,
+    measure,
+    rolled_back,
+)
+from station.models import Crew, Facility, Journey, Train
+
+SHAPES = {
+    "journey-detail": [
+        {},
+        {"expand": "train"},
+        {"expand": ""},
+        {"fields": "id,departure_time,arrival_time"},
+        {"fields": "id,route,seat_map", "expand": "route"},
+    ],
+    "journey-list": [
+        {},
+        {"fields": "id,departure_time,tickets_available"},
+        {"fields": "id,train_type_name,train_facilities"},
+    ],
+    "train-detail": [
+        {},
+        {"expand": ""},
+        {"fields": "id,number,num_seats"},
+    ],
+    "route-list": [
+        {},
+        {"fields": "id,distance"},
+        {"fields": "id,source"},
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Times journey, train and route responses in each ?fields= and "
+        "?expand= shape and prints the queries each needs. Nothing is "
+        "kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=100000)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back(), override_settings(
+            ALLOWED_HOSTS=["testserver"], RESPONSE_CACHE_SECONDS=0
+        ), mock.patch.dict(
+            UserRateThrottle.THROTTLE_RATES, {"user": "1000000/day"}
+        ):
+            bench_timetable(options["journeys"], stations=500, routes=2000)
+            train = Train.objects.get(number=990001)
+            train.facilities.add(
+                *Facility.objects.bulk_create(
+                    Facility(name=f"Bench facility {number}")
+                    for number in range(6)
+                )
+            )
+            journey = Journey.objects.order_by("id").first()
+            journey.crews.add(
+                *Crew.objects.bulk_create(
+                    Crew(first_name="Bench", last_name=str(number))
+                    for number in range(4)
+                )
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE station_journey_crews")
+            user = bench_user()
+            factory = APIRequestFactory()
+
+            def client(url):
+                """The view's response without the middleware"""
+                request = factory.get(url)
+                force_authenticate(request, user)
+                match = resolve(url.split("?")[0])
+                response = match.func(request, *match.args, **match.kwargs)
+                assert response.status_code == 200, response.data
+                return response.render()
+
+            urls = {
+                "journey-detail": reverse(
+                    "station:journey-detail", args=[journey.id]
+                ),
+                "journey-list": reverse("station:journey-list"),
+                "train-detail": reverse(
+                    "station:train-detail", args=[train.id]
+                ),
+                "route-list": reverse("station:route-list"),
+            }
+            self.stdout.write(
+                f"{'endpoint':>15} {'ms':>7} {'queries':>8} {'bytes':>7}  "
+                f"shape"
+            )
+            for name, shapes in SHAPES.items():
+                for shape in shapes:
+                    params = dict(shape)
+                    if name.endswith("list"):
+                        params["page_size"] = options["page_size"]
+                    url = f"{urls[name]}?{urlencode(params)}"
+                    size = len(client(url).content)
+                    ms, queries = measure(
+                        lambda: client(url), options["repeat"]
+                    )
+                    label = urlencode(shape, safe=",") or "(full)"
+                    self.stdout.write(
+                        f"{name:>15} {ms:>7.2f} {queries:>8} {size:>7}  "
+                        f"{label}"
+                    )
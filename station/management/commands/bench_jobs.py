@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from station.jobs import run_worker
+from station.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Enqueues no-op jobs and drains them with the worker for every "
+        "concurrency and batch size, reporting jobs per second. The jobs "
+        "are committed (worker threads need them) and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=5000)
+        parser.add_argument("--concurrency", default="1,4,8")
+        parser.add_argument("--batch-sizes", default="1,10,100")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'workers':>7} {'batch':>5} {'jobs/s':>9} {'done':>6}"
+        )
+        try:
+            for concurrency in map(int, options["concurrency"].split(",")):
+                for batch_size in map(
+                    int, options["batch_sizes"].split(",")
+                ):
+                    self.run(options["jobs"], concurrency, batch_size)
+        finally:
+            Job.objects.filter(task="station.noop").delete()
+
+    def run(self, jobs, concurrency, batch_size):
+        Job.objects.filter(task="station.noop").delete()
+        Job.objects.bulk_create(
+            [Job(task="station.noop", args=[i]) for i in range(jobs)],
+            batch_size=5000,
+        )
+        start = time.perf_counter()
+        run_worker(
+            concurrency=concurrency,
+            batch_size=batch_size,
+            stop_when_empty=True,
+        )
+        elapsed = time.perf_counter() - start
+        done = Job.objects.filter(
+            task="station.noop", status=Job.DONE
+        ).count()
+        self.stdout.write(
+            f"{concurrency:>7} {batch_size:>5} "
+            f"{done / elapsed:>9.1f} {done:>6}"
+        )
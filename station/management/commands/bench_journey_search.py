@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from station.management.commands._bench import (
+    bench_timetable,
+    measure,
+    rolled_back,
+)
+from station.models import Journey
+from station.views import JourneyViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the journey list filters on a generated multi-million row "
+        "journey table with and without the departure_time indexes and "
+        "prints how Postgres reads the table. Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=2000000)
+        parser.add_argument("--stations", type=int, default=2000)
+        parser.add_argument("--routes", type=int, default=20000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            routes = bench_timetable(
+                options["journeys"],
+                options["stations"],
+                options["routes"],
+                options["days"],
+            )
+
+            day = (
+                timezone.localdate() + timezone.timedelta(days=30)
+            ).isoformat()
+            route = (
+                JourneyViewSet._filter_journeys(
+                    Journey.objects.all(), {"departure_date": day}
+                )
+                .select_related("route__source", "route__destination")
+                .first()
+                .route
+            )
+            filters = {
+                "date": {"departure_date": day},
+                "window": {
+                    "departure_from": f"{day}T06:00:00",
+                    "departure_to": f"{day}T09:00:00",
+                },
+                "stations+date": {
+                    "source": route.source.name,
+                    "destination": route.destination.name,
+                    "departure_date": day,
+                },
+                "source": {"source": route.source.name},
+            }
+            self.stdout.write(
+                f"{Journey.objects.count()} journeys, "
+                f"{len(routes)} routes"
+            )
+            self.stdout.write(
+                f"{'filter':>14} {'indexes':>8} {'rows':>6} {'ms':>9}  plan"
+            )
+            self.run(filters, "yes", options["repeat"])
+            with connection.cursor() as cursor:
+                for index in Journey._meta.indexes:
+                    cursor.execute(f"DROP INDEX {index.name}")
+            self.run(filters, "no", options["repeat"])
+
+    def run(self, filters, label, repeat):
+        for name, params in filters.items():
+            queryset = JourneyViewSet._filter_journeys(
+                Journey.objects.all(), params
+            ).order_by("id")
+            ms, _ = measure(
+                lambda: (list(queryset[:20]), queryset.count()), repeat
+            )
+            self.stdout.write(
+                f"{name:>14} {label:>8} {queryset.count():>6} "
+                f"{ms:>9.2f}  {self.scan(queryset)}"
+            )
+
+    @staticmethod
+    def scan(queryset):
+        """How the journey table is read, from EXPLAIN"""
+        for line in queryset.values("id").explain().splitlines():
+            if "station_journey" in line and "Scan" in line:
+                return line.strip(" ->").split("  ")[0]
+        return ""
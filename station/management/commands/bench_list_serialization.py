@@ -0,0 +1,133 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from station.management.commands._bench import (
+    bench_timetable,
+    measure,
+    rolled_back,
+)
+from station.models import Facility, Journey, Train, TrainType
+from station.serializers import (
+    JourneyListRowSerializer,
+    JourneyListSerializer,
+    TrainListRowSerializer,
+    TrainListSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Times journey and train list pages serialized from model "
+        "instances with select / prefetch_related and from values() rows "
+        "(FAST_LIST_SERIALIZATION), checking both give the same data. "
+        "Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=100000)
+        parser.add_argument("--trains", type=int, default=2000)
+        parser.add_argument("--facilities", type=int, default=6)
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[100, 1000]
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            bench_timetable(options["journeys"], stations=500, routes=2000)
+            self.trains(options["trains"], options["facilities"])
+            lists = (
+                (
+                    "journeys",
+                    lambda rows: JourneyListSerializer(
+                        Journey.objects.select_related("train__train_type")
+                        .prefetch_related("train__facilities")
+                        .order_by("id")[:rows],
+                        many=True,
+                    ).data,
+                    lambda rows: JourneyListRowSerializer(
+                        JourneyListRowSerializer.rows(Journey.objects.all())
+                        .order_by("id")[:rows],
+                        many=True,
+                    ).data,
+                ),
+                (
+                    "trains",
+                    lambda rows: TrainListSerializer(
+                        Train.objects.select_related("train_type")
+                        .prefetch_related("facilities")
+                        .order_by("id")[:rows],
+                        many=True,
+                    ).data,
+                    lambda rows: TrainListRowSerializer(
+                        TrainListRowSerializer.rows(Train.objects.all())
+                        .order_by("id")[:rows],
+                        many=True,
+                    ).data,
+                ),
+            )
+            self.stdout.write(
+                f"{'list':>9} {'rows':>5} {'instances ms':>13} "
+                f"{'queries':>8} {'rows ms':>9} {'queries':>8} {'speedup':>8}"
+            )
+            for name, classic, fast in lists:
+                for rows in options["rows"]:
+                    if classic(rows) != fast(rows):
+                        raise AssertionError(
+                            f"{name}: row serialization differs"
+                        )
+                    classic_ms, classic_queries = measure(
+                        lambda: classic(rows), options["repeat"]
+                    )
+                    fast_ms, fast_queries = measure(
+                        lambda: fast(rows), options["repeat"]
+                    )
+                    self.stdout.write(
+                        f"{name:>9} {rows:>5} {classic_ms:>13.2f} "
+                        f"{classic_queries:>8} {fast_ms:>9.2f} "
+                        f"{fast_queries:>8} "
+                        f"{classic_ms / fast_ms:>7.1f}x"
+                    )
+
+    @staticmethod
+    def trains(count, facility_count):
+        """Trains with a few facilities each; the timetable train gets
+        all of them"""
+        train_type, _ = TrainType.objects.get_or_create(name="Bench")
+        facilities = Facility.objects.bulk_create(
+            [
+                Facility(name=f"Bench facility {number}")
+                for number in range(facility_count)
+            ]
+        )
+        trains = Train.objects.bulk_create(
+            [
+                Train(
+                    number=991000 + number,
+                    cargo_num=1 + number % 12,
+                    places_in_cargo=40 + number % 30,
+                    train_type=train_type,
+                )
+                for number in range(count)
+            ],
+            batch_size=5000,
+        )
+        through = Train.facilities.through
+        links = [
+            through(train_id=train.id, facility_id=facility.id)
+            for position, train in enumerate(trains)
+            for facility in facilities[:position % (facility_count + 1)]
+        ]
+        links += [
+            through(train_id=train_id, facility_id=facility.id)
+            for train_id in Journey.objects.values_list(
+                "train_id", flat=True
+            ).distinct()
+            for facility in facilities
+        ]
+        through.objects.bulk_create(links, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ANALYZE station_train, station_facility, "
+                f"{through._meta.db_table}"
+            )
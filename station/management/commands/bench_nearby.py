@@ -0,0 +1,116 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from station.geo import bounding_box
+from station.management.commands._bench import (
+    bench_stations,
+    measure,
+    rolled_back,
+)
+from station.search import nearest_stations, stations_in_box
+
+FULL_SCAN_SQL = """
+    SELECT id FROM station_station
+    ORDER BY 2 * 6371.0088 * asin(sqrt(
+        sin(radians(latitude - %(lat)s) / 2) ^ 2
+        + cos(radians(%(lat)s)) * cos(radians(latitude))
+        * sin(radians(longitude - %(lon)s) / 2) ^ 2
+    ))
+    LIMIT %(limit)s
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Times nearest-station and viewport queries on generated stations: "
+        "bounding box prefilter on the (latitude, longitude) index with "
+        "haversine ranking against a full scan ordered by distance. "
+        "Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=1000000)
+        parser.add_argument("--points", type=int, default=5)
+        parser.add_argument("--radii", default="5,25,100")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        points = [
+            (rng.uniform(40, 65), rng.uniform(-5, 35))
+            for _ in range(options["points"])
+        ]
+        with rolled_back():
+            bench_stations(options["stations"])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE station_station")
+
+            self.stdout.write(
+                f"{'query':>12} {'radius':>6} {'found':>6} {'ms':>8}  plan"
+            )
+            for radius in map(float, options["radii"].split(",")):
+                found = []
+                timings = []
+                for latitude, longitude in points:
+                    ms, _ = measure(
+                        lambda: found.append(len(nearest_stations(
+                            latitude, longitude, radius, options["limit"]
+                        ))),
+                        options["repeat"],
+                    )
+                    timings.append(ms)
+                box = stations_in_box(*bounding_box(*points[0], radius))
+                self.stdout.write(
+                    f"{'nearby':>12} {radius:>6.0f} "
+                    f"{sum(found) / len(found):>6.0f} "
+                    f"{sum(timings) / len(timings):>8.2f}  "
+                    f"{self.scan(box)}"
+                )
+
+            timings = []
+            for latitude, longitude in points:
+                ms, _ = measure(
+                    lambda: self.full_scan(
+                        latitude, longitude, options["limit"]
+                    ),
+                    options["repeat"],
+                )
+                timings.append(ms)
+            self.stdout.write(
+                f"{'full scan':>12} {'-':>6} {options["limit"]:>6} "
+                f"{sum(timings) / len(timings):>8.2f}  Seq Scan"
+            )
+
+            # a city sized viewport, first page and count as in-bbox does
+            latitude, longitude = points[0]
+            box = stations_in_box(
+                latitude - 0.5, latitude + 0.5,
+                [(longitude - 0.8, longitude + 0.8)],
+            )
+            ms, _ = measure(
+                lambda: (list(box[:5]), box.count()), options["repeat"]
+            )
+            self.stdout.write(
+                f"{'in-bbox':>12} {'-':>6} {box.count():>6} {ms:>8.2f}  "
+                f"{self.scan(box)}"
+            )
+
+    @staticmethod
+    def full_scan(latitude, longitude, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                FULL_SCAN_SQL,
+                {"lat": latitude, "lon": longitude, "limit": limit},
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def scan(queryset):
+        """The way the station table is read, from EXPLAIN"""
+        for line in queryset.values("id").explain().splitlines():
+            if "Scan" in line:
+                return line.strip(" ->").split("  ")[0]
+        return ""
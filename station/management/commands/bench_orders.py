@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+
+from station.management.commands._bench import (
+    bench_journey,
+    bench_user,
+    measure,
+    rolled_back,
+)
+from station.models import Journey, Order, Ticket
+from station.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares query count and latency of creating an order ticket by "
+        "ticket against the bulk booking path. Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="1,5,10,20,50",
+            help="Comma separated numbers of tickets per order"
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        with rolled_back():
+            user = bench_user()
+            journey = bench_journey(places_in_cargo=max(sizes))
+            self.stdout.write(
+                f"{'tickets':>8} {'path':>10} {'queries':>8} {'ms':>9}"
+            )
+            for size in sizes:
+                payload = [
+                    {"journey": journey.id, "cargo": 1, "seat": seat}
+                    for seat in range(1, size + 1)
+                ]
+                for path, func in (
+                    ("per-ticket", lambda: self.per_ticket(user, payload)),
+                    ("bulk", lambda: self.bulk(user, payload)),
+                ):
+                    ms, queries = measure(func, options["repeat"])
+                    self.stdout.write(
+                        f"{size:>8} {path:>10} {queries:>8} {ms:>9.2f}"
+                    )
+
+    @staticmethod
+    def per_ticket(user, payload):
+        """The write path OrderSerializer.create used before bulk booking"""
+        order = Order.objects.create(user=user)
+        for ticket in payload:
+            journey = Journey.objects.get(pk=ticket["journey"])
+            Ticket.objects.create(
+                order=order,
+                journey=journey,
+                cargo=ticket["cargo"],
+                seat=ticket["seat"],
+            )
+
+    @staticmethod
+    def bulk(user, payload):
+        serializer = OrderSerializer(data={"tickets": payload})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=user)
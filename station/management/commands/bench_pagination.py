@@ -0,0 +1,83 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from station.management.commands._bench import (
+    bench_timetable,
+    bench_user,
+    measure,
+    rolled_back,
+)
+from station.models import Journey
+from station.views import JourneyCursorPagination, JourneyViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the journey list at page 1 and at a deep page with page "
+        "numbers and with cursors on a generated journey table. Nothing "
+        "is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=1000000)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--deep-page", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        deep_page = options["deep_page"]
+        if page_size * deep_page > options["journeys"]:
+            self.stderr.write("--journeys must cover the deep page")
+            return
+        # the links of the pages are built for the test client host
+        with rolled_back(), override_settings(ALLOWED_HOSTS=["testserver"]):
+            bench_timetable(options["journeys"])
+            user = bench_user()
+            url = reverse("station:journey-list")
+            view = JourneyViewSet.as_view({"get": "list"})
+            factory = APIRequestFactory()
+
+            def get(params):
+                request = factory.get(url, {"page_size": page_size, **params})
+                force_authenticate(request, user)
+                response = view(request)
+                response.render()
+                assert response.status_code == 200, response.data
+
+            self.stdout.write(
+                f"{'pagination':>10} {'page':>6} {'queries':>8} {'ms':>9}"
+            )
+            for name, page, params in (
+                ("number", 1, {"page": 1}),
+                ("number", deep_page, {"page": deep_page}),
+                ("cursor", 1, {"pagination": "cursor"}),
+                ("cursor", deep_page, {
+                    "cursor": self.cursor_at((deep_page - 1) * page_size)
+                }),
+            ):
+                ms, queries = measure(
+                    lambda: get(params), options["repeat"]
+                )
+                self.stdout.write(
+                    f"{name:>10} {page:>6} {queries:>8} {ms:>9.2f}"
+                )
+
+    @staticmethod
+    def cursor_at(offset):
+        """The cursor a client would hold after crawling offset rows"""
+        paginator = JourneyCursorPagination()
+        departure_time = (
+            Journey.objects.order_by(*paginator.ordering)
+            .values_list("departure_time", flat=True)[offset - 1]
+        )
+        paginator.base_url = "http://testserver/"
+        link = paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=str(departure_time))
+        )
+        return parse_qs(urlparse(link).query)["cursor"][0]
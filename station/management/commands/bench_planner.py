@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from station.planner import Timetable
+
+
+class Command(BaseCommand):
+    help = (
+        "Plans itineraries on a synthetic grid network held in memory and "
+        "reports timetable build time, size, update cost and planning "
+        "latency for every number of transfers. No database is used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=5000)
+        parser.add_argument("--journeys", type=int, default=200000)
+        parser.add_argument("--days", type=int, default=2)
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--max-transfers", default="0,1,2,4")
+        parser.add_argument("--min-transfer-minutes", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        side = max(2, int(options["stations"] ** 0.5))
+        horizon = options["days"] * 86400
+
+        def neighbour(station, reach):
+            row, column = divmod(station, side)
+            row = min(side - 1, max(0, row + rng.randint(-reach, reach)))
+            column = min(
+                side - 1, max(0, column + rng.randint(-reach, reach))
+            )
+            return row * side + column
+
+        rows = []
+        for journey_id in range(1, options["journeys"] + 1):
+            source = rng.randrange(side * side)
+            destination = neighbour(source, 2)
+            if destination == source:
+                destination = (source + 1) % (side * side)
+            departure = rng.randrange(horizon)
+            rows.append(
+                (
+                    journey_id,
+                    source,
+                    destination,
+                    departure,
+                    departure + rng.randint(20, 90) * 60,
+                )
+            )
+
+        start = time.perf_counter()
+        timetable = Timetable(rows)
+        build_ms = (time.perf_counter() - start) * 1000
+        size = sum(
+            column.itemsize * len(column) for column in timetable.columns
+        )
+        self.stdout.write(
+            f"{side * side} stations, {len(timetable)} journeys: "
+            f"built in {build_ms:.0f} ms, {size / 2 ** 20:.1f} MiB arrays"
+        )
+
+        start = time.perf_counter()
+        for row in rows[:1000]:
+            timetable.add(
+                (row[0], row[1], row[2], row[3] + 300, row[4] + 300)
+            )
+        update_us = (time.perf_counter() - start) * 1000
+        self.stdout.write(f"incremental update: {update_us:.0f} us/journey")
+
+        pairs = []
+        for _ in range(options["queries"]):
+            source = rng.randrange(side * side)
+            destination = neighbour(source, 6)
+            if destination != source:
+                pairs.append((source, destination, rng.randrange(86400)))
+
+        self.stdout.write(
+            f"{'transfers':>9} {'found %':>7} {'p50 ms':>8} {'p99 ms':>8}"
+        )
+        for max_transfers in map(int, options["max_transfers"].split(",")):
+            timings = []
+            found = 0
+            for source, destination, departure in pairs:
+                start = time.perf_counter()
+                plans = timetable.plan(
+                    source,
+                    destination,
+                    departure,
+                    max_transfers,
+                    options["min_transfer_minutes"] * 60,
+                    horizon,
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+                found += bool(plans)
+            timings.sort()
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            self.stdout.write(
+                f"{max_transfers:>9} {found / len(pairs) * 100:>7.1f} "
+                f"{statistics.median(timings):>8.2f} {p99:>8.2f}"
+            )
@@ -0,0 +1,104 @@
+import gzip
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from station.management.commands._bench import (
+    bench_timetable,
+    bench_user,
+    measure,
+    rolled_back,
+)
+from station.models import Journey, Order, Station, Ticket
+from station.renderers import MessagePackRenderer, ORJSONRenderer
+from station.serializers import (
+    JourneyListSerializer,
+    JourneyRetrieveSerializer,
+    OrderListSerializer,
+    StationSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Encodes pages of real journey, order and station serializer "
+        "output with DRF's JSONRenderer, the orjson renderer and the "
+        "MessagePack renderer and prints encode time and payload size. "
+        "Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--tickets", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        with rolled_back():
+            bench_timetable(rows * 10, stations=rows, routes=rows * 2)
+            journeys = list(Journey.objects.order_by("id")[:rows])
+            user = bench_user()
+            orders = Order.objects.bulk_create(
+                Order(user=user) for _ in range(rows // options["tickets"])
+            )
+            Ticket.objects.bulk_create(
+                Ticket(
+                    order=order,
+                    journey=journeys[number % len(journeys)],
+                    cargo=1 + number % 10,
+                    seat=1 + number % 60,
+                )
+                for number, order in enumerate(
+                    order
+                    for order in orders
+                    for _ in range(options["tickets"])
+                )
+            )
+            pages = {
+                "journey list": JourneyListSerializer(
+                    Journey.objects.select_related("train__train_type")
+                    .prefetch_related("train__facilities")
+                    .order_by("id")[:rows],
+                    many=True,
+                ).data,
+                "journey detail": JourneyRetrieveSerializer(
+                    Journey.objects.select_related(
+                        "route__source", "route__destination",
+                        "train__train_type",
+                    ).get(id=journeys[0].id)
+                ).data,
+                "order list": OrderListSerializer(
+                    Order.objects.filter(user=user).prefetch_related(
+                        "tickets__journey__train__train_type",
+                        "tickets__journey__train__facilities",
+                    ),
+                    many=True,
+                ).data,
+                "station list": StationSerializer(
+                    Station.objects.order_by("id")[:rows], many=True
+                ).data,
+            }
+
+        renderers = {
+            "json": JSONRenderer(),
+            "orjson": ORJSONRenderer(),
+            "msgpack": MessagePackRenderer(),
+        }
+        self.stdout.write(
+            f"{'page':>14} {'renderer':>8} {'ms':>8} {'speedup':>8} "
+            f"{'bytes':>8} {'gzip':>7}"
+        )
+        for name, data in pages.items():
+            baseline = None
+            for renderer_name, renderer in renderers.items():
+                content = renderer.render(data, renderer.media_type)
+                ms, _ = measure(
+                    lambda: renderer.render(data, renderer.media_type),
+                    options["repeat"],
+                )
+                baseline = baseline or ms
+                self.stdout.write(
+                    f"{name:>14} {renderer_name:>8} {ms:>8.3f} "
+                    f"{baseline / ms:>7.1f}x {len(content):>8} "
+                    f"{len(gzip.compress(content)):>7}"
+                )
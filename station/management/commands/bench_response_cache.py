@@ -0,0 +1,166 @@
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.throttling import UserRateThrottle
+
+from station.caching import response_cache
+from station.management.commands._bench import (
+    bench_stations,
+    bench_user,
+    rolled_back,
+)
+from station.models import Crew, Facility, Route, Station
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a mix of catalog reads, revalidations and occasional "
+        "writes against each response cache backend and prints the hit "
+        "ratio and view latencies. Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=3000)
+        parser.add_argument("--stations", type=int, default=5000)
+        parser.add_argument("--routes", type=int, default=20000)
+        parser.add_argument(
+            "--write-every", type=int, default=200,
+            help="Rename a station after this many requests",
+        )
+        parser.add_argument(
+            "--revalidate", type=float, default=0.5,
+            help="Share of requests sending If-None-Match",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(1)
+        # one client sends more requests than the daily user throttle allows
+        with rolled_back(), override_settings(
+            ALLOWED_HOSTS=["testserver"]
+        ), mock.patch.dict(
+            UserRateThrottle.THROTTLE_RATES, {"user": "1000000/day"}
+        ):
+            stations = bench_stations(options["stations"])
+            pairs = set()
+            while len(pairs) < options["routes"]:
+                pairs.add(tuple(rng.sample(stations, 2)))
+            Route.objects.bulk_create(
+                Route(source=source, destination=destination, distance=100)
+                for source, destination in pairs
+            )
+            Facility.objects.bulk_create(
+                Facility(name=f"Bench facility {number}")
+                for number in range(20)
+            )
+            Crew.objects.bulk_create(
+                Crew(first_name="Bench", last_name=str(number))
+                for number in range(50)
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE station_station, station_route")
+            user = bench_user()
+            factory = APIRequestFactory()
+
+            def client(url, **headers):
+                """The view's response without the middleware"""
+                request = factory.get(url, **headers)
+                force_authenticate(request, user)
+                match = resolve(url.split("?")[0])
+                response = match.func(request, *match.args, **match.kwargs)
+                return response.render()
+            # a few hot pages and a long tail, as browsing clients ask
+            urls = (
+                [reverse("station:facility-list"),
+                 reverse("station:crew-list"),
+                 reverse("station:traintype-list")] * 10
+                + [f"{reverse('station:station-list')}?page={page}"
+                   f"&page_size=50" for page in range(1, 30)]
+                + [f"{reverse('station:route-list')}?page={page}"
+                   f"&page_size=50" for page in range(1, 30)]
+                + [reverse("station:station-detail", args=[station.id])
+                   for station in stations[:50]]
+            )
+            workload = [rng.choice(urls) for _ in range(options["requests"])]
+
+            self.stdout.write(
+                f"{len(workload)} requests, a write every "
+                f"{options['write_every']}, {options['revalidate']:.0%} "
+                f"revalidating"
+            )
+            self.stdout.write(
+                f"{'backend':>8} {'hit ratio':>9} {'MISS ms':>8} "
+                f"{'HIT ms':>8} {'304 ms':>8} {'total s':>8}"
+            )
+            for backend in ("off", "locmem", "file", "db"):
+                self.run(backend, client, workload, stations, options)
+
+    def run(self, backend, client, workload, stations, options):
+        rng = random.Random(2)
+        cache_settings = dict(settings.CACHES)
+        with tempfile.TemporaryDirectory() as directory:
+            if backend != "off":
+                cache_settings[settings.RESPONSE_CACHE_ALIAS] = {
+                    **settings.RESPONSE_CACHE_BACKENDS[backend],
+                    "OPTIONS": {"MAX_ENTRIES": 10000},
+                }
+                if backend == "file":
+                    cache_settings[settings.RESPONSE_CACHE_ALIAS][
+                        "LOCATION"
+                    ] = directory
+            with override_settings(
+                CACHES=cache_settings,
+                RESPONSE_CACHE_SECONDS=0 if backend == "off" else 300,
+            ):
+                # the throttle keeps every request of the day in there
+                caches["default"].clear()
+                if backend == "db":
+                    call_command("createcachetable", verbosity=0)
+                if backend != "off":
+                    response_cache().clear()
+                etags = {}
+                timings = defaultdict(list)
+                outcomes = Counter()
+                start = time.perf_counter()
+                for number, url in enumerate(workload, 1):
+                    headers = {}
+                    if url in etags and rng.random() < options["revalidate"]:
+                        headers["HTTP_IF_NONE_MATCH"] = etags[url]
+                    request_start = time.perf_counter()
+                    response = client(url, **headers)
+                    elapsed = (time.perf_counter() - request_start) * 1000
+                    if response.status_code == 304:
+                        outcome = "304"
+                    else:
+                        outcome = response.get("X-Cache", "MISS")
+                    outcomes[outcome] += 1
+                    timings[outcome].append(elapsed)
+                    if response.has_header("ETag"):
+                        etags[url] = response["ETag"]
+                    if number % options["write_every"] == 0:
+                        station = rng.choice(stations)
+                        Station.objects.filter(id=station.id).first().save()
+                total = time.perf_counter() - start
+
+        def median(outcome):
+            if not timings[outcome]:
+                return "-"
+            return f"{statistics.median(timings[outcome]):.2f}"
+
+        hits = outcomes["HIT"] + outcomes["304"]
+        self.stdout.write(
+            f"{backend:>8} {hits / len(workload):>9.1%} "
+            f"{median('MISS'):>8} {median('HIT'):>8} {median('304'):>8} "
+            f"{total:>8.2f}"
+        )
@@ -0,0 +1,111 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from station.management.commands._bench import (
+    JOURNEYS_SQL,
+    bench_timetable,
+    measure,
+    rolled_back,
+)
+from station.models import Journey, ServicePattern, Train
+from station.services import expand_runs
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares loading a timetable of daily services as journey rows "
+        "and as service patterns, and reading one day of it. Nothing is "
+        "kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=2000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--stations", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        services = options["services"]
+        days = options["days"]
+        rng = random.Random(1)
+        with rolled_back():
+            routes = bench_timetable(
+                0, options["stations"], services, days
+            )
+            train = Train.objects.get(number=990001)
+            today = timezone.localdate()
+
+            start = time.perf_counter()
+            patterns = ServicePattern.objects.bulk_create(
+                ServicePattern(
+                    route=route,
+                    train=train,
+                    departure_time=datetime.time(
+                        rng.randrange(24), rng.randrange(60)
+                    ),
+                    travel_time=datetime.timedelta(minutes=90),
+                    valid_from=today,
+                    valid_to=today + datetime.timedelta(days=days - 1),
+                )
+                for route in routes
+            )
+            pattern_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    JOURNEYS_SQL,
+                    {
+                        "routes": [route.id for route in routes],
+                        "route_count": len(routes),
+                        "train": train.id,
+                        "start": timezone.now().replace(
+                            hour=0, minute=0, second=0, microsecond=0
+                        ),
+                        "minutes": days * 24 * 60,
+                        "journeys": services * days,
+                    },
+                )
+                cursor.execute("ANALYZE station_journey")
+            journey_seconds = time.perf_counter() - start
+
+            self.stdout.write(
+                f"{services} daily services for {days} days: "
+                f"{len(patterns)} patterns in {pattern_seconds:.2f} s, "
+                f"{Journey.objects.count()} journey rows in "
+                f"{journey_seconds:.2f} s"
+            )
+            day = today + datetime.timedelta(days=30)
+            source_id = routes[0].source_id
+            day_start = timezone.make_aware(
+                datetime.datetime.combine(day, datetime.time.min)
+            )
+            journeys = Journey.objects.filter(
+                departure_time__gte=day_start,
+                departure_time__lt=day_start + datetime.timedelta(days=1),
+            ).select_related("route__source", "route__destination")
+            source_patterns = ServicePattern.objects.filter(
+                route__source_id=source_id
+            )
+            self.stdout.write(f"{'one day':>24} {'rows':>6} {'ms':>9}")
+            for name, read in (
+                ("journeys", lambda: list(journeys.all())),
+                ("pattern runs", lambda: expand_runs(
+                    ServicePattern.objects.all(), day, day
+                )),
+                ("journeys from station", lambda: list(
+                    journeys.filter(route__source_id=source_id)
+                )),
+                ("runs from station", lambda: expand_runs(
+                    source_patterns, day, day
+                )),
+            ):
+                ms, _ = measure(read, options["repeat"])
+                self.stdout.write(
+                    f"{name:>24} {len(read()):>6} {ms:>9.2f}"
+                )
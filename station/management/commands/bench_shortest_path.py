@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from station.geo import haversine
+from station.graph import StationGraph
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds a synthetic rail network in memory and compares Dijkstra, "
+        "A* with the great-circle heuristic, precomputed shortest path "
+        "trees and the pair cache. No database is used."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=10000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        side = max(2, int(options["stations"] ** 0.5))
+        # a jittered grid over central Europe, every station linked both
+        # ways to its right and lower neighbours and sometimes diagonally
+        stations = [
+            (
+                row * side + column + 1,
+                45 + row * 0.05 + rng.uniform(-0.01, 0.01),
+                5 + column * 0.07 + rng.uniform(-0.01, 0.01),
+            )
+            for row in range(side)
+            for column in range(side)
+        ]
+        edges = []
+        for row in range(side):
+            for column in range(side):
+                source = row * side + column
+                neighbours = []
+                if column + 1 < side:
+                    neighbours.append(source + 1)
+                if row + 1 < side:
+                    neighbours.append(source + side)
+                if row + 1 < side and column + 1 < side and rng.random() < .3:
+                    neighbours.append(source + side + 1)
+                for target in neighbours:
+                    distance = round(
+                        haversine(*stations[source][1:], *stations[target][1:])
+                        * rng.uniform(1.05, 1.5)
+                    ) + 1
+                    for start, end in ((source, target), (target, source)):
+                        edges.append(
+                            (len(edges) + 1, start + 1, end + 1, distance)
+                        )
+
+        start = time.perf_counter()
+        graph = StationGraph(stations, edges)
+        self.stdout.write(
+            f"{len(stations)} stations, {len(edges)} routes: built in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms, heuristic "
+            f"scale {graph.heuristic_scale:.2f}"
+        )
+
+        pairs = [
+            (rng.randrange(len(stations)), rng.randrange(len(stations)))
+            for _ in range(options["queries"])
+        ]
+        self.stdout.write(f"{'search':>10} {'settled':>8} {'p50 ms':>8}")
+        for name, heuristic in (("dijkstra", False), ("a*", True)):
+            timings = []
+            settled = []
+            for source, target in pairs:
+                start = time.perf_counter()
+                _, _, count = graph.search(source, target, heuristic)
+                timings.append((time.perf_counter() - start) * 1000)
+                settled.append(count)
+            self.stdout.write(
+                f"{name:>10} {statistics.mean(settled):>8.0f} "
+                f"{statistics.median(timings):>8.2f}"
+            )
+
+        hot = [stations[source][0] for source, _ in pairs[:10]]
+        start = time.perf_counter()
+        graph.precompute(hot)
+        self.stdout.write(
+            f"precomputed {len(hot)} trees in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        for name in ("tree", "cached"):
+            timings = []
+            for source, target in pairs[:10]:
+                start = time.perf_counter()
+                graph.shortest_path(stations[source][0], stations[target][0])
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f"{name:>10} {'':>8} {statistics.median(timings):>8.3f}"
+            )
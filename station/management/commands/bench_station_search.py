@@ -0,0 +1,87 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from station.management.commands._bench import (
+    bench_stations,
+    measure,
+    rolled_back,
+)
+from station.models import Route, Station
+from station.search import search_stations
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares route filtering by station name with the old unanchored "
+        "icontains subqueries against the indexed normalized search on "
+        "generated stations and routes. Nothing is kept in the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=100000)
+        parser.add_argument("--routes", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--queries", default="lviv,kra,Be,grazpoz,zurich hbf",
+            help="Comma separated station name queries"
+        )
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            stations = bench_stations(options["stations"])
+            rng = random.Random(1)
+            pairs = set()
+            while len(pairs) < options["routes"]:
+                source, destination = rng.sample(stations, 2)
+                pairs.add((source.id, destination.id))
+            Route.objects.bulk_create(
+                [
+                    Route(
+                        source_id=source,
+                        destination_id=destination,
+                        distance=rng.randint(10, 900),
+                    )
+                    for source, destination in pairs
+                ],
+                batch_size=5000,
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE station_station, station_route")
+
+            self.stdout.write(
+                f"{'query':>12} {'search':>9} {'stations':>8} "
+                f"{'ms':>8}  plan"
+            )
+            for query in options["queries"].split(","):
+                for name, search in (
+                    ("icontains", self.icontains),
+                    ("indexed", search_stations),
+                ):
+                    stations_qs = search(query)
+                    routes = Route.objects.filter(
+                        source__in=stations_qs
+                    ).order_by("id")
+                    ms, _ = measure(
+                        lambda: list(routes[:10]) and routes.count(),
+                        options["repeat"],
+                    )
+                    self.stdout.write(
+                        f"{query:>12} {name:>9} {stations_qs.count():>8} "
+                        f"{ms:>8.2f}  {self.scan(stations_qs)}"
+                    )
+
+    @staticmethod
+    def icontains(query):
+        """Station lookup RouteViewSet used before the search index"""
+        return Station.objects.filter(name__icontains=query)
+
+    @staticmethod
+    def scan(queryset):
+        """The way the station table is read, from EXPLAIN"""
+        plan = queryset.values("id").explain()
+        for line in plan.splitlines():
+            if "station_station" in line or "station_search" in line:
+                return line.strip(" ->").split("  ")[0]
+        return plan.splitlines()[0]
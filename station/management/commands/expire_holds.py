@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from station.booking import release_holds
+from station.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = "Releases seats of expired holds in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Keep sweeping every --interval seconds"
+        )
+        parser.add_argument("--interval", type=float, default=30)
+
+    def handle(self, *args, **options):
+        while True:
+            released = self.sweep(options["batch_size"])
+            self.stdout.write(f"Released {released} expired holds")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def sweep(batch_size):
+        released = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    SeatHold.objects.select_for_update(skip_locked=True)
+                    .filter(expires_at__lte=timezone.now())
+                    .order_by("expires_at")
+                    .values_list("id", flat=True)[:batch_size]
+                )
+                if not batch:
+                    return released
+                released += release_holds(
+                    SeatHold.objects.filter(id__in=batch)
+                )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from station.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Deletes expired idempotency keys in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        deleted = 0
+        while True:
+            batch = IdempotencyKey.objects.filter(
+                expires_at__lte=timezone.now()
+            ).values_list("id", flat=True)[:options["batch_size"]]
+            count, _ = IdempotencyKey.objects.filter(
+                id__in=list(batch)
+            ).delete()
+            deleted += count
+            if count < options["batch_size"]:
+                break
+        self.stdout.write(f"Deleted {deleted} expired idempotency keys")
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from station.booking import rebuild_seat_maps
+from station.models import Journey
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes journey seat maps and seats_taken counters from tickets "
+        "and held seats in batches and reports the journeys that drifted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report drift, keep stored values"
+        )
+
+    def handle(self, *args, **options):
+        checked = drifted = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Journey.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+            checked += len(batch)
+            with transaction.atomic():
+                report = rebuild_seat_maps(
+                    Journey.objects.filter(id__in=batch)
+                )
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+            for journey_id, stored, actual in report:
+                self.stdout.write(
+                    f"Journey {journey_id}: seats_taken {stored} -> {actual}"
+                )
+            drifted += len(report)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} journeys, {drifted} drifted"
+            )
+        )
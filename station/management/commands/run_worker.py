@@ -0,0 +1,45 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from station.jobs import requeue_stale_jobs, run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs background jobs from the station_job table. Jobs are claimed "
+        "in batches with SELECT ... FOR UPDATE SKIP LOCKED, so any number "
+        "of workers can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=10)
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0,
+            help="Seconds to wait when the queue is empty"
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Exit when there are no due jobs left"
+        )
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(settings.JOB_STALE_TIMEOUT_SECONDS)
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        processed = run_worker(
+            concurrency=options["concurrency"],
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+            stop=stop,
+            stop_when_empty=options["once"],
+        )
+        self.stdout.write(f"Processed {processed} jobs")
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:19
+
+from django.db import migrations, models
+
+from station.occupancy import SeatMap
+
+
+def fill_seat_maps(apps, schema_editor):
+    Journey = apps.get_model("station", "Journey")
+    Ticket = apps.get_model("station", "Ticket")
+    journeys = list(Journey.objects.select_related("train"))
+    seat_maps = {
+        journey.id: SeatMap(
+            journey.train.cargo_num, journey.train.places_in_cargo
+        )
+        for journey in journeys
+    }
+    taken = Ticket.objects.values_list("journey_id", "cargo", "seat")
+    for journey_id, cargo, seat in taken.iterator():
+        if seat_maps[journey_id].contains(cargo, seat):
+            seat_maps[journey_id].take(cargo, seat)
+    for journey in journeys:
+        journey.seat_map = seat_maps[journey.id].to_bytes()
+    Journey.objects.bulk_update(journeys, ["seat_map"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0004_facility_train_facilities"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="seat_map",
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(fill_seat_maps, migrations.RunPython.noop),
+    ]
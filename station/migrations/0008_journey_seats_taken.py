@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+def count_taken_seats(apps, schema_editor):
+    Journey = apps.get_model("station", "Journey")
+    journeys = list(Journey.objects.only("id", "seat_map"))
+    for journey in journeys:
+        journey.seats_taken = int.from_bytes(
+            bytes(journey.seat_map), "little"
+        ).bit_count()
+    Journey.objects.bulk_update(journeys, ["seats_taken"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0007_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="seats_taken",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_taken_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:12
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from station.names import normalize_name
+
+
+def fill_search_names(apps, schema_editor):
+    Station = apps.get_model("station", "Station")
+    stations = list(Station.objects.only("id", "name"))
+    for station in stations:
+        station.search_name = normalize_name(station.name)
+    Station.objects.bulk_update(stations, ["search_name"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0010_job"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="station",
+            name="search_name",
+            field=models.CharField(
+                default="", editable=False, max_length=255
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="station",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_name"],
+                name="station_search_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="station",
+            index=models.Index(
+                fields=["search_name"],
+                name="station_search_name_prefix",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
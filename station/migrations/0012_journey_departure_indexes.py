@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-18 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0011_station_search_name"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["route", "departure_time"],
+                name="station_jou_route_i_d72ab9_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["departure_time"],
+                name="station_jou_departu_f114b4_idx",
+            ),
+        ),
+    ]
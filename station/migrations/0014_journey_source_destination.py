@@ -0,0 +1,82 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_route_stations(apps, schema_editor):
+    Journey = apps.get_model("station", "Journey")
+    Route = apps.get_model("station", "Route")
+    routes = Route.objects.filter(id=OuterRef("route_id"))
+    Journey.objects.update(
+        source_id=Subquery(routes.values("source_id")),
+        destination_id=Subquery(routes.values("destination_id")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0013_order_user_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="source",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="departures",
+                to="station.station",
+            ),
+        ),
+        migrations.AddField(
+            model_name="journey",
+            name="destination",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="arrivals",
+                to="station.station",
+            ),
+        ),
+        migrations.RunPython(copy_route_stations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="journey",
+            name="source",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="departures",
+                to="station.station",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="journey",
+            name="destination",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="arrivals",
+                to="station.station",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["source", "departure_time"],
+                name="station_jou_source__a98480_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="journey",
+            index=models.Index(
+                fields=["destination", "arrival_time"],
+                name="station_jou_destina_d24eae_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:13
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_facility_ids(apps, schema_editor):
+    Train = apps.get_model("station", "Train")
+    through = Train.facilities.through
+    Train.objects.update(
+        facility_ids=Coalesce(
+            Subquery(
+                through.objects.filter(train_id=OuterRef("id"))
+                .values("train_id")
+                .annotate(
+                    ids=ArrayAgg("facility_id", ordering="facility_id")
+                )
+                .values("ids")
+            ),
+            Value(
+                [],
+                output_field=django.contrib.postgres.fields.ArrayField(
+                    models.IntegerField()
+                ),
+            ),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0014_journey_source_destination"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="train",
+            name="facility_ids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        migrations.RunPython(copy_facility_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="train",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["facility_ids"], name="station_train_facility_gin"
+            ),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:43
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0015_train_facility_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="journey",
+            name="service_date",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="ServicePattern",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("departure_time", models.TimeField()),
+                ("travel_time", models.DurationField()),
+                (
+                    "weekdays",
+                    models.PositiveSmallIntegerField(
+                        default=127,
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(127),
+                        ],
+                    ),
+                ),
+                ("valid_from", models.DateField()),
+                ("valid_to", models.DateField()),
+                (
+                    "crews",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="service_patterns",
+                        to="station.crew",
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="service_patterns",
+                        to="station.route",
+                    ),
+                ),
+                (
+                    "train",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="service_patterns",
+                        to="station.train",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["departure_time", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ServiceException",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("runs", models.BooleanField(default=False)),
+                (
+                    "service_pattern",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="exceptions",
+                        to="station.servicepattern",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["date"],
+            },
+        ),
+        migrations.AddField(
+            model_name="journey",
+            name="service_pattern",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="journeys",
+                to="station.servicepattern",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="journey",
+            constraint=models.UniqueConstraint(
+                fields=("service_pattern", "service_date"),
+                name="station_journey_service_run",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="servicepattern",
+            index=models.Index(
+                fields=["valid_from", "valid_to"],
+                name="station_ser_valid_f_83f92e_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="serviceexception",
+            unique_together={("service_pattern", "date")},
+        ),
+    ]
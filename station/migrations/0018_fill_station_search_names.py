@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:05
+
+from django.db import migrations
+
+from station.names import normalize_name
+
+
+def fill_search_names(apps, schema_editor):
+    """Stations loaded by loaddata before search names were set on raw
+    saves kept an empty one"""
+    Station = apps.get_model("station", "Station")
+    stations = list(Station.objects.filter(search_name="").only("id", "name"))
+    for station in stations:
+        station.search_name = normalize_name(station.name)
+    Station.objects.bulk_update(stations, ["search_name"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0017_export_timestamps"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("station", "0018_fill_station_search_names"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Deletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("export", models.CharField(max_length=20)),
+                ("row_id", models.BigIntegerField()),
+                (
+                    "deleted_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+            ],
+        ),
+    ]
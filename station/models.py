@@ -1,10 +1,21 @@
+import hashlib
+import json
 import os
 import uuid
 
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+
+from station.names import normalize_name
+from station.occupancy import SeatMap
 
 
 class Crew(models.Model):
@@ -56,6 +67,11 @@ class Train(models.Model):
         Facility,
         related_name="trains", blank=True
     )
+    # sorted ids of facilities, kept in sync by station.signals so
+    # facility filters are one GIN indexed array predicate
+    facility_ids = ArrayField(
+        models.IntegerField(), default=list, blank=True, editable=False
+    )
 
     @property
     def num_seats(self):
@@ -67,21 +83,46 @@ class Train(models.Model):
     class Meta:
         ordering = ["number"]
         verbose_name_plural = "trains"
+        indexes = [
+            GinIndex(
+                fields=["facility_ids"],
+                name="station_train_facility_gin",
+            ),
+        ]
 
 
 class Station(models.Model):
     name = models.CharField(max_length=255, unique=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=7)
     longitude = models.DecimalField(max_digits=10, decimal_places=7)
+    # name normalized for searching, see station.search
+    search_name = models.CharField(max_length=255, editable=False)
 
     def __str__(self):
         return f"{self.name} ({self.latitude}, {self.longitude})"
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        return super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["name"]
         indexes = [
             models.Index(fields=["name"]),
-            models.Index(fields=["latitude", "longitude"])
+            models.Index(fields=["latitude", "longitude"]),
+            GinIndex(
+                fields=["search_name"],
+                opclasses=["gin_trgm_ops"],
+                name="station_search_name_trgm",
+            ),
+            models.Index(
+                fields=["search_name"],
+                opclasses=["varchar_pattern_ops"],
+                name="station_search_name_prefix",
+            ),
         ]
         verbose_name_plural = "stations"
 
@@ -130,6 +171,8 @@ class Route(models.Model):
         related_name="route_to"
     )
     distance = models.IntegerField()
+    # for incremental exports
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
 
     def __str__(self):
         return (
@@ -149,6 +192,9 @@ class Route(models.Model):
     class Meta:
         unique_together = ["source", "destination"]
         verbose_name_plural = "routes"
+        indexes = [
+            models.Index(fields=["updated_at"]),
+        ]
 
 
 class Order(models.Model):
@@ -162,14 +208,164 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+
+class ServicePattern(models.Model):
+    """A journey repeated on the weekdays of the mask between valid_from
+    and valid_to, see station.services for its runs"""
+    # weekdays bit mask, Monday is bit 0 as in date.weekday()
+    ALL_WEEKDAYS = 0b1111111
+
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="service_patterns"
+    )
+    train = models.ForeignKey(
+        Train, on_delete=models.CASCADE, related_name="service_patterns"
+    )
+    crews = models.ManyToManyField(
+        Crew, related_name="service_patterns", blank=True
+    )
+    departure_time = models.TimeField()
+    travel_time = models.DurationField()
+    weekdays = models.PositiveSmallIntegerField(
+        default=ALL_WEEKDAYS,
+        validators=[
+            MinValueValidator(1),
+            MaxValueValidator(ALL_WEEKDAYS),
+        ],
+    )
+    valid_from = models.DateField()
+    valid_to = models.DateField()
+
+    def runs_on(self, day, exceptions=None):
+        """Whether the service runs on the day; exceptions maps dates to
+        ServiceException.runs and defaults to the stored ones"""
+        if exceptions is None:
+            exceptions = dict(self.exceptions.values_list("date", "runs"))
+        if day in exceptions:
+            return exceptions[day]
+        return (
+            self.valid_from <= day <= self.valid_to
+            and bool(self.weekdays & (1 << day.weekday()))
+        )
+
+    @staticmethod
+    def validate_schedule(valid_from, valid_to, travel_time,
+                          error_to_raise):
+        if valid_from > valid_to:
+            raise error_to_raise(
+                {"valid_to": "valid_to must not be before valid_from"}
+            )
+        if travel_time <= timezone.timedelta(0):
+            raise error_to_raise(
+                {"travel_time": "Travel time must be above zero"}
+            )
+
+    def clean(self):
+        ServicePattern.validate_schedule(
+            self.valid_from, self.valid_to, self.travel_time, ValidationError
+        )
+
+    def __str__(self):
+        return (
+            f"{self.route}, train: {self.train}, "
+            f"at {self.departure_time:%H:%M}"
+        )
+
+    class Meta:
+        ordering = ["departure_time", "id"]
+        indexes = [
+            models.Index(fields=["valid_from", "valid_to"]),
+        ]
+
+
+class ServiceException(models.Model):
+    """A date the service doesn't run (runs=False) or runs in addition
+    to its weekdays (runs=True)"""
+    service_pattern = models.ForeignKey(
+        ServicePattern, on_delete=models.CASCADE, related_name="exceptions"
+    )
+    date = models.DateField()
+    runs = models.BooleanField(default=False)
+
+    def __str__(self):
+        return (
+            f"{self.service_pattern} "
+            f"{'runs' if self.runs else 'cancelled'} on {self.date}"
+        )
+
+    class Meta:
+        ordering = ["date"]
+        unique_together = ["service_pattern", "date"]
 
 
 class Journey(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE)
+    # copies of the route's stations for the station boards
+    source = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name="departures",
+        editable=False,
+    )
+    destination = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name="arrivals",
+        editable=False,
+    )
     train = models.ForeignKey(Train, on_delete=models.CASCADE)
     crews = models.ManyToManyField(Crew, related_name="journeys")
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    seat_map = models.BinaryField(default=bytes)
+    # number of bits set in seat_map: sold and held seats
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+    # set on journeys materialized from a service pattern run
+    service_pattern = models.ForeignKey(
+        ServicePattern,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="journeys",
+    )
+    service_date = models.DateField(null=True, blank=True, editable=False)
+    # set on save, for incremental exports; seat bookings don't count
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
+
+    @cached_property
+    def occupancy(self) -> SeatMap:
+        return SeatMap(
+            self.train.cargo_num, self.train.places_in_cargo, self.seat_map
+        )
+
+    def store_occupancy(self):
+        """Copy the in-memory seat map to the stored fields"""
+        self.seat_map = self.occupancy.to_bytes()
+        self.seats_taken = self.occupancy.taken_count()
+
+    @property
+    def taken_seats(self):
+        return [seat for _, seat in self.occupancy.taken()]
+
+    @property
+    def tickets_available(self):
+        return self.train.num_seats - self.seats_taken
+
+    def save(self, *args, **kwargs):
+        self.source_id = self.route.source_id
+        self.destination_id = self.route.destination_id
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "route" in update_fields:
+            kwargs["update_fields"] = {
+                *update_fields, "source", "destination"
+            }
+        return super().save(*args, **kwargs)
 
     def __str__(self):
         return (
@@ -178,6 +374,21 @@ class Journey(models.Model):
             f"departure: {self.departure_time}"
         )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["route", "departure_time"]),
+            models.Index(fields=["departure_time"]),
+            models.Index(fields=["source", "departure_time"]),
+            models.Index(fields=["destination", "arrival_time"]),
+            models.Index(fields=["updated_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["service_pattern", "service_date"],
+                name="station_journey_service_run",
+            ),
+        ]
+
 
 class Ticket(models.Model):
     cargo = models.IntegerField()
@@ -206,6 +417,44 @@ class Ticket(models.Model):
                     }
                 )
 
+    @staticmethod
+    def validate_seats_available(tickets: list, error_to_raise):
+        """Check a batch of tickets for duplicates and taken seats
+        against the seat maps of their journeys. Raises plain messages,
+        the field validator calling it names the field."""
+        requested = set()
+        conflicts = []
+        for ticket in tickets:
+            journey = ticket["journey"]
+            # journeys of service runs without one yet are unsaved
+            key = (
+                journey.id
+                or (journey.service_pattern_id, journey.service_date),
+                ticket["cargo"],
+                ticket["seat"],
+            )
+            if key in requested:
+                raise error_to_raise(
+                    f"seat {ticket["seat"]} in cargo {ticket["cargo"]} "
+                    f"is requested twice"
+                )
+            requested.add(key)
+            if journey.occupancy.is_taken(ticket["cargo"], ticket["seat"]):
+                conflicts.append(key)
+
+        # seats of expired holds are released when the booking takes seats
+        if conflicts and not SeatHold.objects.filter(
+            expires_at__lte=timezone.now(),
+            seats__journey_id__in={key[0] for key in conflicts},
+        ).exists():
+            raise error_to_raise(
+                [
+                    f"seat {seat} in cargo {cargo} of journey "
+                    f"{journey_id} is already taken"
+                    for journey_id, cargo, seat in conflicts
+                ]
+            )
+
     def clean(self):
         Ticket.validate_ticket(
             self.cargo,
@@ -234,3 +483,153 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("journey", "cargo", "seat")
         ordering = ["cargo", "seat"]
+
+
+class SeatHold(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+
+    def __str__(self):
+        return f"{self.user} until {self.expires_at}"
+
+    class Meta:
+        ordering = ["-created_at"]
+
+
+class HeldSeat(models.Model):
+    cargo = models.IntegerField()
+    seat = models.IntegerField()
+    journey = models.ForeignKey(
+        Journey, on_delete=models.CASCADE, related_name="held_seats"
+    )
+    hold = models.ForeignKey(
+        SeatHold, on_delete=models.CASCADE, related_name="seats"
+    )
+
+    def __str__(self):
+        return (
+            f"{str(self.journey)} (cargo: {self.cargo}, seat: {self.seat})"
+        )
+
+    class Meta:
+        unique_together = ("journey", "cargo", "seat")
+        ordering = ["cargo", "seat"]
+
+
+class IdempotencyKey(models.Model):
+    """Response of an order request stored under the client's
+    Idempotency-Key header, replayed for retries of the same request"""
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    @staticmethod
+    def fingerprint_request(request):
+        payload = json.dumps(
+            [request.method, request.path, request.data],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def __str__(self):
+        return f"{self.user}: {self.key}"
+
+    class Meta:
+        unique_together = ("user", "key")
+
+
+class Cancellation(models.Model):
+    """Record of tickets released by cancelling an order or a journey"""
+    created_at = models.DateTimeField(auto_now_add=True)
+    cancelled_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True
+    )
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="cancellations",
+    )
+    journey = models.ForeignKey(
+        Journey,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="cancellations",
+    )
+    tickets_released = models.PositiveIntegerField()
+    reason = models.CharField(max_length=255, blank=True)
+
+    def __str__(self):
+        return f"{self.tickets_released} tickets at {self.created_at}"
+
+    class Meta:
+        ordering = ["-created_at"]
+
+
+class Deletion(models.Model):
+    """Row deleted from an export's table, so exports pulled with
+    ?since= learn about it"""
+    export = models.CharField(max_length=20)
+    row_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.export} {self.row_id} at {self.deleted_at}"
+
+
+class Job(models.Model):
+    """Background job stored in the DB, claimed by `manage.py run_worker`"""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
+
+    class Meta:
+        ordering = ["run_at"]
+        indexes = [
+            models.Index(
+                fields=["run_at"],
+                condition=models.Q(status="pending"),
+                name="station_job_pending_idx",
+            ),
+            models.Index(
+                fields=["locked_at"],
+                condition=models.Q(status="running"),
+                name="station_job_running_idx",
+            ),
+        ]
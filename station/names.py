@@ -0,0 +1,69 @@
+import re
+import unicodedata
+
+# letters without a decomposition to ASCII and Cyrillic transliterated
+# the way station names are usually spelled in Latin script
+TRANSLITERATION = str.maketrans(
+    {
+        "ß": "ss",
+        "æ": "ae",
+        "œ": "oe",
+        "ø": "o",
+        "ł": "l",
+        "đ": "d",
+        "ð": "d",
+        "þ": "th",
+        "ı": "i",
+        "а": "a",
+        "б": "b",
+        "в": "v",
+        "г": "h",
+        "ґ": "g",
+        "д": "d",
+        "е": "e",
+        "є": "ie",
+        "ё": "e",
+        "ж": "zh",
+        "з": "z",
+        "и": "y",
+        "і": "i",
+        "ї": "i",
+        "й": "i",
+        "к": "k",
+        "л": "l",
+        "м": "m",
+        "н": "n",
+        "о": "o",
+        "п": "p",
+        "р": "r",
+        "с": "s",
+        "т": "t",
+        "у": "u",
+        "ф": "f",
+        "х": "kh",
+        "ц": "ts",
+        "ч": "ch",
+        "ш": "sh",
+        "щ": "shch",
+        "ъ": "",
+        "ы": "y",
+        "ь": "",
+        "э": "e",
+        "ю": "iu",
+        "я": "ia",
+        "'": "",
+        "’": "",
+    }
+)
+
+NOT_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name):
+    """Lower case ASCII form of a station name used for searching:
+    'Kraków Główny' -> 'krakow glowny', 'Київ-Пасажирський' ->
+    'kyiv pasazhyrskyi'"""
+    name = name.lower().translate(TRANSLITERATION)
+    name = unicodedata.normalize("NFKD", name)
+    name = name.encode("ascii", "ignore").decode()
+    return NOT_ALPHANUMERIC.sub(" ", name).strip()
@@ -0,0 +1,114 @@
+class SeatMap:
+    """Seat occupancy of one journey packed as one bit per cargo x seat.
+
+    Seat (cargo, seat) maps to bit (cargo - 1) * places_in_cargo + seat - 1,
+    least significant bit of each byte first.
+    """
+
+    def __init__(self, cargo_num, places_in_cargo, data=b""):
+        self.cargo_num = cargo_num
+        self.places_in_cargo = places_in_cargo
+        size = (cargo_num * places_in_cargo + 7) // 8
+        self.bits = bytearray(bytes(data or b"")[:size].ljust(size, b"\0"))
+
+    @property
+    def capacity(self):
+        return self.cargo_num * self.places_in_cargo
+
+    def contains(self, cargo, seat):
+        return (
+            1 <= cargo <= self.cargo_num
+            and 1 <= seat <= self.places_in_cargo
+        )
+
+    def _position(self, cargo, seat):
+        if not self.contains(cargo, seat):
+            raise IndexError(f"No seat {seat} in cargo {cargo}")
+        index = (cargo - 1) * self.places_in_cargo + seat - 1
+        return index >> 3, 1 << (index & 7)
+
+    def is_taken(self, cargo, seat):
+        byte, mask = self._position(cargo, seat)
+        return bool(self.bits[byte] & mask)
+
+    def take(self, cargo, seat):
+        byte, mask = self._position(cargo, seat)
+        self.bits[byte] |= mask
+
+    def release(self, cargo, seat):
+        byte, mask = self._position(cargo, seat)
+        self.bits[byte] &= ~mask
+
+    def taken_count(self):
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def free_count(self):
+        return self.capacity - self.taken_count()
+
+    def cargo_row(self, cargo):
+        """Occupancy of one cargo as an int, bit seat - 1 is set if taken"""
+        as_int = int.from_bytes(self.bits, "little")
+        offset = (cargo - 1) * self.places_in_cargo
+        return (as_int >> offset) & ((1 << self.places_in_cargo) - 1)
+
+    def taken(self):
+        """Yield (cargo, seat) of taken seats ordered by cargo and seat"""
+        for byte_index, byte in enumerate(self.bits):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    cargo, seat = divmod(
+                        byte_index * 8 + bit, self.places_in_cargo
+                    )
+                    yield cargo + 1, seat + 1
+
+    def taken_per_cargo(self):
+        as_int = int.from_bytes(self.bits, "little")
+        row_mask = (1 << self.places_in_cargo) - 1
+        return [
+            ((as_int >> cargo * self.places_in_cargo) & row_mask).bit_count()
+            for cargo in range(self.cargo_num)
+        ]
+
+    def free_runs(self, cargo):
+        """Yield (first seat, length) of runs of adjacent free seats"""
+        free = ~self.cargo_row(cargo) & ((1 << self.places_in_cargo) - 1)
+        while free:
+            start = (free & -free).bit_length() - 1
+            shifted = free >> start
+            length = (shifted ^ (shifted + 1)).bit_length() - 1
+            yield start + 1, length
+            free &= ~(((1 << length) - 1) << start)
+
+    def find_free_seats(self, count, together=True):
+        """Pick count free seats as (cargo, seat) pairs or None.
+
+        With together the smallest run of adjacent free seats that fits
+        the whole group is used, leaving larger runs for larger groups.
+        If no cargo has such a run the group is spread over the largest
+        runs. Otherwise the first free seats are taken.
+        """
+        if count > self.free_count():
+            return None
+        runs = [
+            (cargo, start, length)
+            for cargo in range(1, self.cargo_num + 1)
+            for start, length in self.free_runs(cargo)
+        ]
+        if together:
+            fitting = [run for run in runs if run[2] >= count]
+            if fitting:
+                cargo, start, _ = min(fitting, key=lambda run: run[2])
+                return [(cargo, start + i) for i in range(count)]
+            runs.sort(key=lambda run: -run[2])
+        seats = []
+        for cargo, start, length in runs:
+            take = min(length, count - len(seats))
+            seats.extend((cargo, start + i) for i in range(take))
+            if len(seats) == count:
+                break
+        return sorted(seats)
+
+    def to_bytes(self):
+        return bytes(self.bits)
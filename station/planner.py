@@ -0,0 +1,222 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from station.models import Journey
+
+JOURNEY_FIELDS = (
+    "id",
+    "source_id",
+    "destination_id",
+    "departure_time",
+    "arrival_time",
+)
+
+
+def journey_row(journey_id, source_id, destination_id, departure, arrival):
+    """Timetable row of a journey with times as epoch seconds"""
+    return (
+        journey_id,
+        source_id,
+        destination_id,
+        int(departure.timestamp()),
+        int(arrival.timestamp()),
+    )
+
+
+class Timetable:
+    """Journeys as connections source -> destination sorted by departure.
+
+    Columns are kept in parallel arrays of machine ints, so the
+    timetable of a few hundred thousand journeys takes a few megabytes
+    and is scanned without touching Python objects per journey.
+    """
+
+    def __init__(self, rows=()):
+        rows = sorted(rows, key=lambda row: (row[3], row[0]))
+        self.journey = array("q", (row[0] for row in rows))
+        self.source = array("q", (row[1] for row in rows))
+        self.destination = array("q", (row[2] for row in rows))
+        self.departure = array("q", (row[3] for row in rows))
+        self.arrival = array("q", (row[4] for row in rows))
+        self.departures = {row[0]: row[3] for row in rows}
+        self.built_at = time.monotonic()
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_db(cls, queryset=None):
+        queryset = Journey.objects.all() if queryset is None else queryset
+        return cls(
+            journey_row(*row)
+            for row in queryset.values_list(*JOURNEY_FIELDS).iterator(
+                chunk_size=10000
+            )
+        )
+
+    def __len__(self):
+        return len(self.journey)
+
+    @property
+    def columns(self):
+        return (
+            self.journey,
+            self.source,
+            self.destination,
+            self.departure,
+            self.arrival,
+        )
+
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    def add(self, row):
+        """Insert (or move) one journey keeping the departure order"""
+        with self.lock:
+            self.remove(row[0])
+            position = bisect_right(self.departure, row[3])
+            for column, value in zip(self.columns, row):
+                column.insert(position, value)
+            self.departures[row[0]] = row[3]
+
+    def remove(self, journey_id):
+        with self.lock:
+            departure = self.departures.pop(journey_id, None)
+            if departure is None:
+                return
+            for position in range(
+                bisect_left(self.departure, departure),
+                bisect_right(self.departure, departure),
+            ):
+                if self.journey[position] == journey_id:
+                    for column in self.columns:
+                        del column[position]
+                    return
+
+    def plan(self, source, destination, departure_after, max_transfers,
+             min_transfer, horizon):
+        """Earliest arrival itineraries from source to destination.
+
+        A connection scan: connections are visited once in departure
+        order and arrival[legs][station] keeps the earliest arrival using
+        exactly that many journeys. An itinerary is returned for every
+        number of transfers that arrives earlier than all itineraries with
+        fewer transfers, each as a list of journey ids. Times are epoch
+        seconds, min_transfer and horizon are seconds.
+        """
+        legs = max_transfers + 1
+        infinity = float("inf")
+        # boarding at the source needs no transfer time
+        arrival = [{source: departure_after - min_transfer}]
+        arrival += [{} for _ in range(legs)]
+        parent = [{} for _ in range(legs + 1)]
+        best = [infinity] * (legs + 1)
+        # earliest arrival over all levels, most connections fail here
+        earliest = {source: departure_after - min_transfer}
+
+        with self.lock:
+            departures = self.departure
+            arrivals = self.arrival
+            sources = self.source
+            destinations = self.destination
+            last_departure = departure_after + horizon
+            for index in range(
+                bisect_left(departures, departure_after), len(departures)
+            ):
+                departure = departures[index]
+                # nothing departing after the best direct arrival helps
+                if departure > last_departure or departure >= best[1]:
+                    break
+                from_station = sources[index]
+                boarded = earliest.get(from_station)
+                if boarded is None or boarded + min_transfer > departure:
+                    continue
+                to_station = destinations[index]
+                reached = arrivals[index]
+                for leg in range(1, legs + 1):
+                    boarded = arrival[leg - 1].get(from_station)
+                    if boarded is None or boarded + min_transfer > departure:
+                        continue
+                    if reached >= best[leg] or any(
+                        reached >= level.get(to_station, infinity)
+                        for level in arrival[1:leg + 1]
+                    ):
+                        continue
+                    arrival[leg][to_station] = reached
+                    if reached < earliest.get(to_station, infinity):
+                        earliest[to_station] = reached
+                    parent[leg][to_station] = index
+                    if to_station == destination:
+                        for level in range(leg, legs + 1):
+                            best[level] = min(best[level], reached)
+
+            itineraries = []
+            fastest = infinity
+            for leg in range(1, legs + 1):
+                reached = arrival[leg].get(destination)
+                if reached is None or reached >= fastest:
+                    continue
+                fastest = reached
+                journeys = []
+                station = destination
+                for level in range(leg, 0, -1):
+                    index = parent[level][station]
+                    journeys.append(self.journey[index])
+                    station = self.source[index]
+                itineraries.append(journeys[::-1])
+        return itineraries
+
+
+_timetable = None
+_timetable_lock = threading.Lock()
+
+
+def get_timetable():
+    """The process wide timetable, loaded lazily and reloaded after
+    PLANNER_TIMETABLE_TTL_SECONDS to pick up changes of other processes"""
+    global _timetable
+    with _timetable_lock:
+        if (
+            _timetable is None
+            or _timetable.age() > settings.PLANNER_TIMETABLE_TTL_SECONDS
+        ):
+            _timetable = Timetable.from_db()
+        return _timetable
+
+
+def reset_timetable():
+    global _timetable
+    with _timetable_lock:
+        _timetable = None
+
+
+def refresh_journeys(journey_ids):
+    """Reload changed or deleted journeys into a loaded timetable"""
+    timetable = _timetable
+    if timetable is None:
+        return
+    journey_ids = set(journey_ids)
+    for row in Journey.objects.filter(id__in=journey_ids).values_list(
+        *JOURNEY_FIELDS
+    ):
+        timetable.add(journey_row(*row))
+        journey_ids.discard(row[0])
+    for journey_id in journey_ids:
+        timetable.remove(journey_id)
+
+
+def plan_itineraries(source, destination, departure_after,
+                     max_transfers, min_transfer_minutes=None):
+    """Plan with the shared timetable, see Timetable.plan"""
+    if min_transfer_minutes is None:
+        min_transfer_minutes = settings.PLANNER_MIN_TRANSFER_MINUTES
+    return get_timetable().plan(
+        source,
+        destination,
+        int(departure_after.timestamp()),
+        max_transfers,
+        min_transfer_minutes * 60,
+        settings.PLANNER_SEARCH_HOURS * 3600,
+    )
@@ -0,0 +1,150 @@
+import csv
+import datetime
+import io
+import json
+from itertools import islice
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# types neither encoder knows (Decimal, timedelta, UUID, lazy strings, ...)
+# are converted as by DRF's JSON encoder
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer output encoded with orjson.
+
+    Dates and times are encoded natively, UTC as "Z" like DRF does, but
+    keeping microseconds where DRF cuts them to milliseconds (fields of
+    serializers are strings already). Indented output, as the browsable
+    API asks for, and a missing orjson fall back to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        if data is None:
+            return b""
+        content = orjson.dumps(
+            data,
+            default=encode_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+        # escaped like JSONRenderer does, they end lines in JavaScript
+        if b"\xe2\x80" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return content
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """application/msgpack responses, asked for with an Accept header or
+    ?format=msgpack; values JSON has no type for are encoded as in JSON"""
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default)
+
+
+def encode_export(value):
+    """Exported values JSON has no type for, dates as ISO 8601"""
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return encode_default(value)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """text/csv of a list of dicts, or streamed by stream()"""
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        columns = list(rows[0]) if rows else []
+        return "".join(
+            self.stream(
+                columns,
+                (
+                    [
+                        "; ".join(map(str, row[column]))
+                        if isinstance(row[column], list) else row[column]
+                        for column in columns
+                    ]
+                    for row in rows
+                ),
+            )
+        ).encode()
+
+    @staticmethod
+    def stream(columns, rows, chunk_size=1000):
+        """CSV text of a header and value rows, chunk_size rows a
+        string"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """application/x-ndjson, a JSON object a line, of a list or streamed
+    by stream()"""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"".join(
+            self.lines(data if isinstance(data, list) else [data])
+        )
+
+    @staticmethod
+    def lines(objects):
+        if orjson is not None:
+            for item in objects:
+                yield orjson.dumps(item, default=encode_export) + b"\n"
+        else:
+            for item in objects:
+                yield json.dumps(
+                    item,
+                    default=encode_export,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                ).encode() + b"\n"
+
+    def stream(self, columns, rows, chunk_size=1000):
+        """Objects of the columns and value rows, chunk_size lines a
+        bytes; dates and times as ISO 8601"""
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            yield b"".join(
+                self.lines(dict(zip(columns, row)) for row in chunk)
+            )
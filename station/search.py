@@ -0,0 +1,76 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+
+from station.geo import bounding_box, haversine
+from station.models import Station
+from station.names import normalize_name
+
+# trigram indexes can't help with fewer characters, a prefix index can
+MIN_TRIGRAM_QUERY = 3
+
+
+def search_stations(query, queryset=None, fuzzy=False):
+    """Stations whose normalized name contains the normalized query.
+
+    Short queries match name prefixes (station_search_name_prefix
+    index), longer ones any part of the name (station_search_name_trgm
+    index). With fuzzy, misspelled queries that match nothing fall
+    back to trigram word similarity, most similar first.
+    """
+    queryset = Station.objects.all() if queryset is None else queryset
+    normalized = normalize_name(query or "")
+    if not normalized:
+        return queryset.none()
+    if len(normalized) < MIN_TRIGRAM_QUERY:
+        return queryset.filter(search_name__startswith=normalized)
+    matches = queryset.filter(search_name__contains=normalized)
+    if fuzzy and not matches.exists():
+        return (
+            queryset.filter(search_name__trigram_word_similar=normalized)
+            .annotate(
+                similarity=TrigramWordSimilarity(normalized, "search_name")
+            )
+            .order_by("-similarity", "name")
+        )
+    return matches
+
+
+def stations_in_box(min_latitude, max_latitude, longitude_ranges,
+                    queryset=None):
+    """Stations inside a latitude / longitude box, a range scan on the
+    (latitude, longitude) index per longitude range"""
+    queryset = Station.objects.all() if queryset is None else queryset
+    longitudes = Q()
+    for west, east in longitude_ranges:
+        longitudes |= Q(longitude__range=(west, east))
+    return queryset.filter(
+        longitudes, latitude__range=(min_latitude, max_latitude)
+    )
+
+
+def nearest_stations(latitude, longitude, radius_km, limit, queryset=None):
+    """Up to limit stations within radius_km, nearest first, each with
+    its distance in kilometres set as station.distance"""
+    min_latitude, max_latitude, longitudes = bounding_box(
+        latitude, longitude, radius_km
+    )
+    candidates = []
+    for station_id, station_latitude, station_longitude in stations_in_box(
+        min_latitude, max_latitude, longitudes, queryset
+    ).values_list("id", "latitude", "longitude").order_by():
+        distance = haversine(
+            latitude, longitude, station_latitude, station_longitude
+        )
+        if distance <= radius_km:
+            candidates.append((distance, station_id))
+    candidates.sort()
+    del candidates[limit:]
+    stations = Station.objects.in_bulk(
+        [station_id for _, station_id in candidates]
+    )
+    nearest = []
+    for distance, station_id in candidates:
+        station = stations[station_id]
+        station.distance = distance
+        nearest.append(station)
+    return nearest
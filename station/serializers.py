@@ -1,6 +1,12 @@
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
 from django.db import transaction
+from django.db.models import F, OuterRef
+from django.utils import timezone
 from rest_framework import serializers
 
+from station.booking import book_tickets, hold_seats
+from station.fieldsets import DynamicFieldsMixin, FieldQuery
 from station.models import (
     Crew,
     TrainType,
@@ -11,24 +17,30 @@ from station.models import (
     Journey,
     Ticket,
     Order,
+    SeatHold,
+    HeldSeat,
+    Cancellation,
+    ServiceException,
+    ServicePattern,
 )
+from station.services import materialize_runs, parse_run_key, resolve_run
 
 
-class CrewSerializer(serializers.ModelSerializer):
+class CrewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Crew
         fields = ("id", "first_name", "last_name")
 
 
-class FacilitySerializer(serializers.ModelSerializer):
+class FacilitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Facility
         fields = ("id", "name")
 
 
-class TrainTypeSerializer(serializers.ModelSerializer):
+class TrainTypeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = TrainType
@@ -42,7 +54,7 @@ class TrainTypeImageSerializer(serializers.ModelSerializer):
         fields = ("id", "image")
 
 
-class TrainSerializer(serializers.ModelSerializer):
+class TrainSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Train
@@ -55,6 +67,10 @@ class TrainSerializer(serializers.ModelSerializer):
             "train_type",
             "facilities"
         )
+        field_queries = {
+            "num_seats": FieldQuery(columns=("cargo_num", "places_in_cargo")),
+            "facilities": FieldQuery(prefetch_related=("facilities",)),
+        }
 
 
 class TrainListSerializer(TrainSerializer):
@@ -69,20 +85,84 @@ class TrainListSerializer(TrainSerializer):
         slug_field="name"
     )
 
+    class Meta(TrainSerializer.Meta):
+        field_queries = {
+            **TrainSerializer.Meta.field_queries,
+            "train_type": FieldQuery(select_related=("train_type",)),
+        }
+
+
+class TrainListRowSerializer(TrainListSerializer):
+    """TrainListSerializer output built from rows() of the trains, with
+    facility names aggregated in SQL instead of per train"""
+
+    @staticmethod
+    def rows(queryset):
+        return queryset.values(
+            "id",
+            "number",
+            "cargo_num",
+            "places_in_cargo",
+            train_type_name=F("train_type__name"),
+            facility_names=ArraySubquery(
+                Facility.objects.filter(trains=OuterRef("id"))
+                .order_by("name")
+                .values("name")
+            ),
+        )
+
+    def trim_queryset(self, queryset, columns=()):
+        # rows() reads only what the list shows
+        return queryset
+
+    def to_representation(self, row):
+        representation = {
+            "id": row["id"],
+            "number": row["number"],
+            "cargo_num": row["cargo_num"],
+            "places_in_cargo": row["places_in_cargo"],
+            "num_seats": row["cargo_num"] * row["places_in_cargo"],
+            "train_type": row["train_type_name"],
+            "facilities": row["facility_names"],
+        }
+        return {name: representation[name] for name in self.fields}
+
 
 class TrainRetrieveSerializer(TrainSerializer):
     train_type = TrainTypeSerializer(many=False)
     facilities = FacilitySerializer(many=True)
 
+    class Meta(TrainSerializer.Meta):
+        field_queries = {
+            **TrainSerializer.Meta.field_queries,
+            "train_type": FieldQuery(select_related=("train_type",)),
+        }
+        expandable = {
+            "train_type": FieldQuery(columns=("train_type",)),
+            "facilities": FieldQuery(prefetch_related=("facilities",)),
+        }
+
 
-class StationSerializer(serializers.ModelSerializer):
+class StationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Station
         fields = ("id", "name", "latitude", "longitude")
 
 
-class RouteSerializer(serializers.ModelSerializer):
+class NearbyStationSerializer(StationSerializer):
+    distance = serializers.FloatField(read_only=True)
+
+    class Meta(StationSerializer.Meta):
+        fields = StationSerializer.Meta.fields + ("distance",)
+
+
+class StationAutocompleteSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class RouteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     source = serializers.SlugRelatedField(
         read_only=True,
         many=False,
@@ -97,6 +177,10 @@ class RouteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Route
         fields = ("id", "source", "destination", "distance")
+        field_queries = {
+            "source": FieldQuery(select_related=("source",)),
+            "destination": FieldQuery(select_related=("destination",)),
+        }
 
 
 class JourneySerializer(serializers.ModelSerializer):
@@ -113,7 +197,13 @@ class JourneySerializer(serializers.ModelSerializer):
         )
 
 
-class JourneyListSerializer(serializers.ModelSerializer):
+class ShortestPathSerializer(serializers.Serializer):
+    distance = serializers.IntegerField()
+    stations = StationSerializer(many=True)
+    routes = serializers.ListField(child=serializers.IntegerField())
+
+
+class JourneyListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     train_type_name = serializers.CharField(
         source="train.train_type.name",
         read_only=True
@@ -147,9 +237,75 @@ class JourneyListSerializer(serializers.ModelSerializer):
             "train_num_seats",
             "tickets_available"
         )
+        field_queries = {
+            "train_type_name": FieldQuery(
+                select_related=("train__train_type",)
+            ),
+            "train_type_image": FieldQuery(
+                select_related=("train__train_type",)
+            ),
+            "train_facilities": FieldQuery(
+                select_related=("train",),
+                prefetch_related=("train__facilities",),
+            ),
+            "train_num_seats": FieldQuery(select_related=("train",)),
+            "tickets_available": FieldQuery(
+                columns=("seats_taken",), select_related=("train",)
+            ),
+        }
+
+
+class JourneyListRowSerializer(JourneyListSerializer):
+    """JourneyListSerializer output built from rows() of the journeys,
+    with train details joined and facility names aggregated in SQL"""
+
+    @staticmethod
+    def rows(queryset):
+        return queryset.values(
+            "id",
+            "route",
+            "departure_time",
+            "arrival_time",
+            "seats_taken",
+            train_type_name=F("train__train_type__name"),
+            train_type_image=F("train__train_type__image"),
+            train_num_seats=(
+                F("train__cargo_num") * F("train__places_in_cargo")
+            ),
+            train_facilities=ArraySubquery(
+                Facility.objects.filter(trains=OuterRef("train_id"))
+                .order_by("name")
+                .values("name")
+            ),
+        )
 
-
-class JourneyRetrieveSerializer(JourneySerializer):
+    def trim_queryset(self, queryset, columns=()):
+        # rows() reads only what the list shows
+        return queryset
+
+    def to_representation(self, row):
+        fields = self.fields
+        representation = {
+            "id": row["id"],
+            "route": row["route"],
+            "train_type_name": row["train_type_name"],
+            # an image field without a file serializes as ""
+            "train_type_image": row["train_type_image"] or "",
+            "train_facilities": row["train_facilities"],
+            "train_num_seats": row["train_num_seats"],
+            "tickets_available": (
+                row["train_num_seats"] - row["seats_taken"]
+            ),
+        }
+        for name in ("departure_time", "arrival_time"):
+            if name in fields:
+                representation[name] = fields[name].to_representation(
+                    row[name]
+                )
+        return {name: representation[name] for name in fields}
+
+
+class JourneyRetrieveSerializer(DynamicFieldsMixin, JourneySerializer):
     route = RouteSerializer(many=False, read_only=True)
     train = TrainRetrieveSerializer(many=False, read_only=True)
     crew = serializers.StringRelatedField(
@@ -157,12 +313,11 @@ class JourneyRetrieveSerializer(JourneySerializer):
         read_only=True,
         source="crews"
     )
-    taken_seats = serializers.SlugRelatedField(
-        many=True,
-        read_only=True,
-        slug_field="seat",
-        source="tickets"
+    taken_seats = serializers.ListField(
+        child=serializers.IntegerField(),
+        read_only=True
     )
+    seat_map = serializers.SerializerMethodField()
 
     class Meta:
         model = Journey
@@ -173,15 +328,251 @@ class JourneyRetrieveSerializer(JourneySerializer):
             "crew",
             "departure_time",
             "arrival_time",
-            "taken_seats"
+            "taken_seats",
+            "seat_map"
+        )
+        field_queries = {
+            "route": FieldQuery(
+                select_related=("route__source", "route__destination")
+            ),
+            "train": FieldQuery(
+                select_related=("train__train_type",),
+                prefetch_related=("train__facilities",),
+            ),
+            "crew": FieldQuery(prefetch_related=("crews",)),
+            "taken_seats": FieldQuery(
+                columns=("seat_map",), select_related=("train",)
+            ),
+            "seat_map": FieldQuery(
+                columns=("seat_map",), select_related=("train",)
+            ),
+        }
+        expandable = {
+            "route": FieldQuery(columns=("route",)),
+            "train": FieldQuery(columns=("train",)),
+            "crew": FieldQuery(prefetch_related=("crews",)),
+        }
+
+    def get_seat_map(self, journey) -> list[dict]:
+        seat_map = journey.occupancy
+        taken_seats = [[] for _ in range(seat_map.cargo_num)]
+        for cargo, seat in seat_map.taken():
+            taken_seats[cargo - 1].append(seat)
+        return [
+            {
+                "cargo": cargo,
+                "taken_seats": seats,
+                "free": seat_map.places_in_cargo - len(seats),
+            }
+            for cargo, seats in enumerate(taken_seats, start=1)
+        ]
+
+
+class JourneyAvailabilitySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    taken = serializers.IntegerField()
+    free = serializers.IntegerField()
+    free_per_cargo = serializers.ListField(child=serializers.IntegerField())
+
+
+class DepartureSerializer(serializers.ModelSerializer):
+    destination = serializers.CharField(
+        source="destination.name", read_only=True
+    )
+    train = serializers.IntegerField(source="train.number", read_only=True)
+    train_type = serializers.CharField(
+        source="train.train_type.name", read_only=True
+    )
+    tickets_available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Journey
+        fields = (
+            "id",
+            "departure_time",
+            "arrival_time",
+            "destination",
+            "train",
+            "train_type",
+            "tickets_available",
+        )
+
+
+class ServiceExceptionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ServiceException
+        fields = ("date", "runs")
+
+
+class ServicePatternSerializer(serializers.ModelSerializer):
+    exceptions = ServiceExceptionSerializer(many=True, required=False)
+
+    class Meta:
+        model = ServicePattern
+        fields = (
+            "id",
+            "route",
+            "train",
+            "crews",
+            "departure_time",
+            "travel_time",
+            "weekdays",
+            "valid_from",
+            "valid_to",
+            "exceptions",
+        )
+
+    def validate(self, attrs):
+        data = super(ServicePatternSerializer, self).validate(attrs)
+        ServicePattern.validate_schedule(
+            *(
+                attrs.get(name, getattr(self.instance, name, None))
+                for name in ("valid_from", "valid_to", "travel_time")
+            ),
+            serializers.ValidationError,
+        )
+        dates = [exception["date"] for exception in attrs.get(
+            "exceptions", []
+        )]
+        if len(dates) != len(set(dates)):
+            raise serializers.ValidationError(
+                {"exceptions": "Give each date once"}
+            )
+        return data
+
+    @staticmethod
+    def _set_exceptions(pattern, exceptions):
+        pattern.exceptions.all().delete()
+        ServiceException.objects.bulk_create(
+            ServiceException(service_pattern=pattern, **exception)
+            for exception in exceptions
+        )
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            exceptions = validated_data.pop("exceptions", [])
+            pattern = super().create(validated_data)
+            self._set_exceptions(pattern, exceptions)
+            return pattern
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            exceptions = validated_data.pop("exceptions", None)
+            pattern = super().update(instance, validated_data)
+            if exceptions is not None:
+                self._set_exceptions(pattern, exceptions)
+            return pattern
+
+
+class ServiceRunSerializer(serializers.Serializer):
+    run = serializers.CharField(source="key")
+    service_pattern = serializers.IntegerField(source="service_pattern.id")
+    journey = serializers.IntegerField(source="journey.id", allow_null=True)
+    date = serializers.DateField()
+    source = serializers.CharField(
+        source="service_pattern.route.source.name"
+    )
+    destination = serializers.CharField(
+        source="service_pattern.route.destination.name"
+    )
+    train = serializers.IntegerField(source="service_pattern.train.number")
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    tickets_available = serializers.IntegerField()
+
+
+class ArrivalSerializer(DepartureSerializer):
+    source = serializers.CharField(source="source.name", read_only=True)
+    destination = None
+
+    class Meta(DepartureSerializer.Meta):
+        fields = (
+            "id",
+            "departure_time",
+            "arrival_time",
+            "source",
+            "train",
+            "train_type",
+            "tickets_available",
         )
 
 
+class PlanLegSerializer(serializers.ModelSerializer):
+    source = serializers.CharField(source="route.source.name", read_only=True)
+    destination = serializers.CharField(
+        source="route.destination.name", read_only=True
+    )
+    tickets_available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Journey
+        fields = (
+            "id",
+            "source",
+            "destination",
+            "departure_time",
+            "arrival_time",
+            "tickets_available",
+        )
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    transfers = serializers.IntegerField()
+    legs = PlanLegSerializer(many=True)
+
+
+class TicketJourneyField(serializers.PrimaryKeyRelatedField):
+    """Resolve journeys preloaded for the whole order in one query.
+    A service run key ('12@2024-08-01') gets the run's journey. A run
+    without one gets an unsaved journey, saved when the order or hold
+    is created (see materialize_runs)."""
+
+    def to_internal_value(self, data):
+        journeys = self.context.get("journeys") or {}
+        run = parse_run_key(data)
+        if run is not None:
+            if data not in journeys:
+                journeys[data] = resolve_run(
+                    *run, serializers.ValidationError
+                )
+                self.context["journeys"] = journeys
+            return journeys[data]
+        try:
+            return journeys[int(data)]
+        except (KeyError, TypeError, ValueError):
+            return super().to_internal_value(data)
+
+
+class TicketBulkSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            journey_ids = set()
+            for ticket in data:
+                try:
+                    journey_ids.add(int(ticket["journey"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            self.context["journeys"] = (
+                Journey.objects.select_related("train").in_bulk(journey_ids)
+            )
+        return super().to_internal_value(data)
+
+
 class TicketSerializer(serializers.ModelSerializer):
+    journey = TicketJourneyField(queryset=Journey.objects.all())
 
     class Meta:
         model = Ticket
         fields = ("id", "cargo", "seat", "journey")
+        list_serializer_class = TicketBulkSerializer
+        # seats are checked for the whole order at once
+        # in OrderSerializer.validate_tickets
+        validators = []
 
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs)
@@ -201,12 +592,18 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "created_at", "tickets")
 
+    def validate_tickets(self, tickets):
+        Ticket.validate_seats_available(
+            tickets, serializers.ValidationError
+        )
+        return tickets
+
     def create(self, validated_data):
         with transaction.atomic():
-            ticket_data = validated_data.pop("tickets")
+            tickets_data = validated_data.pop("tickets")
+            materialize_runs(tickets_data, serializers.ValidationError)
             order = Order.objects.create(**validated_data)
-            for ticket_data in ticket_data:
-                Ticket.objects.create(order=order, **ticket_data)
+            book_tickets(order, tickets_data, serializers.ValidationError)
             return order
 
 
@@ -216,3 +613,65 @@ class TicketListSerializer(TicketSerializer):
 
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class HeldSeatSerializer(TicketSerializer):
+
+    class Meta(TicketSerializer.Meta):
+        model = HeldSeat
+
+
+class SeatHoldSerializer(serializers.ModelSerializer):
+    seats = HeldSeatSerializer(many=True, read_only=False, allow_empty=False)
+    minutes = serializers.IntegerField(
+        write_only=True,
+        required=False,
+        min_value=1,
+        max_value=settings.SEAT_HOLD_MAX_MINUTES,
+    )
+
+    class Meta:
+        model = SeatHold
+        fields = ("id", "created_at", "expires_at", "minutes", "seats")
+        read_only_fields = ("expires_at",)
+
+    def validate_seats(self, seats):
+        Ticket.validate_seats_available(seats, serializers.ValidationError)
+        return seats
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            seats_data = validated_data.pop("seats")
+            materialize_runs(seats_data, serializers.ValidationError)
+            minutes = validated_data.pop(
+                "minutes", settings.SEAT_HOLD_MINUTES
+            )
+            hold = SeatHold.objects.create(
+                expires_at=timezone.now() + timezone.timedelta(
+                    minutes=minutes
+                ),
+                **validated_data
+            )
+            hold_seats(hold, seats_data, serializers.ValidationError)
+            return hold
+
+
+class CancellationSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Cancellation
+        fields = (
+            "id",
+            "created_at",
+            "order",
+            "journey",
+            "tickets_released",
+            "reason",
+        )
+        read_only_fields = (
+            "id",
+            "created_at",
+            "order",
+            "journey",
+            "tickets_released",
+        )
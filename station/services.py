@@ -0,0 +1,178 @@
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from station.models import Journey, ServiceException, ServicePattern
+
+RUN_KEY_SEPARATOR = "@"
+
+
+def run_key(pattern_id, day):
+    """Reference of a run that may not have a journey yet: '12@2024-08-01'"""
+    return f"{pattern_id}{RUN_KEY_SEPARATOR}{day.isoformat()}"
+
+
+def parse_run_key(value):
+    """(pattern id, date) of a run key, None for anything else"""
+    if not isinstance(value, str) or RUN_KEY_SEPARATOR not in value:
+        return None
+    pattern_id, _, day = value.partition(RUN_KEY_SEPARATOR)
+    try:
+        return int(pattern_id), datetime.date.fromisoformat(day)
+    except ValueError:
+        return None
+
+
+def run_times(pattern, day):
+    departure_time = timezone.make_aware(
+        datetime.datetime.combine(day, pattern.departure_time)
+    )
+    return departure_time, departure_time + pattern.travel_time
+
+
+class ServiceRun:
+    """One departure of a service pattern, backed by its journey once
+    the first seat of it is booked"""
+
+    def __init__(self, pattern, day, journey=None):
+        self.service_pattern = pattern
+        self.date = day
+        self.journey = journey
+        if journey is None:
+            self.departure_time, self.arrival_time = run_times(pattern, day)
+        else:
+            self.departure_time = journey.departure_time
+            self.arrival_time = journey.arrival_time
+
+    @property
+    def key(self):
+        return run_key(self.service_pattern.id, self.date)
+
+    @property
+    def tickets_available(self):
+        if self.journey is None:
+            return self.service_pattern.train.num_seats
+        return self.journey.tickets_available
+
+
+def expand_runs(patterns, start, end):
+    """Runs of the patterns departing on days start to end, in departure
+    order. Takes three queries whatever the number of days."""
+    patterns = patterns.filter(
+        Q(valid_from__lte=end, valid_to__gte=start)
+        | Q(
+            id__in=ServiceException.objects.filter(
+                date__range=(start, end), runs=True
+            ).values("service_pattern_id")
+        )
+    )
+    pattern_ids = patterns.values("id")
+    exceptions = defaultdict(dict)
+    for pattern_id, day, runs in ServiceException.objects.filter(
+        service_pattern__in=pattern_ids, date__range=(start, end)
+    ).values_list("service_pattern_id", "date", "runs"):
+        exceptions[pattern_id][day] = runs
+    journeys = {
+        (journey.service_pattern_id, journey.service_date): journey
+        for journey in Journey.objects.filter(
+            service_pattern__in=pattern_ids,
+            service_date__range=(start, end),
+        ).select_related("train")
+    }
+    patterns = patterns.select_related(
+        "route__source", "route__destination", "train"
+    )
+
+    runs = []
+    days = [
+        start + datetime.timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+    ]
+    for pattern in patterns:
+        for day in days:
+            if pattern.runs_on(day, exceptions[pattern.id]):
+                runs.append(
+                    ServiceRun(pattern, day, journeys.get((pattern.id, day)))
+                )
+    runs.sort(key=lambda run: (run.departure_time, run.service_pattern.id))
+    return runs
+
+
+def _run_journey(pattern, day, error_to_raise):
+    """The saved journey of the run, or an unsaved one to save"""
+    journey = Journey.objects.filter(
+        service_pattern=pattern, service_date=day
+    ).select_related("train").first()
+    if journey is not None:
+        return journey
+    if not pattern.runs_on(day):
+        raise error_to_raise(
+            {"journey": f"Service pattern {pattern.id} doesn't run "
+                        f"on {day}"}
+        )
+    departure_time, arrival_time = run_times(pattern, day)
+    return Journey(
+        route=pattern.route,
+        train=pattern.train,
+        departure_time=departure_time,
+        arrival_time=arrival_time,
+        service_pattern=pattern,
+        service_date=day,
+    )
+
+
+def _get_pattern(patterns, pattern_id, error_to_raise):
+    pattern = (
+        patterns.select_related("route", "train").filter(id=pattern_id)
+        .first()
+    )
+    if pattern is None:
+        raise error_to_raise(
+            {"journey": f"Service pattern {pattern_id} doesn't exist"}
+        )
+    return pattern
+
+
+def resolve_run(pattern_id, day, error_to_raise):
+    """The journey of a run to validate seats against. Nothing is
+    written: a run without a journey gets an unsaved one with a free
+    seat map, saved by materialize_runs() once the seats are taken."""
+    pattern = _get_pattern(
+        ServicePattern.objects.all(), pattern_id, error_to_raise
+    )
+    return _run_journey(pattern, day, error_to_raise)
+
+
+def materialize_run(pattern_id, day, error_to_raise):
+    """The journey of a run, created with the pattern's crews when first
+    asked for. Concurrent calls wait on the pattern row, so a run never
+    gets two journeys."""
+    with transaction.atomic():
+        pattern = _get_pattern(
+            ServicePattern.objects.select_for_update(),
+            pattern_id,
+            error_to_raise,
+        )
+        journey = _run_journey(pattern, day, error_to_raise)
+        if journey.pk is None:
+            journey.save()
+            journey.crews.set(pattern.crews.all())
+        return journey
+
+
+def materialize_runs(seats_data, error_to_raise):
+    """Swap unsaved run journeys of validated tickets or held seats for
+    saved ones. Call in the transaction that takes the seats, so a
+    rejected booking leaves no journey behind."""
+    journeys = {}
+    for seat in seats_data:
+        journey = seat["journey"]
+        if journey.pk is not None:
+            continue
+        run = (journey.service_pattern_id, journey.service_date)
+        if run not in journeys:
+            journeys[run] = materialize_run(*run, error_to_raise)
+        seat["journey"] = journeys[run]
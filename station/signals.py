@@ -0,0 +1,264 @@
+from django.db import transaction
+from django.db.models.functions import Now
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from station.autocomplete import count_stations, refresh_station
+from station.booking import rebuild_seat_maps, release_seats
+from station.boards import invalidate_boards
+from station.caching import bump_version
+from station.exports import DELETED_EXPORTS
+from station.facilities import sync_facility_ids
+from station.graph import reset_graph
+from station.models import (
+    Crew,
+    Deletion,
+    Facility,
+    Journey,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+)
+from station.names import normalize_name
+from station.planner import refresh_journeys
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_journey(sender, instance, raw, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._previous_journey_id = (
+        Ticket.objects.filter(pk=instance.pk)
+        .values_list("journey_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Ticket)
+def take_ticket_seat(sender, instance, created, raw, **kwargs):
+    """Keep seat maps in sync for tickets saved one by one (e.g. admin)"""
+    if raw:
+        return
+    journey_ids = {instance.journey_id}
+    if not created:
+        journey_ids.add(getattr(instance, "_previous_journey_id", None))
+    rebuild_seat_maps(Journey.objects.filter(id__in=journey_ids))
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, **kwargs):
+    release_seats(instance.journey_id, [(instance.cargo, instance.seat)])
+
+
+@receiver(post_delete, sender=Journey)
+@receiver(post_delete, sender=Route)
+@receiver(post_delete, sender=Ticket)
+def record_export_deletion(sender, instance, **kwargs):
+    Deletion.objects.create(export=DELETED_EXPORTS[sender], row_id=instance.pk)
+
+
+@receiver(post_save, sender=Journey)
+def rebuild_journey_seat_map(sender, instance, created, raw, **kwargs):
+    """A journey may get another train, so its seats are laid out anew"""
+    if raw or created:
+        return
+    rebuild_seat_maps(Journey.objects.filter(id=instance.id))
+
+
+@receiver(post_save, sender=Train)
+def rebuild_train_seat_maps(sender, instance, created, raw, **kwargs):
+    if raw or created:
+        return
+    rebuild_seat_maps(Journey.objects.filter(train=instance))
+
+
+@receiver(post_save, sender=Journey)
+@receiver(post_delete, sender=Journey)
+def refresh_planned_journey(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    journey_id = instance.id
+    transaction.on_commit(lambda: refresh_journeys([journey_id]))
+
+
+@receiver(post_save, sender=Route)
+def copy_route_stations(sender, instance, created, raw, **kwargs):
+    """Move journeys of a changed route to its stations and boards"""
+    if raw or created:
+        return
+    journeys = Journey.objects.filter(route=instance).exclude(
+        source_id=instance.source_id,
+        destination_id=instance.destination_id,
+    )
+    station_ids = {
+        station_id
+        for pair in journeys.values_list(
+            "source_id", "destination_id"
+        ).distinct()
+        for station_id in pair
+    }
+    if not station_ids:
+        return
+    journeys.update(
+        source_id=instance.source_id,
+        destination_id=instance.destination_id,
+        updated_at=Now(),
+    )
+    station_ids |= {instance.source_id, instance.destination_id}
+    transaction.on_commit(lambda: invalidate_boards(*station_ids))
+
+
+@receiver(post_save, sender=Route)
+def refresh_planned_route(sender, instance, created, raw, **kwargs):
+    """Journeys of the route may now run between other stations"""
+    if raw or created:
+        return
+    journey_ids = list(
+        Journey.objects.filter(route=instance).values_list("id", flat=True)
+    )
+    transaction.on_commit(lambda: refresh_journeys(journey_ids))
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+def reset_station_graph(sender, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(reset_graph)
+
+
+@receiver(pre_save, sender=Journey)
+def copy_loaded_journey_stations(sender, instance, raw, **kwargs):
+    """loaddata saves journeys without Journey.save(), fixtures of older
+    dumps have no stations"""
+    if not raw or (
+        instance.source_id is not None
+        and instance.destination_id is not None
+    ):
+        return
+    instance.source_id, instance.destination_id = (
+        Route.objects.filter(id=instance.route_id)
+        .values_list("source_id", "destination_id")
+        .get()
+    )
+
+
+@receiver(pre_save, sender=Journey)
+def remember_journey_stations(sender, instance, raw, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._previous_station_ids = (
+        Journey.objects.filter(pk=instance.pk)
+        .values_list("source_id", "destination_id")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Journey)
+@receiver(post_delete, sender=Journey)
+def invalidate_journey_boards(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    station_ids = {
+        instance.source_id,
+        instance.destination_id,
+        *(getattr(instance, "_previous_station_ids", None) or ()),
+    }
+    transaction.on_commit(lambda: invalidate_boards(*station_ids))
+
+
+@receiver(pre_save, sender=Station)
+def normalize_loaded_station_name(sender, instance, raw, **kwargs):
+    """loaddata saves stations without Station.save()"""
+    if raw:
+        instance.search_name = normalize_name(instance.name)
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+def refresh_autocomplete_station(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    station_id = instance.id
+    transaction.on_commit(lambda: refresh_station(station_id))
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_save, sender=Journey)
+def count_station_popularity(sender, instance, created, raw, **kwargs):
+    """Routes and journeys from or to a station rank it in autocomplete"""
+    if raw or not created:
+        return
+    station_ids = [instance.source_id, instance.destination_id]
+    transaction.on_commit(lambda: count_stations(station_ids, 1))
+
+
+@receiver(post_delete, sender=Route)
+@receiver(post_delete, sender=Journey)
+def uncount_station_popularity(sender, instance, **kwargs):
+    station_ids = [instance.source_id, instance.destination_id]
+    transaction.on_commit(lambda: count_stations(station_ids, -1))
+
+
+@receiver(m2m_changed, sender=Train.facilities.through)
+def sync_train_facility_ids(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_train_ids = list(
+            instance.trains.values_list("id", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        sync_facility_ids(Train.objects.filter(id=instance.id))
+        instance.refresh_from_db(fields=["facility_ids"])
+    elif action == "post_clear":
+        sync_facility_ids(
+            Train.objects.filter(id__in=instance._cleared_train_ids)
+        )
+    else:
+        sync_facility_ids(Train.objects.filter(id__in=pk_set))
+
+
+@receiver(pre_delete, sender=Facility)
+def remember_facility_trains(sender, instance, **kwargs):
+    """Deleting a facility removes M2M rows without m2m_changed"""
+    instance._train_ids = list(
+        instance.trains.values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Facility)
+def drop_facility_from_trains(sender, instance, **kwargs):
+    sync_facility_ids(
+        Train.objects.filter(id__in=getattr(instance, "_train_ids", []))
+    )
+
+
+@receiver(post_save, sender=Crew)
+@receiver(post_delete, sender=Crew)
+@receiver(post_save, sender=Facility)
+@receiver(post_delete, sender=Facility)
+@receiver(post_save, sender=TrainType)
+@receiver(post_delete, sender=TrainType)
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def bump_catalog_version(sender, raw=False, **kwargs):
+    """Cached catalog responses of the model become stale. Bumped again on
+    commit, as another request may cache the old rows in between."""
+    if raw:
+        return
+    bump_version(sender)
+    transaction.on_commit(lambda: bump_version(sender))
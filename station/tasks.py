@@ -0,0 +1,22 @@
+import io
+
+from django.core.management import call_command
+
+from station.jobs import task
+
+
+@task("station.noop")
+def noop(*args, **kwargs):
+    """Does nothing, used to benchmark the job queue"""
+
+
+@task("station.expire_holds")
+def expire_holds(batch_size=1000):
+    call_command("expire_holds", batch_size=batch_size, stdout=io.StringIO())
+
+
+@task("station.purge_idempotency_keys")
+def purge_idempotency_keys(batch_size=10000):
+    call_command(
+        "purge_idempotency_keys", batch_size=batch_size, stdout=io.StringIO()
+    )
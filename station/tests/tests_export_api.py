@@ -0,0 +1,168 @@
+import csv
+import datetime
+import io
+import json
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings, tag
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.booking import cancel_order
+from station.management.commands._bench import JOURNEYS_SQL
+from station.models import Journey, Order, Route, Ticket
+from station.tests.tests_order_api import sample_journey
+
+EXPORT_JOURNEYS_URL = reverse("station:export-journeys")
+EXPORT_ROUTES_URL = reverse("station:export-routes")
+EXPORT_ORDERS_URL = reverse("station:export-orders")
+EXPORT_DELETIONS_URL = reverse("station:export-deletions")
+
+
+def read_stream(response):
+    return b"".join(response.streaming_content).decode()
+
+
+class ExportApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.old_journey = sample_journey(train=self.journey.train)
+        Journey.objects.filter(id=self.old_journey.id).update(
+            updated_at=timezone.now() - timezone.timedelta(days=3)
+        )
+
+    def test_export_requires_admin(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="user@test.com", password="test_password"
+            )
+        )
+        res = self.client.get(EXPORT_JOURNEYS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_journeys_as_ndjson(self):
+        res = self.client.get(EXPORT_JOURNEYS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in read_stream(res).splitlines()]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [self.journey.id, self.old_journey.id],
+        )
+        self.assertEqual(rows[0]["route"], self.journey.route_id)
+        # Postgres drops trailing zeros of microseconds
+        self.assertEqual(
+            datetime.datetime.fromisoformat(rows[0]["departure_time"]),
+            self.journey.departure_time,
+        )
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_export_streams_chunks_of_rows(self):
+        res = self.client.get(EXPORT_JOURNEYS_URL)
+        self.assertEqual(len(list(res.streaming_content)), 2)
+
+    def test_export_since(self):
+        since = (timezone.now() - timezone.timedelta(days=1)).isoformat()
+        res = self.client.get(EXPORT_JOURNEYS_URL, {"since": since})
+        rows = [json.loads(line) for line in read_stream(res).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.journey.id])
+        for since in ("yesterday", "2024-02-30", "2024-02-30T10:00"):
+            res = self.client.get(EXPORT_JOURNEYS_URL, {"since": since})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("since", res.data)
+
+    def test_export_routes_as_csv(self):
+        res = self.client.get(EXPORT_ROUTES_URL, {"format": "csv"})
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(io.StringIO(read_stream(res))))
+        route = Route.objects.get()
+        self.assertEqual(
+            datetime.datetime.fromisoformat(rows[0].pop("updated_at")),
+            route.updated_at,
+        )
+        self.assertEqual(
+            rows,
+            [{"id": str(route.id), "source": str(route.source_id),
+              "destination": str(route.destination_id),
+              "distance": str(route.distance)}],
+        )
+
+    def test_export_orders_a_row_per_ticket(self):
+        order = Order.objects.create(user=self.user)
+        tickets = [
+            Ticket.objects.create(
+                order=order, journey=self.journey, cargo=1, seat=seat
+            )
+            for seat in (1, 2)
+        ]
+        res = self.client.get(EXPORT_ORDERS_URL, HTTP_ACCEPT="text/csv")
+        rows = list(csv.DictReader(io.StringIO(read_stream(res))))
+        self.assertEqual(
+            [(row["order"], row["user"], row["ticket"], row["seat"])
+             for row in rows],
+            [(str(order.id), str(self.user.id), str(ticket.id),
+              str(ticket.seat)) for ticket in tickets],
+        )
+
+    def test_export_deletions_since(self):
+        order = Order.objects.create(user=self.user)
+        tickets = [
+            Ticket.objects.create(
+                order=order, journey=self.journey, cargo=1, seat=seat
+            )
+            for seat in (1, 2)
+        ]
+        since = timezone.now().isoformat()
+        cancel_order(order.id, self.user, ValueError)
+        old_journey_id = self.old_journey.id
+        self.old_journey.delete()
+        res = self.client.get(EXPORT_DELETIONS_URL, {"since": since})
+        rows = [json.loads(line) for line in read_stream(res).splitlines()]
+        self.assertEqual(
+            [(row["export"], row["row"]) for row in rows],
+            [("orders", ticket.id) for ticket in tickets]
+            + [("journeys", old_journey_id)],
+        )
+        res = self.client.get(
+            EXPORT_DELETIONS_URL, {"since": rows[-1]["deleted_at"]}
+        )
+        self.assertEqual(len(read_stream(res).splitlines()), 1)
+
+    @tag("slow")
+    def test_export_million_rows_in_constant_memory(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                JOURNEYS_SQL,
+                {
+                    "routes": [self.journey.route_id],
+                    "route_count": 1,
+                    "train": self.journey.train_id,
+                    "start": timezone.now(),
+                    "minutes": 365 * 24 * 60,
+                    "journeys": 1000000,
+                },
+            )
+        res = self.client.get(EXPORT_JOURNEYS_URL, {"format": "csv"})
+        lines = 0
+        tracemalloc.start()
+        try:
+            for chunk in res.streaming_content:
+                lines += chunk.count(b"\n")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines, 1 + 1000002)
+        self.assertLess(peak, 20 * 1024 * 1024)
@@ -0,0 +1,145 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import Order, SeatHold, Ticket
+from station.tests.tests_order_api import (
+    ORDER_URL,
+    order_payload,
+    sample_journey,
+)
+
+HOLD_URL = reverse("station:seathold-list")
+
+
+def confirm_url(hold_id):
+    return reverse("station:seathold-confirm", args=[hold_id])
+
+
+def hold_payload(journey, seats, cargo=1, **params):
+    payload = {
+        "seats": [
+            {"journey": journey.id, "cargo": cargo, "seat": seat}
+            for seat in seats
+        ]
+    }
+    payload.update(params)
+    return payload
+
+
+class SeatHoldApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def test_hold_takes_seats(self):
+        res = self.client.post(
+            HOLD_URL, hold_payload(self.journey, [1, 2], minutes=5),
+            format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.occupancy.taken_count(), 2)
+        res = self.client.post(
+            ORDER_URL, order_payload(self.journey, [2]), format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(
+            HOLD_URL, hold_payload(self.journey, [2]), format="json"
+        )
+        self.assertEqual(
+            res.data["seats"],
+            [f"seat 2 in cargo 1 of journey {self.journey.id} "
+             f"is already taken"],
+        )
+
+    def test_confirm_hold_creates_order(self):
+        res = self.client.post(
+            HOLD_URL, hold_payload(self.journey, [1, 2]), format="json"
+        )
+        res = self.client.post(confirm_url(res.data["id"]))
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=res.data["id"])
+        self.assertEqual(order.tickets.count(), 2)
+        self.assertFalse(SeatHold.objects.exists())
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.occupancy.taken_count(), 2)
+
+    def test_expired_hold_cannot_be_confirmed(self):
+        res = self.client.post(
+            HOLD_URL, hold_payload(self.journey, [1]), format="json"
+        )
+        SeatHold.objects.update(expires_at=timezone.now())
+        res = self.client.post(confirm_url(res.data["id"]))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_cancelled_journey_releases_its_holds(self):
+        other_journey = sample_journey(train=self.journey.train)
+        res = self.client.post(
+            HOLD_URL,
+            {
+                "seats": hold_payload(self.journey, [1])["seats"]
+                + hold_payload(other_journey, [1])["seats"]
+            },
+            format="json",
+        )
+        self.client.post(
+            reverse("station:journey-cancel-tickets", args=[self.journey.id])
+        )
+        self.assertFalse(SeatHold.objects.exists())
+        other_journey.refresh_from_db()
+        self.assertEqual(other_journey.seats_taken, 0)
+        res = self.client.post(confirm_url(res.data["id"]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Order.objects.exists())
+
+    def test_missing_hold_cannot_be_confirmed(self):
+        res = self.client.post(
+            HOLD_URL, hold_payload(self.journey, [1]), format="json"
+        )
+        self.client.post(confirm_url(res.data["id"]))
+        res = self.client.post(confirm_url(res.data["id"]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_expired_holds_are_swept(self):
+        self.client.post(
+            HOLD_URL, hold_payload(self.journey, [1, 2]), format="json"
+        )
+        self.client.post(
+            HOLD_URL, hold_payload(self.journey, [3]), format="json"
+        )
+        SeatHold.objects.filter(seats__seat=3).update(
+            expires_at=timezone.now()
+        )
+        call_command("expire_holds", stdout=StringIO())
+        self.assertEqual(SeatHold.objects.count(), 1)
+        self.journey.refresh_from_db()
+        self.assertEqual(
+            list(self.journey.occupancy.taken()), [(1, 1), (1, 2)]
+        )
+
+    def test_expired_hold_does_not_block_booking(self):
+        self.client.post(
+            HOLD_URL, hold_payload(self.journey, [1]), format="json"
+        )
+        SeatHold.objects.update(expires_at=timezone.now())
+        res = self.client.post(
+            ORDER_URL, order_payload(self.journey, [1]), format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(SeatHold.objects.exists())
@@ -0,0 +1,75 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from station.jobs import (
+    claim_jobs,
+    enqueue,
+    requeue_stale_jobs,
+    run_jobs,
+    task,
+)
+from station.models import Job
+
+calls = []
+
+
+@task("tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task("tests.fail")
+def fail():
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_due_jobs_are_claimed_and_run(self):
+        enqueue("tests.record", 1)
+        enqueue("tests.record", 2)
+        enqueue(
+            "tests.record", 3,
+            run_at=timezone.now() + timezone.timedelta(hours=1),
+        )
+        jobs = claim_jobs(batch_size=10)
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(claim_jobs(batch_size=10), [])
+        run_jobs(jobs)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertEqual(Job.objects.filter(status=Job.PENDING).count(), 1)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue("tests.fail", max_attempts=2)
+        with self.assertLogs("station.jobs", "ERROR"):
+            run_jobs(claim_jobs(batch_size=1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("boom", job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("station.jobs", "ERROR"):
+            run_jobs(claim_jobs(batch_size=1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_running_jobs_are_requeued(self):
+        enqueue("tests.record", 1)
+        claim_jobs(batch_size=1)
+        self.assertEqual(requeue_stale_jobs(timeout_seconds=60), 0)
+        Job.objects.update(
+            locked_at=timezone.now() - timezone.timedelta(minutes=5)
+        )
+        self.assertEqual(requeue_stale_jobs(timeout_seconds=60), 1)
+        self.assertEqual(len(claim_jobs(batch_size=1)), 1)
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue("tests.missing")
@@ -0,0 +1,539 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import (
+    Crew,
+    Facility,
+    Journey,
+    Order,
+    Route,
+    SeatHold,
+    Station,
+    Ticket,
+)
+from station.planner import reset_timetable
+from station.tests.tests_order_api import sample_journey
+from station.tests.tests_train_api import sample_train
+
+DEMO_DATA = settings.BASE_DIR / "train_station_service_db_data.json"
+
+JOURNEY_URL = reverse("station:journey-list")
+
+
+def detail_url(journey_id):
+    return reverse("station:journey-detail", args=[journey_id])
+
+
+class AuthenticatedJourneyApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        order = Order.objects.create(user=self.user)
+        for cargo, seat in [(1, 3), (2, 1)]:
+            Ticket.objects.create(
+                order=order, journey=self.journey, cargo=cargo, seat=seat
+            )
+
+    def test_journey_list_tickets_available(self):
+        res = self.client.get(JOURNEY_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"][0]["tickets_available"],
+            self.journey.train.num_seats - 2
+        )
+
+    def test_journey_detail_seat_map(self):
+        res = self.client.get(detail_url(self.journey.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["taken_seats"], [3, 1])
+        self.assertEqual(
+            res.data["seat_map"][1],
+            {
+                "cargo": 2,
+                "taken_seats": [1],
+                "free": self.journey.train.places_in_cargo - 1,
+            }
+        )
+
+
+def assign_seats_url(journey_id):
+    return reverse("station:journey-assign-seats", args=[journey_id])
+
+
+class AssignSeatsApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey(
+            train=sample_train(cargo_num=2, places_in_cargo=6)
+        )
+        order = Order.objects.create(user=self.user)
+        for cargo, seat in [(1, 3), (2, 4)]:
+            Ticket.objects.create(
+                order=order, journey=self.journey, cargo=cargo, seat=seat
+            )
+
+    def test_assign_adjacent_seats_as_hold(self):
+        res = self.client.post(
+            f"{assign_seats_url(self.journey.id)}?count=3&together=true"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(seat["cargo"], seat["seat"]) for seat in res.data["seats"]],
+            [(1, 4), (1, 5), (1, 6)]
+        )
+        self.assertTrue(SeatHold.objects.filter(user=self.user).exists())
+
+    def test_assign_seats_and_book(self):
+        res = self.client.post(
+            f"{assign_seats_url(self.journey.id)}?count=4&book=true"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tickets"]), 4)
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.occupancy.free_count(), 6)
+
+    def test_assign_more_seats_than_free(self):
+        res = self.client.post(
+            f"{assign_seats_url(self.journey.id)}?count=11"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReconcileSeatsTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.journey = sample_journey()
+        order = Order.objects.create(user=self.user)
+        for seat in (1, 2, 3):
+            Ticket.objects.create(
+                order=order, journey=self.journey, cargo=1, seat=seat
+            )
+
+    def test_tickets_keep_counter_in_sync(self):
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.seats_taken, 3)
+        Ticket.objects.filter(seat=2).delete()
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.seats_taken, 2)
+
+    def test_reconcile_fixes_drift(self):
+        Journey.objects.update(seat_map=b"", seats_taken=7)
+        out = StringIO()
+        call_command("reconcile_seats", stdout=out)
+        self.assertIn("seats_taken 7 -> 3", out.getvalue())
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.seats_taken, 3)
+        self.assertEqual(
+            list(self.journey.occupancy.taken()), [(1, 1), (1, 2), (1, 3)]
+        )
+
+    def test_reconcile_dry_run_keeps_stored_values(self):
+        Journey.objects.update(seats_taken=7)
+        call_command("reconcile_seats", "--dry-run", stdout=StringIO())
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.seats_taken, 7)
+
+
+class JourneyAvailabilityApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.journeys = [
+            sample_journey(train=sample_train(
+                number=number, cargo_num=2, places_in_cargo=4
+            ))
+            for number in (91001, 91002)
+        ]
+        order = Order.objects.create(user=self.user)
+        for cargo, seat in [(1, 1), (2, 1), (2, 2)]:
+            Ticket.objects.create(
+                order=order, journey=self.journeys[1], cargo=cargo, seat=seat
+            )
+
+    def test_availability_of_many_journeys_in_one_query(self):
+        ids = f"{self.journeys[1].id},{self.journeys[0].id}"
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                reverse("station:journey-availability"), {"ids": ids}
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [
+                {
+                    "id": self.journeys[1].id,
+                    "capacity": 8,
+                    "taken": 3,
+                    "free": 5,
+                    "free_per_cargo": [3, 2],
+                },
+                {
+                    "id": self.journeys[0].id,
+                    "capacity": 8,
+                    "taken": 0,
+                    "free": 8,
+                    "free_per_cargo": [4, 4],
+                },
+            ]
+        )
+
+    def test_availability_requires_ids(self):
+        res = self.client.get(
+            reverse("station:journey-availability"), {"ids": "a,b"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+JOURNEY_PLAN_URL = reverse("station:journey-plan")
+
+
+class JourneyPlanApiTests(TestCase):
+
+    def setUp(self) -> None:
+        reset_timetable()
+        self.addCleanup(reset_timetable)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.train = sample_train()
+        self.stations = [
+            Station.objects.create(
+                name=f"Test_{name}", latitude=48, longitude=16 + i
+            )
+            for i, name in enumerate(["Berlin", "Prague", "Vienna"])
+        ]
+        self.start = timezone.now() + timezone.timedelta(days=1)
+        self.to_prague = self.sample_leg(0, 1, 0, 60)
+        self.short_change = self.sample_leg(1, 2, 65, 120)
+        self.to_vienna = self.sample_leg(1, 2, 90, 150)
+        self.direct = self.sample_leg(0, 2, 10, 240)
+
+    def sample_leg(self, source, destination, departs, arrives):
+        route, _ = Route.objects.get_or_create(
+            source=self.stations[source],
+            destination=self.stations[destination],
+            defaults={"distance": 300},
+        )
+        return Journey.objects.create(
+            route=route,
+            train=self.train,
+            departure_time=self.start + timezone.timedelta(minutes=departs),
+            arrival_time=self.start + timezone.timedelta(minutes=arrives),
+        )
+
+    def plan(self, **params):
+        params.setdefault("source", self.stations[0].id)
+        params.setdefault("destination", self.stations[2].id)
+        res = self.client.get(JOURNEY_PLAN_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [
+            [leg["id"] for leg in itinerary["legs"]] for itinerary in res.data
+        ]
+
+    def test_plan_direct_and_with_transfer(self):
+        self.assertEqual(
+            self.plan(),
+            [[self.direct.id], [self.to_prague.id, self.to_vienna.id]],
+        )
+        self.assertEqual(self.plan(max_transfers=0), [[self.direct.id]])
+
+    def test_plan_respects_minimum_transfer_time(self):
+        self.assertEqual(
+            self.plan(min_transfer_minutes=0)[1],
+            [self.to_prague.id, self.short_change.id],
+        )
+
+    def test_plan_follows_journey_changes(self):
+        self.plan()
+        with self.captureOnCommitCallbacks(execute=True):
+            faster = self.sample_leg(0, 2, 20, 100)
+            self.to_prague.delete()
+        self.assertEqual(self.plan(), [[faster.id]])
+
+    def test_plan_rejects_same_stations(self):
+        res = self.client.get(
+            JOURNEY_PLAN_URL,
+            {"source": self.stations[0].id, "destination": self.stations[0].id}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_plan_rejects_impossible_departure(self):
+        res = self.client.get(
+            JOURNEY_PLAN_URL,
+            {
+                "source": self.stations[0].id,
+                "destination": self.stations[2].id,
+                "departure_after": "2024-02-30T10:00",
+            },
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["departure_after"], "Give an ISO 8601 datetime"
+        )
+
+
+class JourneyFilterApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        train = sample_train()
+        day = timezone.localtime().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        ) + timezone.timedelta(days=2)
+        self.day = day.date()
+        self.early = sample_journey(
+            train=train,
+            departure_time=day + timezone.timedelta(hours=6),
+            arrival_time=day + timezone.timedelta(hours=7),
+        )
+        self.late = sample_journey(
+            train=train,
+            departure_time=day + timezone.timedelta(hours=23, minutes=30),
+            arrival_time=day + timezone.timedelta(hours=25),
+        )
+        self.next_day = sample_journey(
+            train=train,
+            departure_time=day + timezone.timedelta(hours=24),
+            arrival_time=day + timezone.timedelta(hours=25),
+        )
+        route = Route.objects.create(
+            source=Station.objects.create(
+                name="Test_Prague", latitude=50.07, longitude=14.43
+            ),
+            destination=self.early.route.source,
+            distance=330,
+        )
+        self.from_prague = sample_journey(
+            train=train,
+            route=route,
+            departure_time=day + timezone.timedelta(hours=8),
+            arrival_time=day + timezone.timedelta(hours=12),
+        )
+
+    def journey_ids(self, **params):
+        res = self.client.get(JOURNEY_URL, {"page_size": 100, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [journey["id"] for journey in res.data["results"]]
+
+    def test_filter_by_departure_date(self):
+        self.assertEqual(
+            self.journey_ids(departure_date=self.day.isoformat()),
+            [self.early.id, self.late.id, self.from_prague.id],
+        )
+
+    def test_filter_by_departure_window(self):
+        self.assertEqual(
+            self.journey_ids(
+                departure_from=f"{self.day}T07:00:00",
+                departure_to=f"{self.day}T23:59:00",
+            ),
+            [self.late.id, self.from_prague.id],
+        )
+
+    def test_filter_by_stations(self):
+        self.assertEqual(
+            self.journey_ids(
+                source="prague",
+                destination="bratislava",
+                departure_date=self.day.isoformat(),
+            ),
+            [self.from_prague.id],
+        )
+        self.assertEqual(
+            self.journey_ids(source="brat", destination="vienna"),
+            [self.early.id, self.late.id, self.next_day.id],
+        )
+
+    def test_filter_by_train_facilities(self):
+        wifi = Facility.objects.create(name="WiFi")
+        wc = Facility.objects.create(name="WC")
+        self.early.train.facilities.add(wifi)
+        train = sample_train(number=90002)
+        train.facilities.add(wifi, wc)
+        self.from_prague.train = train
+        self.from_prague.save()
+        self.assertEqual(
+            self.journey_ids(facilities=f"{wifi.id},{wc.id}"),
+            [self.early.id, self.late.id, self.next_day.id,
+             self.from_prague.id],
+        )
+        self.assertEqual(
+            self.journey_ids(facilities_all=f"{wifi.id},{wc.id}"),
+            [self.from_prague.id],
+        )
+
+    def test_fast_list_matches_journey_list(self):
+        self.early.train.facilities.add(
+            Facility.objects.create(name="WiFi"),
+            Facility.objects.create(name="WC"),
+        )
+        self.early.train.train_type.image = "uploads/train/test_fast.jpg"
+        self.early.train.train_type.save()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(
+            order=order, journey=self.late, cargo=1, seat=2
+        )
+        params = {"page_size": 100, "source": "brat"}
+        res = self.client.get(JOURNEY_URL, params)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            fast = self.client.get(JOURNEY_URL, params)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(fast.data["results"]), 3)
+        self.assertEqual(fast.data, res.data)
+
+    def test_invalid_date_is_rejected(self):
+        res = self.client.get(JOURNEY_URL, {"departure_date": "tomorrow"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_impossible_date_is_rejected(self):
+        for params in (
+            {"departure_date": "2024-02-30"},
+            {"departure_from": "2024-02-30T10:00"},
+            {"departure_to": "2024-02-30"},
+        ):
+            res = self.client.get(JOURNEY_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(list(res.data), list(params))
+
+    def test_cursor_pagination_by_departure(self):
+        res = self.client.get(
+            JOURNEY_URL, {"pagination": "cursor", "page_size": 3}
+        )
+        self.assertNotIn("count", res.data)
+        ids = [journey["id"] for journey in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        ids += [journey["id"] for journey in res.data["results"]]
+        self.assertEqual(
+            ids,
+            [self.early.id, self.from_prague.id, self.late.id,
+             self.next_day.id],
+        )
+        self.assertIsNone(res.data["next"])
+
+
+class JourneyFieldsetApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        self.journey.train.facilities.add(Facility.objects.create(name="WC"))
+        self.crew = Crew.objects.create(first_name="Ann", last_name="Lee")
+        self.journey.crews.add(self.crew)
+
+    def get(self, url, queries, **params):
+        with self.assertNumQueries(queries):
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_retrieve_only_some_fields(self):
+        full = self.get(detail_url(self.journey.id), 6)
+        data = self.get(
+            detail_url(self.journey.id), 1, fields="id,departure_time"
+        )
+        self.assertEqual(
+            data,
+            {"id": full["id"], "departure_time": full["departure_time"]},
+        )
+
+    def test_retrieve_relations_as_ids(self):
+        full = self.get(detail_url(self.journey.id), 6)
+        data = self.get(detail_url(self.journey.id), 2, expand="")
+        self.assertEqual(data["route"], self.journey.route_id)
+        self.assertEqual(data["train"], self.journey.train_id)
+        self.assertEqual(data["crew"], [self.crew.id])
+        self.assertEqual(data["seat_map"], full["seat_map"])
+        data = self.get(
+            detail_url(self.journey.id), 2, fields="route,train",
+            expand="train",
+        )
+        self.assertEqual(
+            data, {"route": self.journey.route_id, "train": full["train"]}
+        )
+        data = self.get(detail_url(self.journey.id), 1, fields="route")
+        self.assertEqual(data["route"], full["route"])
+
+    def test_list_only_some_fields(self):
+        results = self.get(
+            JOURNEY_URL, 2, fields="id,tickets_available"
+        )["results"]
+        self.assertEqual(
+            results,
+            [{"id": self.journey.id,
+              "tickets_available": self.journey.tickets_available}],
+        )
+        results = self.get(
+            JOURNEY_URL, 2, fields="train_facilities",
+            pagination="cursor",
+        )["results"]
+        self.assertEqual(results, [{"train_facilities": ["WC"]}])
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            fast = self.get(
+                JOURNEY_URL, 2, fields="id,tickets_available"
+            )["results"]
+        self.assertEqual(
+            fast,
+            [{"id": self.journey.id,
+              "tickets_available": self.journey.tickets_available}],
+        )
+
+    def test_unknown_fields_are_rejected(self):
+        res = self.client.get(detail_url(self.journey.id), {"fields": "x"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(JOURNEY_URL, {"expand": "train"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", res.data)
+
+
+class DemoDataTests(TestCase):
+
+    def test_demo_data_loads_with_journey_stations(self):
+        call_command("loaddata", DEMO_DATA, stdout=StringIO())
+        self.assertTrue(Journey.objects.exists())
+        for journey in Journey.objects.select_related("route"):
+            self.assertEqual(
+                (journey.source_id, journey.destination_id),
+                (journey.route.source_id, journey.route.destination_id),
+            )
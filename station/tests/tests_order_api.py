@@ -0,0 +1,338 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.booking import STRATEGIES, OptimisticStrategy, SeatMapChanged
+
+from station.models import (
+    Cancellation,
+    IdempotencyKey,
+    Journey,
+    Order,
+    Route,
+    Station,
+    Ticket,
+)
+from station.tests.tests_train_api import sample_train
+
+ORDER_URL = reverse("station:order-list")
+
+
+def sample_journey(**params) -> Journey:
+    source, _ = Station.objects.get_or_create(
+        name="Test_Bratislava", latitude=48.1486, longitude=17.1077
+    )
+    destination, _ = Station.objects.get_or_create(
+        name="Test_Vienna", latitude=48.2082, longitude=16.3738
+    )
+    route, _ = Route.objects.get_or_create(
+        source=source, destination=destination, defaults={"distance": 80}
+    )
+    departure_time = timezone.now() + timezone.timedelta(days=1)
+    defaults = {
+        "route": route,
+        "departure_time": departure_time,
+        "arrival_time": departure_time + timezone.timedelta(hours=1),
+    }
+    defaults.update(params)
+    if "train" not in defaults:
+        defaults["train"] = sample_train()
+    return Journey.objects.create(**defaults)
+
+
+def order_payload(journey, seats, cargo=1):
+    return {
+        "tickets": [
+            {"journey": journey.id, "cargo": cargo, "seat": seat}
+            for seat in seats
+        ]
+    }
+
+
+class OrderCreateApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def test_create_order_with_tickets(self):
+        res = self.client.post(
+            ORDER_URL, order_payload(self.journey, [1, 2, 3]), format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tickets"]), 3)
+        self.assertEqual(
+            Ticket.objects.filter(journey=self.journey).count(), 3
+        )
+
+    def test_queries_do_not_grow_with_order_size(self):
+        query_counts = []
+        for seats in ([1, 2], [3, 4, 5, 6, 7, 8, 9, 10, 11, 12]):
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(
+                    ORDER_URL,
+                    order_payload(self.journey, seats),
+                    format="json"
+                )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            query_counts.append(len(context.captured_queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_taken_seat_rejected(self):
+        self.client.post(
+            ORDER_URL, order_payload(self.journey, [5]), format="json"
+        )
+        res = self.client.post(
+            ORDER_URL, order_payload(self.journey, [4, 5]), format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"],
+            [f"seat 5 in cargo 1 of journey {self.journey.id} "
+             f"is already taken"],
+        )
+        self.assertEqual(
+            Ticket.objects.filter(journey=self.journey).count(), 1
+        )
+
+    def test_duplicate_seat_in_order_rejected(self):
+        res = self.client.post(
+            ORDER_URL, order_payload(self.journey, [7, 7]), format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"], ["seat 7 in cargo 1 is requested twice"]
+        )
+
+    def test_seat_out_of_train_range_rejected(self):
+        res = self.client.post(
+            ORDER_URL,
+            order_payload(self.journey, [1], cargo=99),
+            format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_order_takes_seats_on_seat_map(self):
+        self.client.post(
+            ORDER_URL, order_payload(self.journey, [1, 2], cargo=3),
+            format="json"
+        )
+        self.journey.refresh_from_db()
+        self.assertEqual(
+            list(self.journey.occupancy.taken()), [(3, 1), (3, 2)]
+        )
+
+    def test_deleting_order_releases_seats(self):
+        self.client.post(
+            ORDER_URL, order_payload(self.journey, [1, 2]), format="json"
+        )
+        Order.objects.get(user=self.user).delete()
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.occupancy.taken_count(), 0)
+
+    def test_destroying_order_releases_seats_in_bulk(self):
+        query_counts = []
+        seats = range(1, 21)
+        for tickets in (
+            order_payload(self.journey, [1, 2])["tickets"],
+            order_payload(self.journey, seats, cargo=2)["tickets"]
+            + order_payload(self.journey, seats, cargo=3)["tickets"],
+        ):
+            res = self.client.post(
+                ORDER_URL, {"tickets": tickets}, format="json"
+            )
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.delete(
+                    reverse("station:order-detail", args=[res.data["id"]])
+                )
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            query_counts.append(len(context.captured_queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.occupancy.taken_count(), 0)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_order_list_cursor_pagination(self):
+        orders = [Order.objects.create(user=self.user) for _ in range(3)]
+        res = self.client.get(ORDER_URL, {"pagination": "cursor"})
+        self.assertNotIn("count", res.data)
+        ids = [res.data["results"][0]["id"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            ids += [order["id"] for order in res.data["results"]]
+        self.assertEqual(ids, [order.id for order in reversed(orders)])
+
+
+class OrderIdempotencyApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def post_order(self, seats, key="order-key-1"):
+        return self.client.post(
+            ORDER_URL,
+            order_payload(self.journey, seats),
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def test_retry_replays_stored_response(self):
+        first = self.post_order([1, 2])
+        with CaptureQueriesContext(connection) as context:
+            retry = self.post_order([1, 2])
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertFalse(
+            any("station_ticket" in query["sql"]
+                for query in context.captured_queries)
+        )
+
+    def test_key_reused_for_other_request(self):
+        self.post_order([1])
+        res = self.post_order([2])
+        self.assertEqual(
+            res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    def test_failed_request_is_not_stored(self):
+        self.post_order([1], key="other-key")
+        res = self.post_order([1])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            IdempotencyKey.objects.filter(key="order-key-1").exists()
+        )
+
+    def test_purge_expired_keys(self):
+        self.post_order([1])
+        self.post_order([2], key="order-key-2")
+        IdempotencyKey.objects.filter(key="order-key-1").update(
+            expires_at=timezone.now()
+        )
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list("key", flat=True)),
+            ["order-key-2"]
+        )
+
+
+class BookingStrategyTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+
+    def test_every_strategy_books_and_rejects_taken_seats(self):
+        for seat, name in enumerate(STRATEGIES, start=1):
+            with override_settings(BOOKING_LOCK_STRATEGY=name):
+                res = self.client.post(
+                    ORDER_URL, order_payload(self.journey, [seat]),
+                    format="json"
+                )
+                self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+                res = self.client.post(
+                    ORDER_URL, order_payload(self.journey, [seat]),
+                    format="json"
+                )
+                self.assertEqual(
+                    res.status_code, status.HTTP_400_BAD_REQUEST
+                )
+        self.journey.refresh_from_db()
+        self.assertEqual(
+            self.journey.occupancy.taken_count(), len(STRATEGIES)
+        )
+
+    def test_optimistic_save_detects_concurrent_change(self):
+        strategy = OptimisticStrategy()
+        journey = strategy.lock([self.journey.id])[0]
+        Journey.objects.filter(id=journey.id).update(seat_map=b"\x01")
+        journey.occupancy.take(1, 2)
+        journey.seat_map = journey.occupancy.to_bytes()
+        with self.assertRaises(SeatMapChanged):
+            strategy.save([journey])
+
+
+def cancel_order_url(order_id):
+    return reverse("station:order-cancel", args=[order_id])
+
+
+class CancellationApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.journey = sample_journey()
+        for seats in ([1, 2], [3], [4, 5, 6]):
+            self.client.post(
+                ORDER_URL, order_payload(self.journey, seats), format="json"
+            )
+
+    def test_cancel_order_releases_its_seats(self):
+        order = Order.objects.get(tickets__seat=3)
+        res = self.client.post(
+            cancel_order_url(order.id), {"reason": "plans changed"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["tickets_released"], 1)
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.seats_taken, 5)
+        self.assertFalse(self.journey.occupancy.is_taken(1, 3))
+        self.assertEqual(order.cancellations.get().reason, "plans changed")
+
+    def test_cancel_journey_releases_all_seats(self):
+        with self.assertNumQueries(10):
+            res = self.client.post(
+                reverse(
+                    "station:journey-cancel-tickets", args=[self.journey.id]
+                )
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["tickets_released"], 6)
+        self.assertFalse(Ticket.objects.exists())
+        self.journey.refresh_from_db()
+        self.assertEqual(self.journey.seats_taken, 0)
+        self.assertEqual(self.journey.occupancy.taken_count(), 0)
+        self.assertEqual(
+            Cancellation.objects.filter(order__isnull=False).count(), 3
+        )
+
+    def test_cancelled_order_cannot_be_cancelled_again(self):
+        order = Order.objects.get(tickets__seat=3)
+        self.client.post(cancel_order_url(order.id))
+        res = self.client.post(cancel_order_url(order.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(order.cancellations.count(), 1)
@@ -0,0 +1,91 @@
+import datetime
+import json
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from station.models import Facility
+from station.renderers import ORJSONRenderer, msgpack, orjson
+from station.tests.tests_order_api import sample_journey
+
+JOURNEY_URL = reverse("station:journey-list")
+STATION_URL = reverse("station:station-list")
+
+
+@unittest.skipIf(orjson is None, "orjson isn't installed")
+class ORJSONRendererTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        journey = sample_journey()
+        journey.train.facilities.add(Facility.objects.create(name="Café"))
+
+    def test_responses_match_json_renderer(self):
+        for url in (JOURNEY_URL, STATION_URL):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res["Content-Type"], "application/json")
+            self.assertEqual(
+                res.content,
+                JSONRenderer().render(res.data, "application/json"),
+            )
+
+    def test_values_json_has_no_type_for(self):
+        data = {
+            "latitude": Decimal("48.1486000"),
+            "at": datetime.datetime(
+                2024, 7, 1, 8, 30, tzinfo=datetime.timezone.utc
+            ),
+            "day": datetime.date(2024, 7, 1),
+            "took": datetime.timedelta(minutes=90),
+            "line": "one\u2028two",
+            1: "key",
+        }
+        self.assertEqual(
+            ORJSONRenderer().render(data, "application/json"),
+            JSONRenderer().render(data, "application/json"),
+        )
+
+    def test_indented_output_falls_back(self):
+        media_type = "application/json; indent=2"
+        self.assertEqual(
+            ORJSONRenderer().render({"a": [1]}, media_type),
+            JSONRenderer().render({"a": [1]}, media_type),
+        )
+
+
+@unittest.skipIf(msgpack is None, "msgpack isn't installed")
+class MessagePackRendererTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        sample_journey()
+
+    def test_msgpack_by_content_negotiation(self):
+        res = self.client.get(JOURNEY_URL)
+        packed = self.client.get(
+            JOURNEY_URL, HTTP_ACCEPT="application/msgpack"
+        )
+        self.assertEqual(packed.status_code, status.HTTP_200_OK)
+        self.assertEqual(packed["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            msgpack.unpackb(packed.content), json.loads(res.content)
+        )
+        packed = self.client.get(STATION_URL, {"format": "msgpack"})
+        self.assertEqual(packed["Content-Type"], "application/msgpack")
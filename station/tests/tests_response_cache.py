@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.db import DatabaseCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.caching import (
+    bump_version,
+    model_versions,
+    new_version,
+    response_cache,
+    version_key,
+)
+from station.models import Facility, Route
+from station.tests.tests_route_api import sample_station
+
+FACILITY_URL = reverse("station:facility-list")
+ROUTE_URL = reverse("station:route-list")
+
+
+# the query counts assume a cache outside the DB
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        settings.RESPONSE_CACHE_ALIAS: settings.RESPONSE_CACHE_BACKENDS[
+            "locmem"
+        ],
+    }
+)
+class ResponseCacheTests(TestCase):
+
+    def setUp(self) -> None:
+        response_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        Facility.objects.create(name="WiFi")
+
+    def test_repeated_list_is_served_from_cache(self):
+        res = self.client.get(FACILITY_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            cached = self.client.get(FACILITY_URL)
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached["ETag"], res["ETag"])
+        self.assertEqual(cached["Vary"], "Accept, Authorization")
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(FACILITY_URL)["ETag"]
+        with self.assertNumQueries(0):
+            res = self.client.get(FACILITY_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res["Vary"], "Accept, Authorization")
+        res = self.client.get(
+            f"{FACILITY_URL}?page=1", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_writes_make_cached_responses_stale(self):
+        etag = self.client.get(FACILITY_URL)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Facility.objects.create(name="WC")
+        res = self.client.get(FACILITY_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(
+            [facility["name"] for facility in res.data], ["WC", "WiFi"]
+        )
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_route_responses_depend_on_stations(self):
+        source = sample_station("Test_Bratislava", 48.1486, 17.1077)
+        Route.objects.create(
+            source=source,
+            destination=sample_station("Test_Vienna", 48.2082, 16.3738),
+            distance=80,
+        )
+        self.client.get(ROUTE_URL)
+        source.name = "Test_Pressburg"
+        source.save()
+        res = self.client.get(ROUTE_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["source"], "Test_Pressburg")
+
+    @override_settings(RESPONSE_CACHE_SECONDS=0)
+    def test_cache_can_be_turned_off(self):
+        self.client.get(FACILITY_URL)
+        res = self.client.get(FACILITY_URL)
+        self.assertNotIn("X-Cache", res)
+        self.assertNotIn("ETag", res)
+
+
+class SharedResponseCacheTests(TestCase):
+
+    def setUp(self) -> None:
+        response_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email="test@test.com",
+                password="test_password"
+            )
+        )
+        Facility.objects.create(name="WiFi")
+
+    def test_writes_of_other_processes_make_responses_stale(self):
+        etag = self.client.get(FACILITY_URL)["ETag"]
+        # the version as another worker process bumps it
+        other_process_cache = DatabaseCache(
+            settings.RESPONSE_CACHE_BACKENDS["db"]["LOCATION"], {}
+        )
+        other_process_cache.set(version_key(Facility), new_version(), None)
+        res = self.client.get(FACILITY_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-Cache"], "MISS")
+
+    def test_every_bump_gives_a_new_version(self):
+        versions = set()
+        for _ in range(3):
+            bump_version(Facility)
+            versions.add(model_versions([Facility])[0])
+        self.assertEqual(len(versions), 3)
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.graph import reset_graph
+from station.models import Route, Station
+
+ROUTE_URL = reverse("station:route-list")
+ROUTE_SHORTEST_URL = reverse("station:route-shortest")
+STATION_URL = reverse("station:station-list")
+
+
+def sample_station(name, latitude, longitude):
+    return Station.objects.create(
+        name=name, latitude=latitude, longitude=longitude
+    )
+
+
+class ShortestRouteApiTests(TestCase):
+
+    def setUp(self) -> None:
+        reset_graph()
+        self.addCleanup(reset_graph)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.berlin = sample_station("Test_Berlin", 52.52, 13.405)
+        self.prague = sample_station("Test_Prague", 50.0755, 14.4378)
+        self.vienna = sample_station("Test_Vienna", 48.2082, 16.3738)
+        Route.objects.create(
+            source=self.berlin, destination=self.prague, distance=350
+        )
+        Route.objects.create(
+            source=self.prague, destination=self.vienna, distance=330
+        )
+        self.direct = Route.objects.create(
+            source=self.berlin, destination=self.vienna, distance=900
+        )
+
+    def shortest(self, source, destination):
+        return self.client.get(
+            ROUTE_SHORTEST_URL,
+            {"source": source.id, "destination": destination.id},
+        )
+
+    def test_shortest_path_over_routes(self):
+        res = self.shortest(self.berlin, self.vienna)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["distance"], 680)
+        self.assertEqual(
+            [station["name"] for station in res.data["stations"]],
+            ["Test_Berlin", "Test_Prague", "Test_Vienna"],
+        )
+
+    def test_shortest_path_follows_route_changes(self):
+        self.shortest(self.berlin, self.vienna)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.direct.distance = 600
+            self.direct.save()
+        res = self.shortest(self.berlin, self.vienna)
+        self.assertEqual(res.data["distance"], 600)
+        self.assertEqual(res.data["routes"], [self.direct.id])
+
+    def test_no_path_against_route_direction(self):
+        res = self.shortest(self.vienna, self.berlin)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RouteSearchApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        krakow = sample_station("Kraków Główny", 50.0683, 19.9475)
+        kyiv = sample_station("Київ-Пасажирський", 50.4406, 30.4890)
+        berlin = sample_station("Berlin Hbf", 52.5251, 13.3694)
+        self.to_kyiv = Route.objects.create(
+            source=krakow, destination=kyiv, distance=800
+        )
+        self.to_berlin = Route.objects.create(
+            source=krakow, destination=berlin, distance=600
+        )
+        self.from_berlin = Route.objects.create(
+            source=berlin, destination=kyiv, distance=1300
+        )
+
+    def route_ids(self, **params):
+        res = self.client.get(ROUTE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [route["id"] for route in res.data["results"]]
+
+    def test_filter_ignores_accents_and_alphabet(self):
+        self.assertEqual(
+            self.route_ids(source="krakow glowny"),
+            [self.to_kyiv.id, self.to_berlin.id],
+        )
+        self.assertEqual(
+            self.route_ids(destination="Kyiv"),
+            [self.to_kyiv.id, self.from_berlin.id],
+        )
+
+    def test_filter_by_source_and_destination(self):
+        self.assertEqual(
+            self.route_ids(source="KRAK", destination="пасаж"),
+            [self.to_kyiv.id],
+        )
+        self.assertEqual(self.route_ids(source="Be"), [self.from_berlin.id])
+        self.assertEqual(self.route_ids(source="hbf", destination="Be"), [])
+
+    def test_station_search_finds_misspelled_names(self):
+        res = self.client.get(STATION_URL, {"name": "Krakov"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["name"], "Kraków Główny")
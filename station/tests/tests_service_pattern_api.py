@@ -0,0 +1,182 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.models import (
+    Crew,
+    Journey,
+    Route,
+    ServiceException,
+    ServicePattern,
+)
+from station.tests.tests_order_api import ORDER_URL
+from station.tests.tests_route_api import sample_station
+from station.tests.tests_train_api import sample_train
+
+SERVICE_PATTERN_URL = reverse("station:servicepattern-list")
+RUNS_URL = reverse("station:servicepattern-runs")
+
+MONDAY = datetime.date(2030, 7, 1)
+WORKDAYS = 0b0011111
+
+
+def sample_service_pattern(**params) -> ServicePattern:
+    defaults = {
+        "route": Route.objects.create(
+            source=sample_station("Test_Bratislava", 48.1486, 17.1077),
+            destination=sample_station("Test_Vienna", 48.2082, 16.3738),
+            distance=80,
+        ),
+        "train": sample_train(number=90001),
+        "departure_time": datetime.time(6, 30),
+        "travel_time": datetime.timedelta(hours=1, minutes=10),
+        "weekdays": WORKDAYS,
+        "valid_from": MONDAY,
+        "valid_to": MONDAY + datetime.timedelta(days=13),
+    }
+    defaults.update(params)
+    return ServicePattern.objects.create(**defaults)
+
+
+class ServicePatternApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.pattern = sample_service_pattern()
+        self.crew = Crew.objects.create(first_name="Ivan", last_name="Test")
+        self.pattern.crews.add(self.crew)
+
+    def runs(self, **params):
+        res = self.client.get(RUNS_URL, {"page_size": 100, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data["results"]
+
+    def test_runs_follow_weekdays_validity_and_exceptions(self):
+        ServiceException.objects.create(
+            service_pattern=self.pattern,
+            date=MONDAY + datetime.timedelta(days=1),
+        )
+        ServiceException.objects.create(
+            service_pattern=self.pattern,
+            date=MONDAY + datetime.timedelta(days=5),
+            runs=True,
+        )
+        runs = self.runs(
+            **{
+                "from": MONDAY.isoformat(),
+                "to": (MONDAY + datetime.timedelta(days=20)).isoformat(),
+            }
+        )
+        self.assertEqual(
+            [(MONDAY + datetime.timedelta(days=day)).isoformat()
+             for day in (0, 2, 3, 4, 5, 7, 8, 9, 10, 11)],
+            [run["date"] for run in runs],
+        )
+        self.assertEqual(runs[0]["run"], f"{self.pattern.id}@{MONDAY}")
+        self.assertIsNone(runs[0]["journey"])
+        self.assertEqual(runs[0]["departure_time"][11:16], "06:30")
+        self.assertEqual(runs[0]["arrival_time"][11:16], "07:40")
+        self.assertEqual(runs[0]["tickets_available"], 150)
+
+    def test_booking_a_run_materializes_its_journey_once(self):
+        run = f"{self.pattern.id}@{MONDAY}"
+        for seat in (1, 2):
+            res = self.client.post(
+                ORDER_URL,
+                {"tickets": [{"journey": run, "cargo": 1, "seat": seat}]},
+                format="json",
+            )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        journey = Journey.objects.get(service_pattern=self.pattern)
+        self.assertEqual(journey.service_date, MONDAY)
+        self.assertEqual(list(journey.crews.all()), [self.crew])
+        self.assertEqual(journey.tickets.count(), 2)
+        run = self.runs(**{"from": MONDAY.isoformat()})[0]
+        self.assertEqual(run["journey"], journey.id)
+        self.assertEqual(run["tickets_available"], 148)
+
+    def test_rejected_order_leaves_no_journey(self):
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [
+                {"journey": f"{self.pattern.id}@{MONDAY}", "cargo": 1,
+                 "seat": seat}
+                for seat in (1, 999)
+            ]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            Journey.objects.filter(service_pattern=self.pattern).exists()
+        )
+
+    def test_booking_same_seat_on_two_runs(self):
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [
+                {"journey": f"{self.pattern.id}@{day}", "cargo": 1,
+                 "seat": 1}
+                for day in (MONDAY, MONDAY + datetime.timedelta(days=1))
+            ]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Journey.objects.filter(service_pattern=self.pattern).count(), 2
+        )
+
+    def test_booking_a_day_without_run_is_rejected(self):
+        saturday = MONDAY + datetime.timedelta(days=5)
+        res = self.client.post(
+            ORDER_URL,
+            {"tickets": [
+                {"journey": f"{self.pattern.id}@{saturday}", "cargo": 1,
+                 "seat": 1}
+            ]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            Journey.objects.filter(service_pattern=self.pattern).exists()
+        )
+
+    def test_create_service_pattern_with_exceptions(self):
+        payload = {
+            "route": self.pattern.route.id,
+            "train": self.pattern.train.id,
+            "crews": [self.crew.id],
+            "departure_time": "22:15",
+            "travel_time": "03:00:00",
+            "weekdays": 0b1100000,
+            "valid_from": "2030-07-01",
+            "valid_to": "2030-12-31",
+            "exceptions": [{"date": "2030-12-25", "runs": False}],
+        }
+        res = self.client.post(SERVICE_PATTERN_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        pattern = ServicePattern.objects.get(id=res.data["id"])
+        self.assertFalse(pattern.runs_on(datetime.date(2030, 12, 25)))
+        self.assertTrue(pattern.runs_on(datetime.date(2030, 12, 28)))
+
+        payload["valid_to"] = "2030-06-01"
+        res = self.client.post(SERVICE_PATTERN_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_runs_range_is_limited(self):
+        res = self.client.get(
+            RUNS_URL, {"from": "2030-07-01", "to": "2031-07-01"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(RUNS_URL, {"from": "2030-02-30"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("from", res.data)
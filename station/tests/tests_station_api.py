@@ -0,0 +1,254 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from station.autocomplete import reset_index
+from station.boards import board_version_key
+from station.caching import new_version, response_cache
+from station.models import Route
+from station.search import search_stations
+from station.tests.tests_journey_api import DEMO_DATA
+from station.tests.tests_order_api import sample_journey
+from station.tests.tests_route_api import sample_station
+from station.tests.tests_train_api import sample_train
+
+NEARBY_URL = reverse("station:station-nearby")
+IN_BBOX_URL = reverse("station:station-in-bbox")
+AUTOCOMPLETE_URL = reverse("station:station-autocomplete")
+
+
+class StationGeoApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        sample_station("Test_Vienna", 48.2082, 16.3738)
+        sample_station("Test_Bratislava", 48.1486, 17.1077)
+        sample_station("Test_Prague", 50.0755, 14.4378)
+        sample_station("Test_Taveuni", -16.85, 179.95)
+        sample_station("Test_Rabi", -16.80, -179.97)
+
+    def test_nearby_stations_nearest_first(self):
+        res = self.client.get(
+            NEARBY_URL, {"lat": 48.21, "lon": 16.37, "radius": 60}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [station["name"] for station in res.data],
+            ["Test_Vienna", "Test_Bratislava"],
+        )
+        self.assertLess(res.data[0]["distance"], 1)
+        self.assertAlmostEqual(res.data[1]["distance"], 55, delta=1)
+
+    def test_nearby_across_antimeridian(self):
+        res = self.client.get(
+            NEARBY_URL, {"lat": -16.83, "lon": -179.99, "radius": 20}
+        )
+        self.assertEqual(
+            [station["name"] for station in res.data],
+            ["Test_Rabi", "Test_Taveuni"],
+        )
+
+    def test_stations_in_bbox(self):
+        res = self.client.get(
+            IN_BBOX_URL,
+            {"min_lat": 47, "max_lat": 49, "min_lon": 16, "max_lon": 18},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [station["name"] for station in res.data["results"]],
+            ["Test_Bratislava", "Test_Vienna"],
+        )
+        res = self.client.get(
+            IN_BBOX_URL,
+            {"min_lat": -17, "max_lat": -16, "min_lon": 179,
+             "max_lon": -179},
+        )
+        self.assertEqual(res.data["count"], 2)
+
+    def test_invalid_coordinates_are_rejected(self):
+        res = self.client.get(NEARBY_URL, {"lat": 91, "lon": 16})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(NEARBY_URL, {"lat": 48})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def departures_url(station_id):
+    return reverse("station:station-departures", args=[station_id])
+
+
+def arrivals_url(station_id):
+    return reverse("station:station-arrivals", args=[station_id])
+
+
+@override_settings(BOARD_CACHE_SECONDS=60)
+class StationBoardApiTests(TestCase):
+
+    def setUp(self) -> None:
+        response_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.train = sample_train()
+        self.start = timezone.now() + timezone.timedelta(hours=1)
+        self.journeys = [
+            sample_journey(
+                train=self.train,
+                departure_time=self.start + timezone.timedelta(hours=hour),
+                arrival_time=self.start + timezone.timedelta(hours=hour + 1),
+            )
+            for hour in (2, 0, 1)
+        ]
+        self.bratislava = self.journeys[0].route.source
+        self.vienna = self.journeys[0].route.destination
+
+    def test_departures_in_time_order(self):
+        res = self.client.get(
+            departures_url(self.bratislava.id), {"limit": 2}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [journey["id"] for journey in res.data],
+            [self.journeys[1].id, self.journeys[2].id],
+        )
+        self.assertEqual(res.data[0]["destination"], "Test_Vienna")
+        self.assertEqual(
+            res.data[0]["tickets_available"], self.train.num_seats
+        )
+
+    def test_arrivals_from_given_time(self):
+        res = self.client.get(
+            arrivals_url(self.vienna.id),
+            {"from": (self.start + timezone.timedelta(hours=2)).isoformat()},
+        )
+        self.assertEqual(
+            [journey["id"] for journey in res.data],
+            [self.journeys[2].id, self.journeys[0].id],
+        )
+        self.assertEqual(res.data[0]["source"], "Test_Bratislava")
+        res = self.client.get(departures_url(self.vienna.id))
+        self.assertEqual(res.data, [])
+
+    def test_board_rejects_impossible_time(self):
+        for value in ("tomorrow", "2024-02-30T10:00"):
+            res = self.client.get(
+                departures_url(self.bratislava.id), {"from": value}
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("from", res.data)
+
+    def test_cached_board_is_invalidated_by_journey_changes(self):
+        self.client.get(departures_url(self.bratislava.id))
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(departures_url(self.bratislava.id))
+        self.assertFalse(
+            any("station_journey" in query["sql"]
+                for query in context.captured_queries)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.journeys[1].delete()
+        res = self.client.get(departures_url(self.bratislava.id))
+        self.assertEqual(len(res.data), 2)
+
+    def test_board_invalidated_by_other_process_is_stale(self):
+        self.client.get(departures_url(self.bratislava.id))
+        self.journeys[1].delete()
+        # the version as another worker process bumps it
+        other_process_cache = DatabaseCache(
+            settings.RESPONSE_CACHE_BACKENDS["db"]["LOCATION"], {}
+        )
+        other_process_cache.set(
+            board_version_key(self.bratislava.id), new_version(), None
+        )
+        res = self.client.get(departures_url(self.bratislava.id))
+        self.assertEqual(len(res.data), 2)
+
+
+class StationAutocompleteApiTests(TestCase):
+
+    def setUp(self) -> None:
+        reset_index()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.com",
+            password="test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.krakow = sample_station("Kraków Główny", 50.0677, 19.9476)
+        self.brno = sample_station("Brno hl.n.", 49.1906, 16.6128)
+        self.bratislava = sample_station("Bratislava hl.st.", 48.1586, 17.1)
+        Route.objects.create(
+            source=self.bratislava, destination=self.krakow, distance=400
+        )
+
+    def tearDown(self) -> None:
+        reset_index()
+
+    def names(self, query, **params):
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [station["name"] for station in res.data]
+
+    def test_autocomplete_matches_word_prefixes(self):
+        self.assertEqual(self.names("krak"), ["Kraków Główny"])
+        self.assertEqual(self.names("GLOW"), ["Kraków Główny"])
+        self.assertEqual(self.names("hl"), [
+            "Bratislava hl.st.", "Brno hl.n."
+        ])
+        self.assertEqual(self.names("x"), [])
+        self.assertEqual(self.names(""), [])
+
+    def test_autocomplete_ranks_by_routes_and_journeys(self):
+        self.assertEqual(self.names("br"), ["Bratislava hl.st.", "Brno hl.n."])
+        self.assertEqual(self.names("br", limit=1), ["Bratislava hl.st."])
+        with self.captureOnCommitCallbacks(execute=True):
+            Route.objects.create(
+                source=self.brno, destination=self.krakow, distance=300
+            )
+            Route.objects.create(
+                source=self.krakow, destination=self.brno, distance=300
+            )
+        self.assertEqual(self.names("br"), ["Brno hl.n.", "Bratislava hl.st."])
+
+    def test_autocomplete_follows_station_changes(self):
+        self.assertEqual(self.names("wien"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_station("Wien Hbf", 48.1851, 16.3762)
+            self.brno.name = "Brno-Královo Pole"
+            self.brno.save()
+            self.krakow.delete()
+        self.assertEqual(self.names("wien"), ["Wien Hbf"])
+        self.assertEqual(self.names("kr"), ["Brno-Královo Pole"])
+
+    def test_autocomplete_limit_is_validated(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "br", "limit": 1000})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StationDemoDataTests(TestCase):
+
+    def test_loaded_stations_are_searchable(self):
+        call_command("loaddata", DEMO_DATA, stdout=StringIO())
+        berlin = search_stations("berlin").get()
+        self.assertEqual(berlin.name, "Berlin")
+        self.assertEqual(
+            Route.objects.filter(source__in=search_stations("Berlin")).count(),
+            Route.objects.filter(source__name="Berlin").count(),
+        )
@@ -3,7 +3,7 @@ import tempfile
 
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -172,6 +172,21 @@ class AuthenticatedTrainApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data["results"], serializer.data)
 
+    def test_fast_train_list_matches_train_list(self):
+        wifi = Facility.objects.create(name="WiFi")
+        wc = Facility.objects.create(name="WC")
+        sample_train(number=90001).facilities.add(wifi, wc)
+        sample_train(number=90002)
+        res = self.client.get(TRAIN_URL)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            with self.assertNumQueries(2):
+                fast = self.client.get(TRAIN_URL)
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.data, res.data)
+        self.assertEqual(
+            fast.data["results"][0]["facilities"], ["WC", "WiFi"]
+        )
+
     def test_filter_buses_by_facilities(self):
         train_without_facility = sample_train(number=90001)
         train_with_facility_1 = sample_train(number=90002)
@@ -204,6 +219,39 @@ class AuthenticatedTrainApiTests(TestCase):
             res.data["results"]
         )
 
+    def test_filter_trains_having_all_facilities(self):
+        wifi = Facility.objects.create(name="WiFi")
+        wc = Facility.objects.create(name="WC")
+        train_with_wifi = sample_train(number=90001)
+        train_with_both = sample_train(number=90002)
+        train_with_wifi.facilities.add(wifi)
+        train_with_both.facilities.add(wifi, wc)
+        res = self.client.get(
+            TRAIN_URL, {"facilities_all": f"{wc.id},{wifi.id}"}
+        )
+        self.assertEqual(
+            [train["number"] for train in res.data["results"]], [90002]
+        )
+        res = self.client.get(TRAIN_URL, {"facilities_all": "wifi"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_facility_ids_follow_facility_changes(self):
+        wifi = Facility.objects.create(name="WiFi")
+        wc = Facility.objects.create(name="WC")
+        train = sample_train()
+        train.facilities.set([wc, wifi])
+        self.assertEqual(train.facility_ids, sorted([wifi.id, wc.id]))
+        wifi.trains.remove(train)
+        train.refresh_from_db()
+        self.assertEqual(train.facility_ids, [wc.id])
+        wifi.trains.add(train)
+        wc.delete()
+        train.refresh_from_db()
+        self.assertEqual(train.facility_ids, [wifi.id])
+        wifi.trains.clear()
+        train.refresh_from_db()
+        self.assertEqual(train.facility_ids, [])
+
     def test_retrieve_train_detail(self):
         train = sample_train()
         train.facilities.add(Facility.objects.create(name="WiFi"))
@@ -213,6 +261,22 @@ class AuthenticatedTrainApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_train_with_relations_as_ids(self):
+        train = sample_train()
+        wifi = Facility.objects.create(name="WiFi")
+        train.facilities.add(wifi)
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                detail_url(train.id),
+                {"fields": "number,train_type,facilities", "expand": ""},
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {"number": train.number, "train_type": train.train_type_id,
+             "facilities": [wifi.id]},
+        )
+
     def test_create_train_forbidden(self):
         payload = {
             "number": 99009,
@@ -9,7 +9,10 @@ from station.views import (
     StationViewSet,
     RouteViewSet,
     JourneyViewSet,
+    ServicePatternViewSet,
     OrderViewSet,
+    SeatHoldViewSet,
+    ExportViewSet,
 )
 
 app_name = "station"
@@ -22,7 +25,10 @@ router.register("trains", TrainViewSet)
 router.register("stations", StationViewSet)
 router.register("routes", RouteViewSet)
 router.register("journeys", JourneyViewSet)
+router.register("service-patterns", ServicePatternViewSet)
 router.register("orders", OrderViewSet)
+router.register("holds", SeatHoldViewSet)
+router.register("export", ExportViewSet, basename="export")
 
 urlpatterns = [
     path("", include(router.urls))
@@ -1,12 +1,46 @@
-from django.db.models import Count, F, Q
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiParameter,
+)
 from rest_framework import viewsets, mixins, status
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAdminUser
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.decorators import action
+from rest_framework import serializers
 
+from station.autocomplete import autocomplete_stations
+from station.booking import (
+    assign_seats,
+    cancel_journey,
+    cancel_order,
+    confirm_hold,
+    delete_order,
+    release_holds,
+)
+from station.boards import get_board
+from station.caching import CachedResponseMixin
+from station.exports import EXPORTS, export_rows
+from station.facilities import filter_facilities
+from station.fieldsets import FIELDSET_PARAMETERS, SparseFieldsetMixin
+from station.graph import get_graph, reset_graph
+from station.planner import plan_itineraries, refresh_journeys
+from station.services import expand_runs
+from station.search import (
+    nearest_stations,
+    search_stations,
+    stations_in_box,
+)
 from station.models import (
     Crew,
     TrainType,
@@ -14,34 +48,60 @@ from station.models import (
     Facility,
     Station,
     Route,
-    Journey, Order,
+    Journey, Order, SeatHold, IdempotencyKey, ServicePattern,
 )
+from station.occupancy import SeatMap
+from station.renderers import CSVRenderer, NDJSONRenderer
 from station.serializers import (
     CrewSerializer,
     TrainTypeSerializer,
     TrainTypeImageSerializer,
     TrainListSerializer,
+    TrainListRowSerializer,
     TrainRetrieveSerializer,
     FacilitySerializer,
     StationSerializer,
     RouteSerializer,
     JourneyListSerializer,
+    JourneyListRowSerializer,
     JourneyRetrieveSerializer,
     JourneySerializer, OrderSerializer, OrderListSerializer,
+    SeatHoldSerializer, JourneyAvailabilitySerializer,
+    CancellationSerializer, ItinerarySerializer, ShortestPathSerializer,
+    NearbyStationSerializer, DepartureSerializer, ArrivalSerializer,
+    StationAutocompleteSerializer, ServicePatternSerializer,
+    ServiceRunSerializer,
 )
 
 
-class CrewViewSet(viewsets.ModelViewSet):
+fieldset_schema = extend_schema_view(
+    list=extend_schema(parameters=FIELDSET_PARAMETERS),
+    retrieve=extend_schema(parameters=FIELDSET_PARAMETERS),
+)
+
+
+@fieldset_schema
+class CrewViewSet(
+    CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
     queryset = Crew.objects.all()
+    cache_models = (Crew,)
     serializer_class = CrewSerializer
 
 
-class FacilityViewSet(viewsets.ModelViewSet):
+@fieldset_schema
+class FacilityViewSet(
+    CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
     queryset = Facility.objects.all()
+    cache_models = (Facility,)
     serializer_class = FacilitySerializer
 
 
+@fieldset_schema
 class TrainTypeViewSet(
+    CachedResponseMixin,
+    SparseFieldsetMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -50,6 +110,7 @@ class TrainTypeViewSet(
 ):
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
+    cache_models = (TrainType,)
 
     @action(
         methods=["POST"],
@@ -66,13 +127,83 @@ class TrainTypeViewSet(
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class CursorPaginationMixin:
+    """Page with cursor_pagination_class instead of page numbers when the
+    client asks for ?pagination=cursor or follows a returned cursor link.
+    Cursor pages need no COUNT(*) and cost the same at any depth."""
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            query_params = request.query_params if request else {}
+            if self.cursor_pagination_class is not None and (
+                "cursor" in query_params
+                or query_params.get("pagination") == "cursor"
+            ):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
+
+
+CURSOR_PARAMETERS = [
+    OpenApiParameter(
+        "pagination",
+        type=str,
+        enum=["cursor"],
+        description="Return cursor pages with next and previous links "
+                    "instead of numbered pages ex. ?pagination=cursor",
+    ),
+    OpenApiParameter(
+        "cursor",
+        type=str,
+        description="Position of a cursor page, taken from next or "
+                    "previous links",
+    ),
+]
+
+
 class TrainResultsSetPagination(PageNumberPagination):
     page_size = 2
     page_size_query_param = "page_size"
     max_page_size = 100
 
 
+class TrainCursorPagination(CursorPagination):
+    page_size = 2
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("number",)
+
+
+def facility_params(query_params):
+    """any_of / all_of facility ids from ?facilities= and
+    ?facilities_all= for filter_facilities"""
+    facilities = {}
+    for name, argument in (
+        ("facilities", "any_of"),
+        ("facilities_all", "all_of"),
+    ):
+        if not query_params.get(name):
+            continue
+        try:
+            facilities[argument] = [
+                int(facility_id)
+                for facility_id in query_params[name].split(",")
+            ]
+        except ValueError:
+            raise serializers.ValidationError(
+                {name: "Give facility ids ex. 2,3"}
+            )
+    return facilities
+
+
+@fieldset_schema
 class TrainViewSet(
+    SparseFieldsetMixin,
+    CursorPaginationMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -82,6 +213,7 @@ class TrainViewSet(
     queryset = Train.objects.all()
     serializer_class = TrainListSerializer
     pagination_class = TrainResultsSetPagination
+    cursor_pagination_class = TrainCursorPagination
 
     @staticmethod
     def _params_to_ints(query_string):
@@ -90,6 +222,8 @@ class TrainViewSet(
 
     def get_serializer_class(self):
         if self.action == "list":
+            if settings.FAST_LIST_SERIALIZATION:
+                return TrainListRowSerializer
             return TrainListSerializer
         elif self.action == "retrieve":
             return TrainRetrieveSerializer
@@ -97,18 +231,19 @@ class TrainViewSet(
 
     def get_queryset(self):
         queryset = self.queryset
-        facilities = self.request.query_params.get("facilities")
+        facilities = facility_params(self.request.query_params)
         if facilities:
-            facilities_ids = self._params_to_ints(facilities)
-            queryset = (
-                Train.objects.prefetch_related("facilities").filter(
-                    facilities__id__in=facilities_ids
-                ).distinct())
+            queryset = filter_facilities(
+                queryset.prefetch_related("facilities"), **facilities
+            )
 
         if self.action == ("list", "retrieve"):
             queryset = (Train.objects.prefetch_related("facilities").
                         select_related("train_type"))
 
+        if self.action == "list" and settings.FAST_LIST_SERIALIZATION:
+            queryset = TrainListRowSerializer.rows(queryset)
+
         return queryset
 
     @extend_schema(
@@ -119,7 +254,13 @@ class TrainViewSet(
                 description="Filter by facility id ex. ?facilities=2,3",
 
             ),
-        ]
+            OpenApiParameter(
+                "facilities_all",
+                type={"type": "array", "items": {"type": "number"}},
+                description="Trains having all the facilities ex. "
+                            "?facilities_all=2,3",
+            ),
+        ] + CURSOR_PARAMETERS
     )
     def list(self, request, *args, **kwargs):
         """Get list of trains with facilities."""
@@ -132,10 +273,293 @@ class StationResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class StationViewSet(viewsets.ModelViewSet):
+@fieldset_schema
+class StationViewSet(
+    CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
     pagination_class = StationResultsSetPagination
+    cache_models = (Station,)
+
+    def get_queryset(self):
+        queryset = self.queryset
+        name = self.request.query_params.get("name")
+        if name and self.action == "list":
+            queryset = search_stations(name, queryset, fuzzy=True)
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "name",
+                type=str,
+                description="Search stations by name, accents and alphabet "
+                            "don't matter and misspelled names find the "
+                            "closest ones ex. ?name=krakow",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        """Get list of stations."""
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q", type=str, required=True,
+                description="Beginning of any word of the station name, "
+                            "accents and alphabet don't matter ex. ?q=kra",
+            ),
+            OpenApiParameter(
+                "limit", type=int,
+                description=f"Number of stations, at most "
+                            f"{settings.AUTOCOMPLETE_MAX_RESULTS} ex. "
+                            f"?limit=5",
+            ),
+        ],
+        responses=StationAutocompleteSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="autocomplete")
+    def autocomplete(self, request):
+        """Stations completing a typed name, most used first"""
+        try:
+            limit = int(
+                request.query_params.get(
+                    "limit", settings.AUTOCOMPLETE_MAX_RESULTS
+                )
+            )
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.AUTOCOMPLETE_MAX_RESULTS:
+            raise serializers.ValidationError(
+                {"limit": f"limit must be in range "
+                          f"[1, {settings.AUTOCOMPLETE_MAX_RESULTS}]"}
+            )
+        return Response(
+            [
+                {"id": station_id, "name": name}
+                for station_id, name in autocomplete_stations(
+                    request.query_params.get("q", ""), limit
+                )
+            ]
+        )
+
+    @staticmethod
+    def _params_to_floats(query_params, defaults):
+        """Read float parameters, defaults of None mark required ones"""
+        values = {}
+        errors = {}
+        for name, default in defaults.items():
+            try:
+                values[name] = float(query_params.get(name, default))
+            except (TypeError, ValueError):
+                errors[name] = f"{name} must be a number"
+        if errors:
+            raise serializers.ValidationError(errors)
+        return values
+
+    @staticmethod
+    def _validate_coordinates(latitudes, longitudes):
+        Station.validate_coordinates(
+            [
+                {
+                    "name": name,
+                    "parameter": value,
+                    "min_value": -90,
+                    "max_value": 90,
+                }
+                for name, value in latitudes.items()
+            ]
+            + [
+                {
+                    "name": name,
+                    "parameter": value,
+                    "min_value": -180,
+                    "max_value": 180,
+                }
+                for name, value in longitudes.items()
+            ],
+            serializers.ValidationError,
+        )
+
+    def _board(self, request, kind, serializer_class):
+        station = self.get_object()
+        start = None
+        if request.query_params.get("from"):
+            try:
+                start = parse_datetime(request.query_params["from"])
+            except ValueError:
+                start = None
+            if start is None:
+                raise serializers.ValidationError(
+                    {"from": "Give an ISO 8601 datetime"}
+                )
+            if timezone.is_naive(start):
+                start = timezone.make_aware(start)
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.BOARD_MAX_LIMIT:
+            raise serializers.ValidationError(
+                {"limit": f"limit must be in range "
+                          f"[1, {settings.BOARD_MAX_LIMIT}]"}
+            )
+        return Response(
+            get_board(
+                station.id,
+                kind,
+                start,
+                limit,
+                lambda journeys: serializer_class(journeys, many=True).data,
+            )
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATETIME,
+                description="Departing at or after, default now ex. "
+                            "?from=2024-08-01T06:00:00",
+            ),
+            OpenApiParameter(
+                "limit",
+                type=int,
+                description=f"Number of journeys, at most "
+                            f"{settings.BOARD_MAX_LIMIT} ex. ?limit=5 "
+                            f"(default 10)",
+            ),
+        ],
+        responses=DepartureSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=True, url_path="departures")
+    def departures(self, request, pk=None):
+        """Next journeys departing from the station"""
+        return self._board(request, "departures", DepartureSerializer)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATETIME,
+                description="Arriving at or after, default now ex. "
+                            "?from=2024-08-01T06:00:00",
+            ),
+            OpenApiParameter(
+                "limit",
+                type=int,
+                description=f"Number of journeys, at most "
+                            f"{settings.BOARD_MAX_LIMIT} ex. ?limit=5 "
+                            f"(default 10)",
+            ),
+        ],
+        responses=ArrivalSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=True, url_path="arrivals")
+    def arrivals(self, request, pk=None):
+        """Next journeys arriving at the station"""
+        return self._board(request, "arrivals", ArrivalSerializer)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "lat", type=float, required=True,
+                description="Latitude ex. ?lat=48.2082",
+            ),
+            OpenApiParameter(
+                "lon", type=float, required=True,
+                description="Longitude ex. ?lon=16.3738",
+            ),
+            OpenApiParameter(
+                "radius", type=float,
+                description=f"Radius in km, at most "
+                            f"{settings.NEARBY_MAX_RADIUS_KM} ex. "
+                            f"?radius=25 (default 10)",
+            ),
+            OpenApiParameter(
+                "limit", type=int,
+                description=f"Number of stations, at most "
+                            f"{settings.NEARBY_MAX_RESULTS} ex. "
+                            f"?limit=5 (default 20)",
+            ),
+        ],
+        responses=NearbyStationSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="nearby")
+    def nearby(self, request):
+        """Stations within the radius, nearest first"""
+        values = self._params_to_floats(
+            request.query_params,
+            {"lat": None, "lon": None, "radius": 10, "limit": 20},
+        )
+        self._validate_coordinates(
+            {"lat": values["lat"]}, {"lon": values["lon"]}
+        )
+        if not 0 < values["radius"] <= settings.NEARBY_MAX_RADIUS_KM:
+            raise serializers.ValidationError(
+                {
+                    "radius": f"radius must be in range "
+                              f"(0, {settings.NEARBY_MAX_RADIUS_KM}]"
+                }
+            )
+        if not 1 <= values["limit"] <= settings.NEARBY_MAX_RESULTS:
+            raise serializers.ValidationError(
+                {
+                    "limit": f"limit must be in range "
+                             f"[1, {settings.NEARBY_MAX_RESULTS}]"
+                }
+            )
+        stations = nearest_stations(
+            values["lat"],
+            values["lon"],
+            values["radius"],
+            int(values["limit"]),
+        )
+        return Response(NearbyStationSerializer(stations, many=True).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name, type=float, required=True,
+                description=description,
+            )
+            for name, description in [
+                ("min_lat", "South edge ex. ?min_lat=47.5"),
+                ("max_lat", "North edge ex. ?max_lat=48.8"),
+                ("min_lon", "West edge ex. ?min_lon=15.9, greater than "
+                            "max_lon for boxes across the antimeridian"),
+                ("max_lon", "East edge ex. ?max_lon=17.2"),
+            ]
+        ],
+    )
+    @action(methods=["GET"], detail=False, url_path="in-bbox")
+    def in_bbox(self, request):
+        """Stations inside a map viewport"""
+        values = self._params_to_floats(
+            request.query_params,
+            {"min_lat": None, "max_lat": None, "min_lon": None,
+             "max_lon": None},
+        )
+        self._validate_coordinates(
+            {name: values[name] for name in ("min_lat", "max_lat")},
+            {name: values[name] for name in ("min_lon", "max_lon")},
+        )
+        if values["min_lat"] > values["max_lat"]:
+            raise serializers.ValidationError(
+                {"min_lat": "min_lat must not be above max_lat"}
+            )
+        if values["min_lon"] <= values["max_lon"]:
+            longitudes = [(values["min_lon"], values["max_lon"])]
+        else:
+            longitudes = [(values["min_lon"], 180), (-180, values["max_lon"])]
+        queryset = stations_in_box(
+            values["min_lat"], values["max_lat"], longitudes
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class RouteResultsSetPagination(PageNumberPagination):
@@ -144,7 +568,18 @@ class RouteResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class RouteCursorPagination(CursorPagination):
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("id",)
+
+
+@fieldset_schema
 class RouteViewSet(
+    CachedResponseMixin,
+    SparseFieldsetMixin,
+    CursorPaginationMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -154,57 +589,100 @@ class RouteViewSet(
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
     pagination_class = RouteResultsSetPagination
+    cursor_pagination_class = RouteCursorPagination
+    cache_models = (Route, Station)
 
     def get_queryset(self):
-        queryset = self.queryset
+        queryset = self.queryset.select_related("source", "destination")
         source = self.request.query_params.get("source")
         destination = self.request.query_params.get("destination")
         if source:
-            source_ids = (Station.objects.
-                          filter(name__icontains=source).
-                          values_list("id")
-                          )
-            queryset = Route.objects.filter(source__id__in=source_ids)
+            queryset = queryset.filter(source__in=search_stations(source))
         if destination:
-            destination_ids = (Station.objects.
-                               filter(name__icontains=destination).
-                               values_list("id")
-                               )
-            queryset = (
-                Route.objects.filter(destination__id__in=destination_ids))
-        if source and destination:
-            print(source_ids, destination_ids)
-            queryset = (
-                Route.objects.select_related("source", "destination").
-                filter(Q(source__id__in=source_ids) &
-                       Q(destination__id__in=destination_ids)))
-
-        if self.action == ("list", "retrieve"):
-            queryset = Route.objects.select_related("source", "destination")
-
-        return queryset
+            queryset = queryset.filter(
+                destination__in=search_stations(destination)
+            )
+        return queryset.order_by("id")
 
     @extend_schema(
         parameters=[
             OpenApiParameter(
                 "source",
                 type={"type": "string", "items": {"type": "name"}},
-                description="Filter by source station id ex. ?source=Berlin",
+                description="Filter by source station name, accents and "
+                            "alphabet don't matter ex. ?source=Berlin",
 
             ),
             OpenApiParameter(
                 "destination",
                 type={"type": "string", "items": {"type": "name"}},
-                description="Filter by destination station id ex. "
-                            "?destination=Vien",
+                description="Filter by destination station name, accents "
+                            "and alphabet don't matter ex. ?destination=Vien",
 
             ),
-        ]
+        ] + CURSOR_PARAMETERS
     )
     def list(self, request, *args, **kwargs):
         """Get list of routes."""
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "source",
+                type=int,
+                required=True,
+                description="Id of the first station ex. ?source=1",
+            ),
+            OpenApiParameter(
+                "destination",
+                type=int,
+                required=True,
+                description="Id of the last station ex. ?destination=2",
+            ),
+        ],
+        responses=ShortestPathSerializer,
+    )
+    @action(methods=["GET"], detail=False, url_path="shortest")
+    def shortest(self, request):
+        """Shortest rail distance between two stations over routes"""
+        ids = {}
+        for name in ("source", "destination"):
+            try:
+                ids[name] = int(request.query_params.get(name, ""))
+            except ValueError:
+                raise serializers.ValidationError(
+                    {name: f"{name} must be a station id"}
+                )
+        # a graph built by this process may miss changes of another one
+        for _ in range(2):
+            path = get_graph().shortest_path(
+                ids["source"], ids["destination"]
+            )
+            if path is None:
+                break
+            distance, station_ids, route_ids = path
+            stations = Station.objects.in_bulk(station_ids)
+            if len(stations) == len(set(station_ids)):
+                break
+            reset_graph()
+        if path is None or len(stations) < len(set(station_ids)):
+            return Response(
+                {"detail": "No route between these stations."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        serializer = ShortestPathSerializer(
+            {
+                "distance": distance,
+                "stations": [stations[id_] for id_ in station_ids],
+                "routes": route_ids,
+            }
+        )
+        return Response(serializer.data)
+
+
+MAX_AVAILABILITY_IDS = 200
+
 
 class JourneyResultsSetPagination(PageNumberPagination):
     page_size = 2
@@ -212,12 +690,25 @@ class JourneyResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class JourneyViewSet(viewsets.ModelViewSet):
+class JourneyCursorPagination(CursorPagination):
+    page_size = 2
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("departure_time", "id")
+
+
+@fieldset_schema
+class JourneyViewSet(
+    SparseFieldsetMixin, CursorPaginationMixin, viewsets.ModelViewSet
+):
     queryset = Journey.objects.all()
     pagination_class = JourneyResultsSetPagination
+    cursor_pagination_class = JourneyCursorPagination
 
     def get_serializer_class(self):
         if self.action == "list":
+            if settings.FAST_LIST_SERIALIZATION:
+                return JourneyListRowSerializer
             return JourneyListSerializer
         elif self.action == "retrieve":
             return JourneyRetrieveSerializer
@@ -225,19 +716,21 @@ class JourneyViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = self.queryset
-        if self.action == "list":
+        if self.action == "list" and settings.FAST_LIST_SERIALIZATION:
+            queryset = JourneyListRowSerializer.rows(
+                self._filter_journeys(queryset, self.request.query_params)
+            )
+        elif self.action == "list":
             queryset = (
                 queryset.
                 select_related("train").
                 prefetch_related("crews").
                 select_related("train__train_type").
                 prefetch_related("train__facilities").
-                prefetch_related("route").
-                annotate(
-                    tickets_available=(
-                     F("train__cargo_num") * F("train__places_in_cargo")
-                     - Count("tickets"))
-                )
+                prefetch_related("route")
+            )
+            queryset = self._filter_journeys(
+                queryset, self.request.query_params
             )
         elif self.action == "retrieve":
             queryset = (queryset.select_related("train").
@@ -248,6 +741,465 @@ class JourneyViewSet(viewsets.ModelViewSet):
                         )
         return queryset.order_by("id")
 
+    @staticmethod
+    def _filter_journeys(queryset, query_params):
+        """Filter by departure window, station names and train facilities.
+        Days are turned into departure_time ranges so the departure_time
+        indexes apply."""
+        errors = {}
+        window = {}
+        departure_date = query_params.get("departure_date")
+        if departure_date:
+            try:
+                day = parse_date(departure_date)
+            except ValueError:
+                day = None
+            if day is None:
+                errors["departure_date"] = "Give a date as YYYY-MM-DD"
+            else:
+                start = timezone.make_aware(
+                    datetime.datetime.combine(day, datetime.time.min)
+                )
+                window["departure_time__gte"] = start
+                window["departure_time__lt"] = (
+                    start + datetime.timedelta(days=1)
+                )
+        for name, lookup in (
+            ("departure_from", "departure_time__gte"),
+            ("departure_to", "departure_time__lt"),
+        ):
+            if not query_params.get(name):
+                continue
+            # well formed but impossible dates raise ValueError
+            try:
+                moment = parse_datetime(query_params[name])
+                if moment is None:
+                    day = parse_date(query_params[name])
+                    moment = day and datetime.datetime.combine(
+                        day, datetime.time.min
+                    )
+            except ValueError:
+                moment = None
+            if moment is None:
+                errors[name] = "Give an ISO 8601 date or datetime"
+                continue
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            if lookup in window:
+                moment = (max if lookup.endswith("gte") else min)(
+                    moment, window[lookup]
+                )
+            window[lookup] = moment
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        queryset = queryset.filter(**window)
+        source = query_params.get("source")
+        destination = query_params.get("destination")
+        if source:
+            queryset = queryset.filter(
+                route__source__in=search_stations(source)
+            )
+        if destination:
+            queryset = queryset.filter(
+                route__destination__in=search_stations(destination)
+            )
+        return filter_facilities(
+            queryset, **facility_params(query_params), prefix="train__"
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "departure_date",
+                type=OpenApiTypes.DATE,
+                description="Departing on the day ex. "
+                            "?departure_date=2024-08-01",
+            ),
+            OpenApiParameter(
+                "departure_from",
+                type=OpenApiTypes.DATETIME,
+                description="Departing at or after ex. "
+                            "?departure_from=2024-08-01T06:00:00",
+            ),
+            OpenApiParameter(
+                "departure_to",
+                type=OpenApiTypes.DATETIME,
+                description="Departing before ex. "
+                            "?departure_to=2024-08-01T12:00:00",
+            ),
+            OpenApiParameter(
+                "source",
+                type=str,
+                description="Filter by source station name ex. "
+                            "?source=Berlin",
+            ),
+            OpenApiParameter(
+                "destination",
+                type=str,
+                description="Filter by destination station name ex. "
+                            "?destination=Vien",
+            ),
+            OpenApiParameter(
+                "facilities",
+                type={"type": "array", "items": {"type": "number"}},
+                description="Trains having any of the facilities ex. "
+                            "?facilities=2,3",
+            ),
+            OpenApiParameter(
+                "facilities_all",
+                type={"type": "array", "items": {"type": "number"}},
+                description="Trains having all the facilities ex. "
+                            "?facilities_all=2,3",
+            ),
+        ] + CURSOR_PARAMETERS
+    )
+    def list(self, request, *args, **kwargs):
+        """Get list of journeys."""
+        return super().list(request, *args, **kwargs)
+
+    @staticmethod
+    def _param_to_bool(value):
+        return str(value).lower() in ("1", "true", "yes")
+
+    @staticmethod
+    def _params_to_ints(query_string):
+        """Converts a string of format '1,2,3' to a list of integers [1,2,3]"""
+        return [int(str_id) for str_id in query_string.split(",")]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ids",
+                type={"type": "array", "items": {"type": "number"}},
+                required=True,
+                description=f"Journey ids, at most "
+                            f"{MAX_AVAILABILITY_IDS} ex. ?ids=1,2,3",
+            ),
+        ],
+        responses=JourneyAvailabilitySerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="availability")
+    def availability(self, request):
+        """Seat availability of many journeys from a single query"""
+        try:
+            ids = self._params_to_ints(request.query_params.get("ids", ""))
+        except ValueError:
+            ids = []
+        if not 1 <= len(ids) <= MAX_AVAILABILITY_IDS:
+            raise serializers.ValidationError(
+                {
+                    "ids": f"Give from 1 to {MAX_AVAILABILITY_IDS} "
+                           f"comma separated journey ids"
+                }
+            )
+        rows = Journey.objects.filter(id__in=ids).values_list(
+            "id",
+            "seat_map",
+            "seats_taken",
+            "train__cargo_num",
+            "train__places_in_cargo",
+        )
+        availability = {}
+        for journey_id, seat_map, taken, cargo_num, places_in_cargo in rows:
+            taken_per_cargo = SeatMap(
+                cargo_num, places_in_cargo, seat_map
+            ).taken_per_cargo()
+            availability[journey_id] = {
+                "id": journey_id,
+                "capacity": cargo_num * places_in_cargo,
+                "taken": taken,
+                "free": cargo_num * places_in_cargo - taken,
+                "free_per_cargo": [
+                    places_in_cargo - cargo_taken
+                    for cargo_taken in taken_per_cargo
+                ],
+            }
+        serializer = JourneyAvailabilitySerializer(
+            [availability[id_] for id_ in dict.fromkeys(ids)
+             if id_ in availability],
+            many=True,
+        )
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "source",
+                type=int,
+                required=True,
+                description="Id of the departure station ex. ?source=1",
+            ),
+            OpenApiParameter(
+                "destination",
+                type=int,
+                required=True,
+                description="Id of the arrival station ex. ?destination=2",
+            ),
+            OpenApiParameter(
+                "departure_after",
+                type=str,
+                description="Earliest departure, ISO 8601, default now "
+                            "ex. ?departure_after=2024-08-01T08:00:00Z",
+            ),
+            OpenApiParameter(
+                "max_transfers",
+                type=int,
+                description=f"Up to {settings.PLANNER_MAX_TRANSFERS} "
+                            f"transfers ex. ?max_transfers=1 (default 2)",
+            ),
+            OpenApiParameter(
+                "min_transfer_minutes",
+                type=int,
+                description=f"Minimum time to change trains, default "
+                            f"{settings.PLANNER_MIN_TRANSFER_MINUTES} "
+                            f"ex. ?min_transfer_minutes=15",
+            ),
+        ],
+        responses=ItinerarySerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="plan")
+    def plan(self, request):
+        """Earliest arrival itineraries between two stations, one for
+        every number of transfers that arrives earlier than the ones
+        with fewer transfers"""
+        params = request.query_params
+        errors = {}
+        values = {}
+        for name, default, low, high in [
+            ("source", None, 1, None),
+            ("destination", None, 1, None),
+            ("max_transfers", 2, 0, settings.PLANNER_MAX_TRANSFERS),
+            (
+                "min_transfer_minutes",
+                settings.PLANNER_MIN_TRANSFER_MINUTES,
+                0,
+                None,
+            ),
+        ]:
+            try:
+                values[name] = int(params.get(name, default))
+            except (TypeError, ValueError):
+                errors[name] = f"{name} must be an integer"
+                continue
+            if values[name] < low:
+                errors[name] = f"{name} must be at least {low}"
+            elif high is not None and values[name] > high:
+                errors[name] = f"{name} must be at most {high}"
+        departure_after = timezone.now()
+        if "departure_after" in params:
+            try:
+                departure_after = parse_datetime(params["departure_after"])
+            except ValueError:
+                departure_after = None
+            if departure_after is None:
+                errors["departure_after"] = "Give an ISO 8601 datetime"
+            elif timezone.is_naive(departure_after):
+                departure_after = timezone.make_aware(departure_after)
+        if not errors and values["source"] == values["destination"]:
+            errors["destination"] = "Source and destination must differ"
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        # the timetable may miss changes of other processes: reload
+        # journeys that are gone and plan once more
+        for _ in range(2):
+            plans = plan_itineraries(
+                values["source"],
+                values["destination"],
+                departure_after,
+                values["max_transfers"],
+                values["min_transfer_minutes"],
+            )
+            journeys = Journey.objects.select_related(
+                "route__source", "route__destination", "train"
+            ).in_bulk({id_ for plan in plans for id_ in plan})
+            missing = {
+                id_ for plan in plans for id_ in plan if id_ not in journeys
+            }
+            if not missing:
+                break
+            refresh_journeys(missing)
+        itineraries = []
+        for plan in plans:
+            legs = [journeys[id_] for id_ in plan if id_ in journeys]
+            if len(legs) < len(plan):
+                continue
+            itineraries.append(
+                {
+                    "departure_time": legs[0].departure_time,
+                    "arrival_time": legs[-1].arrival_time,
+                    "transfers": len(legs) - 1,
+                    "legs": legs,
+                }
+            )
+        return Response(ItinerarySerializer(itineraries, many=True).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "count",
+                type=int,
+                required=True,
+                description="Number of seats to assign ex. ?count=3",
+            ),
+            OpenApiParameter(
+                "together",
+                type=bool,
+                description="Keep seats adjacent in one cargo where "
+                            "possible ex. ?together=true (default)",
+            ),
+            OpenApiParameter(
+                "book",
+                type=bool,
+                description="Create an order instead of a seat hold "
+                            "ex. ?book=true",
+            ),
+        ],
+        request=None,
+        responses=SeatHoldSerializer,
+    )
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="assign-seats",
+        permission_classes=[IsAuthenticated],
+    )
+    def assign_seats(self, request, pk=None):
+        """Pick free seats for the journey and hold (or book) them"""
+        journey = self.get_object()
+        try:
+            count = int(request.query_params.get("count", ""))
+        except ValueError:
+            count = 0
+        if not 1 <= count <= journey.train.num_seats:
+            raise serializers.ValidationError(
+                {
+                    "count": f"count must be in range "
+                             f"[1, {journey.train.num_seats}]"
+                }
+            )
+        book = self._param_to_bool(request.query_params.get("book"))
+        result = assign_seats(
+            request.user,
+            journey.id,
+            count,
+            self._param_to_bool(request.query_params.get("together", True)),
+            serializers.ValidationError,
+            book=book,
+        )
+        serializer_class = OrderSerializer if book else SeatHoldSerializer
+        return Response(
+            serializer_class(result).data, status=status.HTTP_201_CREATED
+        )
+
+    @extend_schema(request=CancellationSerializer)
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="cancel-tickets",
+        permission_classes=[IsAdminUser],
+    )
+    def cancel_tickets(self, request, pk=None):
+        """Release every ticket and held seat of the journey"""
+        journey = self.get_object()
+        serializer = CancellationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cancellation = cancel_journey(
+            journey.id,
+            request.user,
+            serializer.validated_data.get("reason", "")
+        )
+        return Response(
+            CancellationSerializer(cancellation).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class ServicePatternResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class ServicePatternViewSet(viewsets.ModelViewSet):
+    """Recurring journeys, expanded into runs on request"""
+    queryset = ServicePattern.objects.prefetch_related("crews", "exceptions")
+    serializer_class = ServicePatternSerializer
+    pagination_class = ServicePatternResultsSetPagination
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "from",
+                type=OpenApiTypes.DATE,
+                description="First departure day, default today ex. "
+                            "?from=2024-08-01",
+            ),
+            OpenApiParameter(
+                "to",
+                type=OpenApiTypes.DATE,
+                description=f"Last departure day, at most "
+                            f"{settings.SERVICE_RUNS_MAX_DAYS} days from "
+                            f"the first, default the first ex. "
+                            f"?to=2024-08-07",
+            ),
+            OpenApiParameter(
+                "source",
+                type=str,
+                description="Filter by source station name ex. "
+                            "?source=Berlin",
+            ),
+            OpenApiParameter(
+                "destination",
+                type=str,
+                description="Filter by destination station name ex. "
+                            "?destination=Vien",
+            ),
+        ],
+        responses=ServiceRunSerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="runs")
+    def runs(self, request):
+        """Runs of all service patterns between two days by departure.
+        Book a run that has no journey yet with its run key as the
+        ticket journey."""
+        days = {}
+        for name in ("from", "to"):
+            value = request.query_params.get(name)
+            if value:
+                try:
+                    days[name] = parse_date(value)
+                except ValueError:
+                    days[name] = None
+                if days[name] is None:
+                    raise serializers.ValidationError(
+                        {name: "Give a date as YYYY-MM-DD"}
+                    )
+        start = days.get("from") or timezone.localdate()
+        end = days.get("to") or start
+        if not 0 <= (end - start).days < settings.SERVICE_RUNS_MAX_DAYS:
+            raise serializers.ValidationError(
+                {"to": f"to must be from 0 to "
+                       f"{settings.SERVICE_RUNS_MAX_DAYS - 1} days after "
+                       f"from"}
+            )
+        patterns = ServicePattern.objects.all()
+        source = request.query_params.get("source")
+        destination = request.query_params.get("destination")
+        if source:
+            patterns = patterns.filter(
+                route__source__in=search_stations(source)
+            )
+        if destination:
+            patterns = patterns.filter(
+                route__destination__in=search_stations(destination)
+            )
+        page = self.paginate_queryset(expand_runs(patterns, start, end))
+        return self.get_paginated_response(
+            ServiceRunSerializer(page, many=True).data
+        )
+
 
 class OrderResultsSetPagination(PageNumberPagination):
     page_size = 1
@@ -255,10 +1207,18 @@ class OrderResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderCursorPagination(CursorPagination):
+    page_size = 1
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+
+
+class OrderViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     pagination_class = OrderResultsSetPagination
+    cursor_pagination_class = OrderCursorPagination
 
     def get_queryset(self):
         queryset = self.queryset.filter(user=self.request.user)
@@ -271,9 +1231,233 @@ class OrderViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_order(instance.id)
+
+    @extend_schema(parameters=CURSOR_PARAMETERS)
+    def list(self, request, *args, **kwargs):
+        """Get list of your orders, newest first."""
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "Idempotency-Key",
+                type=str,
+                location=OpenApiParameter.HEADER,
+                description="Unique key of the order request, retries "
+                            "with the same key get the stored response",
+            ),
+        ]
+    )
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return super().create(request, *args, **kwargs)
+
+        fingerprint = IdempotencyKey.fingerprint_request(request)
+        now = timezone.now()
+        stored_keys = IdempotencyKey.objects.filter(
+            user=request.user, key=key
+        )
+        stored = stored_keys.filter(expires_at__gt=now).first()
+        if stored:
+            return self._replay(stored, fingerprint)
+
+        stored_keys.filter(expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                # a concurrent retry waits on this row until we commit
+                stored = IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timezone.timedelta(
+                        hours=settings.IDEMPOTENCY_KEY_TTL_HOURS
+                    ),
+                )
+                response = super().create(request, *args, **kwargs)
+                stored.status_code = response.status_code
+                stored.response = response.data
+                stored.save(update_fields=["status_code", "response"])
+        except IntegrityError:
+            return self._replay(stored_keys.get(), fingerprint)
+        return response
+
+    @extend_schema(request=CancellationSerializer)
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="cancel",
+        permission_classes=[IsAuthenticated],
+        serializer_class=CancellationSerializer,
+    )
+    def cancel(self, request, pk=None):
+        """Release all tickets of the order"""
+        order = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cancellation = cancel_order(
+            order.id,
+            request.user,
+            serializers.ValidationError,
+            serializer.validated_data.get("reason", "")
+        )
+        return Response(
+            self.get_serializer(cancellation).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @staticmethod
+    def _replay(stored, fingerprint):
+        if stored.fingerprint != fingerprint:
+            return Response(
+                {
+                    "detail": "Idempotency-Key has already been used "
+                              "for a different request"
+                },
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            stored.response,
+            status=stored.status_code,
+            headers={"Idempotent-Replayed": "true"},
+        )
+
     def get_serializer_class(self):
         serializer = self.serializer_class
 
         if self.action == "list":
             serializer = OrderListSerializer
         return serializer
+
+
+class SeatHoldViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.ListModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet
+):
+    """Short-lived seat reservations that can be confirmed as an order"""
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    pagination_class = OrderResultsSetPagination
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return (
+            self.queryset.filter(user=self.request.user).
+            prefetch_related("seats")
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        release_holds(SeatHold.objects.filter(id=instance.id))
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="confirm",
+        serializer_class=OrderSerializer,
+    )
+    def confirm(self, request, pk=None):
+        """Turn the hold into an order with tickets for all held seats"""
+        hold = self.get_object()
+        order = confirm_hold(
+            hold.id, request.user, serializers.ValidationError
+        )
+        serializer = self.get_serializer(order)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+EXPORT_SCHEMA = extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "since",
+            type=OpenApiTypes.DATETIME,
+            description=(
+                "Only rows changed (orders: placed, deletions: "
+                "deleted) at or after "
+                "ex. ?since=2024-07-01T00:00:00Z"
+            ),
+            required=False,
+        ),
+    ],
+    responses={
+        (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+        (200, CSVRenderer.media_type): OpenApiTypes.STR,
+    },
+)
+
+
+class ExportViewSet(GenericViewSet):
+    """Whole tables streamed as NDJSON, or CSV with ?format=csv or
+    Accept: text/csv, for the data warehouse"""
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    @staticmethod
+    def _param_to_datetime(value):
+        # well formed but impossible dates raise ValueError
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                moment = day and datetime.datetime.combine(
+                    day, datetime.time.min
+                )
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise serializers.ValidationError(
+                {"since": "Give an ISO 8601 date or datetime"}
+            )
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def export(self, request, name):
+        since = request.query_params.get("since")
+        export = EXPORTS[name]
+        rows = export_rows(
+            export, since and self._param_to_datetime(since)
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(
+                list(export.columns), rows, settings.EXPORT_CHUNK_SIZE
+            ),
+            content_type=(
+                f"{renderer.media_type}; charset=utf-8"
+                if renderer.charset else renderer.media_type
+            ),
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{name}.{renderer.format}"'
+        )
+        return response
+
+    @EXPORT_SCHEMA
+    @action(methods=["GET"], detail=False, url_path="journeys")
+    def journeys(self, request):
+        return self.export(request, "journeys")
+
+    @EXPORT_SCHEMA
+    @action(methods=["GET"], detail=False, url_path="routes")
+    def routes(self, request):
+        return self.export(request, "routes")
+
+    @EXPORT_SCHEMA
+    @action(methods=["GET"], detail=False, url_path="orders")
+    def orders(self, request):
+        """A row per ticket with its order"""
+        return self.export(request, "orders")
+
+    @EXPORT_SCHEMA
+    @action(methods=["GET"], detail=False, url_path="deletions")
+    def deletions(self, request):
+        """Ids of journeys, routes and tickets deleted since"""
+        return self.export(request, "deletions")
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import os
 
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "debug_toolbar",
     "station",
     "user",
@@ -183,3 +185,124 @@ SPECTACULAR_SETTINGS = {
 }
 
 INTERNAL_IPS = ["127.0.0.1",]
+
+# Seat holds reserve seats before checkout, see station.booking
+SEAT_HOLD_MINUTES = int(os.getenv("SEAT_HOLD_MINUTES", 10))
+SEAT_HOLD_MAX_MINUTES = int(os.getenv("SEAT_HOLD_MAX_MINUTES", 30))
+
+# How concurrent bookings of one journey are serialized:
+# "row" (SELECT FOR UPDATE), "advisory" (pg_advisory_xact_lock)
+# or "optimistic" (compare-and-set of the seat map with retries)
+BOOKING_LOCK_STRATEGY = os.getenv("BOOKING_LOCK_STRATEGY", "row")
+BOOKING_OPTIMISTIC_RETRIES = int(os.getenv("BOOKING_OPTIMISTIC_RETRIES", 5))
+
+# Responses of POST /orders/ with an Idempotency-Key header are replayed
+# for retries during this time
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+
+# Background jobs (station.jobs) are retried with exponential backoff;
+# running jobs locked longer than the timeout belong to a dead worker
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BACKOFF_SECONDS = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", 10))
+JOB_RETRY_BACKOFF_MAX_SECONDS = int(
+    os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", 3600)
+)
+JOB_STALE_TIMEOUT_SECONDS = int(os.getenv("JOB_STALE_TIMEOUT_SECONDS", 600))
+
+# Journey planner (station.planner): the in-memory timetable is updated
+# by signals of this process and reloaded after the TTL for the others
+PLANNER_MIN_TRANSFER_MINUTES = int(
+    os.getenv("PLANNER_MIN_TRANSFER_MINUTES", 10)
+)
+PLANNER_MAX_TRANSFERS = int(os.getenv("PLANNER_MAX_TRANSFERS", 4))
+PLANNER_SEARCH_HOURS = int(os.getenv("PLANNER_SEARCH_HOURS", 48))
+PLANNER_TIMETABLE_TTL_SECONDS = int(
+    os.getenv("PLANNER_TIMETABLE_TTL_SECONDS", 300)
+)
+
+# Shortest rail distances (station.graph): answers are cached per station
+# pair, shortest path trees of the busiest stations are precomputed
+SHORTEST_PATH_CACHE_SIZE = int(os.getenv("SHORTEST_PATH_CACHE_SIZE", 10000))
+SHORTEST_PATH_HOT_SOURCES = int(os.getenv("SHORTEST_PATH_HOT_SOURCES", 0))
+SHORTEST_PATH_GRAPH_TTL_SECONDS = int(
+    os.getenv("SHORTEST_PATH_GRAPH_TTL_SECONDS", 300)
+)
+
+# Limits of the stations/nearby/ endpoint
+NEARBY_MAX_RADIUS_KM = int(os.getenv("NEARBY_MAX_RADIUS_KM", 500))
+NEARBY_MAX_RESULTS = int(os.getenv("NEARBY_MAX_RESULTS", 100))
+
+# Station departure and arrival boards are cached for this many seconds
+# (0 turns the cache off) in the response cache below; journey changes
+# invalidate them at once, in every process unless it is "locmem"
+BOARD_CACHE_SECONDS = int(os.getenv("BOARD_CACHE_SECONDS", 5))
+BOARD_MAX_LIMIT = int(os.getenv("BOARD_MAX_LIMIT", 50))
+
+# Station autocomplete answers from an in-memory name index per process,
+# rebuilt after this many seconds to see changes made by other processes
+AUTOCOMPLETE_MAX_RESULTS = int(os.getenv("AUTOCOMPLETE_MAX_RESULTS", 10))
+AUTOCOMPLETE_INDEX_TTL_SECONDS = int(
+    os.getenv("AUTOCOMPLETE_INDEX_TTL_SECONDS", 3600)
+)
+
+# Longest range of days service patterns are expanded into runs for
+SERVICE_RUNS_MAX_DAYS = int(os.getenv("SERVICE_RUNS_MAX_DAYS", 31))
+
+# Catalog responses (crews, facilities, train types, stations, routes) are
+# cached for this many seconds (0 turns the cache off) in a cache chosen by
+# RESPONSE_CACHE_BACKEND: "db" in a table made by
+# `python manage.py createcachetable`, "file" in RESPONSE_CACHE_LOCATION
+# or "locmem" per process. Writes are seen at once by every process with
+# "db" or "file"; with "locmem" only by the process that made them, so
+# use it with a single worker.
+RESPONSE_CACHE_SECONDS = int(os.getenv("RESPONSE_CACHE_SECONDS", 300))
+RESPONSE_CACHE_ALIAS = "responses"
+RESPONSE_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv(
+            "RESPONSE_CACHE_LOCATION", "/tmp/train_station_service_cache"
+        ),
+    },
+    "db": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "station_response_cache",
+    },
+}
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    RESPONSE_CACHE_ALIAS: {
+        **RESPONSE_CACHE_BACKENDS[
+            os.getenv("RESPONSE_CACHE_BACKEND", "db")
+        ],
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+# Journey and train lists are built from values() rows with related names
+# aggregated in SQL instead of walking related objects per field; the
+# output is the same
+FAST_LIST_SERIALIZATION = os.getenv(
+    "FAST_LIST_SERIALIZATION", "False"
+).lower() in ("1", "true", "yes")
+
+# JSON is encoded with orjson when it is installed, same output several
+# times faster, and application/msgpack is offered when msgpack is
+REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
+    "station.renderers.ORJSONRenderer",
+    "rest_framework.renderers.BrowsableAPIRenderer",
+    *(
+        ["station.renderers.MessagePackRenderer"]
+        if find_spec("msgpack") else []
+    ),
+]
+
+# rows fetched from the server side cursor and written to the response at
+# a time by the export endpoints
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))